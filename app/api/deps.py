@@ -1,25 +1,56 @@
-from typing import Generator
 from fastapi import Depends, HTTPException, status, Request
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import SessionLocal
-from app.core.security import get_current_active_user
-
-
-def get_db() -> Generator:
-    """Dependency para obtener sesión de base de datos"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Se reexporta la misma función que usa app.core.security: FastAPI cachea
+# las dependencias por callable, así autenticación y endpoint comparten una
+# única sesión (y una sola conexión del pool) por request.
+from app.database import get_db, get_async_db, read_db, async_read_db, get_read_db, get_async_read_db
+from app.core.security import get_current_active_user, oauth2_scheme, resolver_usuario, resolver_usuario_async
 
 
 def get_current_user_dep(current_user = Depends(get_current_active_user)):
-    """Dependency para obtener usuario actual"""
+    """Dependency para obtener usuario actual (endpoints con get_db)"""
     return current_user
 
 
+def current_user(get_session):
+    """
+    Fábrica de la dependency de usuario actual para endpoints que usan otra
+    dependency de Session (p. ej. get_read_db): el usuario se resuelve con
+    esa misma sesión, así el request usa una sola conexión.
+
+    Ejemplo:
+        @router.get("/dashboard")
+        def dashboard(db: Session = Depends(get_read_db), user = Depends(current_user(get_read_db))):
+            ...
+    """
+    def get_current_user_session(token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
+        return resolver_usuario(token, db)
+
+    return get_current_user_session
+
+
+def async_current_user(get_session=get_async_db):
+    """
+    Versión async de current_user para endpoints con AsyncSession: revocaciones
+    y usuario se resuelven por la conexión de la misma AsyncSession del endpoint.
+    `get_session` debe ser el mismo callable del endpoint (FastAPI cachea por
+    callable); las fábricas como async_read_db(...) se asignan a una variable.
+    """
+    async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_session)):
+        return await resolver_usuario_async(token, db)
+
+    return get_current_user_async
+
+
+# Dependencies para las sesiones por defecto
+get_current_user_async_dep = async_current_user(get_async_db)
+get_current_user_read_dep = current_user(get_read_db)
+get_current_user_async_read_dep = async_current_user(get_async_read_db)
+
+
 def get_admin_user(current_user = Depends(get_current_active_user)):
     """Dependency para verificar usuario admin"""
     # Como no hay campo 'rol' en la tabla, validamos por correo específico o permitimos todos por ahora
@@ -33,6 +64,17 @@ def get_admin_user(current_user = Depends(get_current_active_user)):
     return current_user
 
 
+async def catalogos_vigentes():
+    """
+    Dependency para endpoints que serializan catálogos en memoria (CasoResponse):
+    si un commit invalidó el registro, lo recarga en el threadpool antes del
+    endpoint, no desde el validator dentro del event loop.
+    """
+    from app.core.catalogos import catalogos
+    if not catalogos.cargado:
+        await run_in_threadpool(catalogos.asegurar)
+
+
 def get_client_info(request: Request):
     """Obtener información del cliente para auditoría"""
     return {
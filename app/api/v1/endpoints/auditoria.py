@@ -1,64 +1,94 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
 import uuid
 from datetime import datetime
 
-from app.api.deps import get_db, get_current_user_dep
+from app.api.deps import get_async_read_db, get_current_user_async_read_dep
 from app.schemas.auditoria import AuditoriaResponse
-from app.models.models import AuditoriaEvento
-from app.schemas.catalogo import TipoAccionResponse
+from app.services.auditoria_service import auditoria_service
+from app.utils.helpers import encode_cursor, decode_cursor
 
 router = APIRouter()
 
+# Los listados devuelven la lista de eventos como antes; el cursor de la
+# página siguiente va en esta cabecera (ausente en la última página)
+CABECERA_CURSOR = "X-Next-Cursor"
+
+
+def _cursor(after: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not after:
+        return None
+    try:
+        fecha_cursor, id_cursor = decode_cursor(after)
+        return fecha_cursor, int(id_cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+def _pagina(eventos: list, limit: int, response: Response) -> list:
+    # Se pide una fila extra para saber si existe una página siguiente
+    if len(eventos) > limit:
+        eventos = eventos[:limit]
+        response.headers[CABECERA_CURSOR] = encode_cursor(eventos[-1].fechaEvento, eventos[-1].id)
+    return eventos
+
 
 @router.get("/", response_model=List[AuditoriaResponse])
 async def list_auditoria(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, description="Obsoleto: usar after"),
     limit: int = Query(10, ge=1, le=100),
     usuario_id: Optional[int] = None,
     caso_id: Optional[uuid.UUID] = None,
     tipo_accion_id: Optional[int] = None,
     fecha_desde: Optional[datetime] = None,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
+    after: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor; si se envía se ignora skip"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user_async_read_dep)
 ):
-    """Listar registros de auditoría con filtros"""
-    query = db.query(AuditoriaEvento)
-
-    if usuario_id:
-        query = query.filter(AuditoriaEvento.usuarioId == usuario_id)
-    if caso_id:
-        query = query.filter(AuditoriaEvento.casoId == caso_id)
-    if tipo_accion_id:
-        query = query.filter(AuditoriaEvento.tipoAccionId == tipo_accion_id)
-    if fecha_desde:
-        query = query.filter(AuditoriaEvento.fechaEvento >= fecha_desde)
-
-    auditoria = query.order_by(AuditoriaEvento.fechaEvento.desc()).offset(skip).limit(limit).all()
-    return auditoria
+    """Listar registros de auditoría con filtros (keyset con after)"""
+    cursor = _cursor(after)
+    eventos = await auditoria_service.get_auditoria_async(
+        db,
+        skip=0 if cursor else skip,
+        limit=limit + 1,
+        usuario_id=usuario_id,
+        caso_id=caso_id,
+        tipo_accion_id=tipo_accion_id,
+        fecha_desde=fecha_desde,
+        after=cursor
+    )
+    return _pagina(eventos, limit, response)
 
 
 @router.get("/caso/{caso_id}", response_model=List[AuditoriaResponse])
 async def get_auditoria_caso(
     caso_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user_async_read_dep)
 ):
-    """Obtener auditoría de un caso específico"""
-    auditoria = db.query(AuditoriaEvento).filter(AuditoriaEvento.casoId == caso_id).order_by(AuditoriaEvento.fechaEvento.desc()).all()
-    return auditoria
+    """Obtener auditoría de un caso específico, más recientes primero"""
+    eventos = await auditoria_service.get_auditoria_async(
+        db, limit=limit + 1, caso_id=caso_id, after=_cursor(after)
+    )
+    return _pagina(eventos, limit, response)
 
 
 @router.get("/usuario/{usuario_id}", response_model=List[AuditoriaResponse])
 async def get_auditoria_usuario(
     usuario_id: int,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
+    after: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user_async_read_dep)
 ):
     """Obtener últimas acciones de un usuario"""
-    auditoria = db.query(AuditoriaEvento).filter(
-        AuditoriaEvento.usuarioId == usuario_id
-    ).order_by(AuditoriaEvento.fechaEvento.desc()).limit(limit).all()
-    return auditoria
+    eventos = await auditoria_service.get_acciones_usuario_async(
+        db, usuario_id, limit=limit + 1, after=_cursor(after)
+    )
+    return _pagina(eventos, limit, response)
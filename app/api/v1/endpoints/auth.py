@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import Optional
 
-from app.api.deps import get_db
+from app.api.deps import get_async_db, get_current_user_async_dep
 from app.schemas.usuario import Token, UsuarioLogin, RefreshTokenRequest, LoginResponse
-from app.core.security import verify_password, create_access_token, create_refresh_token
+from app.core.revocaciones import revocaciones
+from app.core.security import (
+    verify_and_update_password_async, create_access_token, create_refresh_token, decode_token, oauth2_scheme
+)
 from app.services.session_service import SessionService
 from app.utils.request_utils import get_client_ip, get_user_agent
 from app.config import settings
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -18,15 +25,18 @@ router = APIRouter()
 async def login(
     request: Request,
     user_data: UsuarioLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Endpoint de login"""
     # Buscar usuario por correo
     from app.models.models import Usuario
-    user = db.query(Usuario).filter(Usuario.correo == user_data.correo).first()
+    user = await db.scalar(select(Usuario).where(Usuario.correo == user_data.correo))
 
-    # Verificar credenciales
-    if not user or not verify_password(user_data.password, user.passwordHash):
+    # Verificar credenciales (argon2 corre en el pool de contraseñas, no en el event loop)
+    valida, nuevo_hash = False, None
+    if user and user.passwordHash:
+        valida, nuevo_hash = await verify_and_update_password_async(user_data.password, user.passwordHash)
+    if not valida:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Correo o contraseña incorrectos",
@@ -40,22 +50,37 @@ async def login(
             detail="El usuario está inactivo"
         )
 
-    # Crear tokens
-    access_token = create_access_token(data={"sub": str(user.id), "email": user.correo})
-    refresh_token = create_refresh_token(data={"sub": str(user.id), "email": user.correo})
+    if nuevo_hash:
+        # Hash heredado (bcrypt o parámetros argon2 anteriores): se reemplaza al entrar
+        try:
+            user.passwordHash = nuevo_hash
+            await db.commit()
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el hash de contraseña del usuario {user.id}: {str(e)}")
+            await db.rollback()
+            # El rollback expira el objeto: en async hay que recargarlo explícitamente
+            await db.refresh(user)
+
+    # Crear tokens: los dos llevan el id de la sesión, así revocarla invalida ambos
+    sesion_id = uuid.uuid4()
+    datos_token = {"sub": str(user.id), "email": user.correo, "sid": str(sesion_id)}
+    access_token = create_access_token(data=datos_token)
+    refresh_token = create_refresh_token(data=datos_token)
 
     # Crear registro de sesión
     try:
         ip_origen = get_client_ip(request)
         user_agent = get_user_agent(request)
         
-        session = SessionService.create_session(
+        # La sesión vive lo que el refresh token
+        session = await SessionService.create_session_async(
             db=db,
             usuario_id=user.id,
             token=access_token,
-            expiration_hours=settings.ACCESS_TOKEN_EXPIRE_HOURS,
+            expiration_hours=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24,
             ip_origen=ip_origen,
-            user_agent=user_agent
+            user_agent=user_agent,
+            sesion_id=sesion_id
         )
         
         if session:
@@ -80,16 +105,17 @@ async def login(
 async def refresh_token(
     request: Request,
     request_data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Refrescar token de acceso"""
     refresh_token = request_data.refresh_token
     try:
-        from app.core.security import decode_token
         payload = decode_token(refresh_token)
         
-        # Verificar que sea un refresh token
-        if payload.get("type") != "refresh":
+        # Verificar que sea un refresh token y que su sesión no se haya cerrado
+        # (logout, invalidación de un administrador)
+        sid = payload.get("sid")
+        if payload.get("type") != "refresh" or await revocaciones.revocado_async(refresh_token, db, sid=sid):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido",
@@ -105,7 +131,7 @@ async def refresh_token(
             
         # Verificar usuario
         from app.models.models import Usuario
-        user = db.query(Usuario).filter(Usuario.id == user_id).first()
+        user = await db.get(Usuario, int(user_id))
         
         if not user or not user.activo:
              raise HTTPException(
@@ -113,32 +139,40 @@ async def refresh_token(
                 detail="Usuario no encontrado o inactivo",
             )
             
-        # Crear nuevos tokens
-        new_access_token = create_access_token(data={"sub": str(user.id), "email": user.correo})
+        # Crear nuevos tokens en la misma sesión (un refresh token sin sid,
+        # emitido antes, abre una sesión nueva)
+        sesion_id = uuid.UUID(sid) if sid else None
+        datos_token = {"sub": str(user.id), "email": user.correo, "sid": str(sesion_id or uuid.uuid4())}
+        new_access_token = create_access_token(data=datos_token)
         # Opcional: Rotar refresh token también (mayor seguridad)
-        new_refresh_token = create_refresh_token(data={"sub": str(user.id), "email": user.correo})
-        
-        # Crear registro de sesión para el nuevo access token
-        try:
-            ip_origen = get_client_ip(request)
-            user_agent = get_user_agent(request)
-            
-            session = SessionService.create_session(
-                db=db,
-                usuario_id=user.id,
-                token=new_access_token,
-                expiration_hours=settings.ACCESS_TOKEN_EXPIRE_HOURS,
-                ip_origen=ip_origen,
-                user_agent=user_agent
-            )
-            
-            if session:
-                logger.info(f"Nueva sesión creada al refrescar token para usuario {user.id}")
-            else:
-                logger.warning(f"No se pudo crear sesión al refrescar token para usuario {user.id}")
-        except Exception as e:
-            logger.error(f"Error al crear sesión en refresh para usuario {user.id}: {str(e)}")
-        
+        new_refresh_token = create_refresh_token(data=datos_token)
+        horas_sesion = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24
+
+        if sesion_id is not None and await SessionService.renew_session_async(db, sesion_id, horas_sesion):
+            logger.info(f"Sesión {sesion_id} renovada al refrescar token para usuario {user.id}")
+        else:
+            # Crear registro de sesión para los nuevos tokens
+            try:
+                ip_origen = get_client_ip(request)
+                user_agent = get_user_agent(request)
+
+                session = await SessionService.create_session_async(
+                    db=db,
+                    usuario_id=user.id,
+                    token=new_access_token,
+                    expiration_hours=horas_sesion,
+                    ip_origen=ip_origen,
+                    user_agent=user_agent,
+                    sesion_id=uuid.UUID(datos_token["sid"])
+                )
+
+                if session:
+                    logger.info(f"Nueva sesión creada al refrescar token para usuario {user.id}")
+                else:
+                    logger.warning(f"No se pudo crear sesión al refrescar token para usuario {user.id}")
+            except Exception as e:
+                logger.error(f"Error al crear sesión en refresh para usuario {user.id}: {str(e)}")
+
         return {
             "access_token": new_access_token,
             "refresh_token": new_refresh_token,
@@ -152,3 +186,50 @@ async def refresh_token(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No se pudo validar las credenciales",
         )
+
+
+def _expiracion(payload: dict, horas_defecto: int) -> datetime:
+    # exp viene en segundos UTC; las fechas de tab_sesion son hora local
+    if payload.get("exp"):
+        return datetime.fromtimestamp(payload["exp"])
+    return datetime.now() + timedelta(hours=horas_defecto)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request_data: Optional[RefreshTokenRequest] = Body(None),
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async_dep)
+):
+    """
+    Cerrar la sesión: revoca la sesión del access token, y con ella el
+    refresh token emitido en el mismo login (claim sid). Un refresh token
+    de otra sesión o sin sid se revoca si se envía. Todos los workers lo
+    rechazan desde el siguiente refresco de revocaciones; este, de inmediato.
+    """
+    payload = decode_token(token)
+    sid = payload.get("sid")
+    # Con sid se revoca la sesión entera: se recuerda mientras pueda quedar un refresh token suyo
+    if sid:
+        expiracion = datetime.now() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    else:
+        expiracion = _expiracion(payload, settings.ACCESS_TOKEN_EXPIRE_HOURS)
+    revocar = [(token, expiracion, sid)]
+
+    if request_data is not None:
+        payload_refresh = decode_token(request_data.refresh_token)
+        if payload_refresh.get("type") != "refresh" or payload_refresh.get("sub") != str(current_user.id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Refresh token inválido")
+        if not sid or payload_refresh.get("sid") != sid:
+            revocar.append((
+                request_data.refresh_token,
+                _expiracion(payload_refresh, settings.REFRESH_TOKEN_EXPIRE_DAYS * 24),
+                payload_refresh.get("sid")
+            ))
+
+    for token_revocado, expiracion, sid_revocado in revocar:
+        sesion_id = uuid.UUID(sid_revocado) if sid_revocado else None
+        if not await SessionService.revoke_token_async(db, current_user.id, token_revocado, expiracion, sesion_id):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="No se pudo cerrar la sesión")
+    return None
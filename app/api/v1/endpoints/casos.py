@@ -1,15 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import datetime
 import uuid
 
-from app.api.deps import get_db, get_current_user_dep, get_client_info
-from app.schemas.caso import CasoCreate, CasoResponse, CasoUpdate, CasoFilter, CasoListResponse
-from app.services import caso_service
+from app.api.deps import (
+    get_db, get_async_db, async_read_db, async_current_user, get_current_user_dep, get_current_user_async_dep,
+    get_admin_user, get_client_info, catalogos_vigentes
+)
+from app.config import settings
+from app.schemas.caso import (
+    CasoCreate, CasoResponse, CasoUpdate, CasoFilter, CasoListResponse, CasoBulkCreate, CasoBulkResult,
+    CasoBulkUpdate, CasoBulkUpdateResult, RecalculoSemaforoResult
+)
 from app.services import caso_service
 from app.services.auditoria_service import auditoria_service
+from app.services.export_service import exportar_casos, FORMATOS
+from app.services.semaforo_service import semaforo_service
+from app.utils.helpers import encode_cursor, decode_cursor
+
+# Las respuestas resuelven los catálogos del registro en memoria
+router = APIRouter(dependencies=[Depends(catalogos_vigentes)])
 
-router = APIRouter()
+# El listado se refresca tras editar un caso: tolerancia de réplica corta
+get_listado_db = async_read_db(max_lag_seconds=5)
 
 
 @router.get("/", response_model=CasoListResponse)
@@ -22,37 +39,113 @@ async def list_casos(
     responsableId: Optional[int] = None,
     radicado: Optional[str] = None,
     busqueda: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
+    fechaDesde: Optional[datetime] = None,
+    fechaHasta: Optional[datetime] = None,
+    after: Optional[str] = Query(None, description="Cursor devuelto en next_cursor; si se envía se ignora page"),
+    include_total: bool = Query(True, description="False para omitir el conteo (scroll infinito)"),
+    db: AsyncSession = Depends(get_listado_db),
+    current_user = Depends(async_current_user(get_listado_db))
 ):
-    """Listar casos con filtros y paginación"""
+    """Listar casos con filtros y paginación (offset con page o keyset con after)"""
     filters = CasoFilter(
         tipoTramite=tipoTramite,
         estadoCasoId=estadoCasoId,
         semaforoId=semaforoId,
         responsableId=responsableId,
         radicado=radicado,
-        busqueda=busqueda
+        busqueda=busqueda,
+        fechaDesde=fechaDesde,
+        fechaHasta=fechaHasta
     )
 
+    cursor = None
+    if after:
+        try:
+            fecha_cursor, id_cursor = decode_cursor(after)
+            cursor = (fecha_cursor, uuid.UUID(id_cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
     skip = (page - 1) * page_size
-    casos = caso_service.get_casos(db, skip=skip, limit=page_size, filters=filters)
-    total = caso_service.count_casos(db, filters=filters)
+    # Se pide una fila extra para saber si existe una página siguiente
+    casos, total = await caso_service.get_casos_pagina_async(
+        db,
+        skip=skip,
+        limit=page_size + 1,
+        filters=filters,
+        after=cursor,
+        include_total=include_total
+    )
+
+    next_cursor = None
+    if len(casos) > page_size:
+        casos = casos[:page_size]
+        next_cursor = encode_cursor(casos[-1].createdAt, casos[-1].id)
 
     return CasoListResponse(
         items=[CasoResponse.model_validate(c) for c in casos],
-        total=total
+        total=total,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/buscar", response_model=List[CasoResponse])
+async def buscar_casos(
+    q: str = Query(..., min_length=2, description="Texto libre (radicado, peticionario o detalle)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user_dep)
+):
+    """Buscar casos por texto libre, ordenados por relevancia"""
+    return caso_service.buscar_casos(db, q, limit=limit)
+
+
+@router.get("/export")
+async def export_casos(
+    formato: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    tipoTramite: Optional[str] = None,
+    estadoCasoId: Optional[int] = None,
+    semaforoId: Optional[int] = None,
+    responsableId: Optional[int] = None,
+    radicado: Optional[str] = None,
+    busqueda: Optional[str] = None,
+    fechaDesde: Optional[datetime] = None,
+    fechaHasta: Optional[datetime] = None,
+    current_user = Depends(get_current_user_dep)
+):
+    """
+    Exportar los casos que cumplen los filtros del listado a CSV o XLSX.
+
+    El archivo se genera mientras se envía: las filas salen de un cursor
+    del servidor por lotes y se escriben al cliente por bloques, así la
+    memoria no crece con el tamaño de la exportación.
+    """
+    filters = CasoFilter(
+        tipoTramite=tipoTramite,
+        estadoCasoId=estadoCasoId,
+        semaforoId=semaforoId,
+        responsableId=responsableId,
+        radicado=radicado,
+        busqueda=busqueda,
+        fechaDesde=fechaDesde,
+        fechaHasta=fechaHasta
+    )
+    nombre = f"casos_{datetime.now():%Y%m%d_%H%M}.{formato}"
+    return StreamingResponse(
+        exportar_casos(formato, filters),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
     )
 
 
 @router.get("/{caso_id}", response_model=CasoResponse)
 async def get_caso(
     caso_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async_dep)
 ):
     """Obtener caso por ID"""
-    caso = caso_service.get_caso(db, caso_id)
+    caso = await caso_service.get_caso_async(db, caso_id)
     return caso
 
 
@@ -81,6 +174,95 @@ async def create_caso(
     return db_caso
 
 
+@router.post("/bulk", response_model=CasoBulkResult)
+async def create_casos_bulk(
+    lote: CasoBulkCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user_dep),
+    client_info: dict = Depends(get_client_info)
+):
+    """
+    Crear casos en lote (migraciones, cargas desde otros sistemas).
+
+    Cada registro se valida por separado: los inválidos o en conflicto se
+    reportan en `errores` con su posición y el resto se crea igualmente.
+    """
+    if len(lote.casos) > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {settings.BULK_MAX_ROWS} casos por lote"
+        )
+
+    resultado = caso_service.create_casos_bulk(db, lote.casos)
+
+    # Un solo evento de auditoría para el lote
+    auditoria_service.registrar_accion(
+        db=db,
+        accion="crear",
+        entidad="caso",
+        usuario_id=current_user.id,
+        detalles={"masivo": True, "creados": resultado.creados, "fallidos": resultado.fallidos},
+        **client_info
+    )
+
+    return resultado
+
+
+@router.post("/semaforo/recalcular", response_model=RecalculoSemaforoResult)
+async def recalcular_semaforo(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """
+    Recalcular el semáforo de todos los casos abiertos según los días que
+    faltan para su vencimiento (lo mismo que hace el job horario).
+    """
+    return semaforo_service.recalcular(db)
+
+
+@router.put("/bulk", response_model=CasoBulkUpdateResult)
+async def update_casos_bulk(
+    lote: CasoBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user),
+    client_info: dict = Depends(get_client_info)
+):
+    """
+    Aplicar un mismo cambio (reasignación, estado, ...) a una lista de casos
+    o a todos los que cumplan un filtro, en un solo UPDATE. Solo para
+    administradores: un filtro amplio puede tocar toda la tabla.
+
+    Las referencias del cambio (estado, responsable, tipo de PDF, ...) se
+    validan antes (422 si no existen). La respuesta trae los IDs modificados
+    solo si no pasan de BULK_RESULT_MAX_IDS; si no, solo el conteo.
+    """
+    errores = caso_service.referencias_inexistentes(db, lote.cambios.model_dump(exclude_unset=True))
+    if errores:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errores)
+
+    try:
+        ids = caso_service.update_casos_bulk(db, lote.cambios, ids=lote.ids, filters=lote.filtro)
+    except IntegrityError:
+        # Una referencia borrada entre la validación y el UPDATE
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El cambio viola una referencia; reintente")
+
+    # Un evento por caso modificado, insertados en un solo lote
+    detalles = lote.cambios.model_dump(mode="json", exclude_unset=True)
+    detalles["masivo"] = True
+    auditoria_service.registrar_acciones(
+        db=db,
+        accion="actualizar",
+        eventos=[(caso_id, detalles) for caso_id in ids],
+        usuario_id=current_user.id,
+        **client_info
+    )
+
+    return CasoBulkUpdateResult(
+        actualizados=len(ids),
+        ids=ids if len(ids) <= settings.BULK_RESULT_MAX_IDS else None
+    )
+
+
 @router.put("/{caso_id}", response_model=CasoResponse)
 async def update_caso(
     caso_id: uuid.UUID,
@@ -5,6 +5,7 @@ from typing import List
 from app.api.deps import get_db, get_admin_user
 from app.schemas.configuracion import ConfiguracionCreate, ConfiguracionResponse, ConfiguracionUpdate
 from app.models.models import Configuracion
+from app.services.configuracion_service import configuracion_service, parse_valor
 
 router = APIRouter()
 
@@ -45,6 +46,11 @@ async def create_configuracion(
     if existing:
         raise HTTPException(status_code=400, detail="La configuración ya existe")
 
+    try:
+        parse_valor(config.valor, config.tipoDato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     db_config = Configuracion(**config.model_dump())
     # Opcional: setear updatedBy en creación si se desea
     # db_config.updatedBy = current_user.id 
@@ -52,6 +58,7 @@ async def create_configuracion(
     db.add(db_config)
     db.commit()
     db.refresh(db_config)
+    configuracion_service.recargar(db)
     return db_config
 
 
@@ -68,6 +75,12 @@ async def update_configuracion(
         raise HTTPException(status_code=404, detail="Configuración no encontrada")
 
     update_data = config_update.model_dump(exclude_unset=True)
+    if update_data.get("valor") is not None:
+        try:
+            parse_valor(update_data["valor"], db_config.tipoDato)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     for field, value in update_data.items():
         setattr(db_config, field, value)
 
@@ -76,6 +89,8 @@ async def update_configuracion(
 
     db.commit()
     db.refresh(db_config)
+    # Este worker ve el cambio ya; los demás en CONFIGURACION_REFRESH_SECONDS
+    configuracion_service.recargar(db)
     return db_config
 
 
@@ -92,4 +107,5 @@ async def delete_configuracion(
 
     db.delete(db_config)
     db.commit()
+    configuracion_service.recargar(db)
     return None
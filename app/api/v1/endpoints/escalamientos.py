@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from collections import Counter
 import uuid
 
 from app.api.deps import get_db, get_current_user_dep, get_client_info
 from app.schemas.escalamiento import EscalamientoCreate, EscalamientoResponse
 from app.models.models import Escalamiento, Caso
+from app.services.dashboard_service import dashboard_service, ESCALAMIENTOS
 # from app.services.auditoria_service import auditoria_service
 # from app.services.email_service import email_service
 
@@ -66,7 +68,8 @@ async def create_escalamiento(
     # Actualizar responsable del caso
     caso.responsableId = escalamiento.aUsuarioId
     # TODO: Actualizar estado del caso si es necesario (ej: buscando ID de estado 'Escalado')
-    
+
+    dashboard_service.aplicar(db, Counter({(ESCALAMIENTOS, ""): 1}))
     db.commit()
     db.refresh(db_escalamiento)
 
@@ -1,100 +1,94 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
 from datetime import datetime, timedelta
 
-from app.api.deps import get_db, get_current_user_dep
-from app.models.models import Caso, Escalamiento, EstadoCaso, Semaforo
+from app.api.deps import get_current_user_read_dep
+from app.config import settings
+from app.core.response_cache import ResponseCache
+from app.database import read_session
+from app.services.dashboard_service import dashboard_service
+from app.services.resumen_mensual_service import resumen_mensual_service
+from app.services.tiempos_respuesta_service import tiempos_respuesta_service
 
 router = APIRouter()
 
+# Los reportes no dependen del usuario: una respuesta calculada sirve a todos
+# durante REPORTES_CACHE_TTL_SECONDS
+reportes_cache = ResponseCache("reportes", settings.REPORTES_CACHE_TTL_SECONDS)
 
-@router.get("/dashboard")
-async def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
-) -> Dict[str, Any]:
-    """Obtener estadísticas para el dashboard"""
-
-    # Total de casos
-    total_casos = db.query(func.count(Caso.id)).scalar()
-
-    # Casos por estado
-    # Join con EstadoCaso para obtener nombre si fuera necesario, o solo agrupar por ID
-    # Aquí tratamos de obtener el nombre si es posible, si no, ID
-    casos_por_estado_query = db.query(
-        EstadoCaso.descripcion,
-        func.count(Caso.id)
-    ).join(EstadoCaso, Caso.estadoCasoId == EstadoCaso.id).group_by(EstadoCaso.descripcion).all()
-    
-    casos_por_estado = {desc: count for desc, count in casos_por_estado_query}
 
-    # Casos por tipo trámite
-    # Nota: TipoTramite es string en Caso ("tipoTramite"), pero si hubiera tabla catalogo...
-    # En el modelo Caso, 'tipoTramite' es string. En el SQL habia 'tab_tipotramite'? 
-    # Revisando models.py: `tipoTramite = Column(String(50))` en Caso.
-    # No hay FK a TipoTramite en Caso en mi models.py actualizado (checkear).
-    # Si es string, agrupamos por string.
-    casos_por_tipo_query = db.query(
-        Caso.tipoTramite,
-        func.count(Caso.id)
-    ).group_by(Caso.tipoTramite).all()
-    
-    casos_por_tipo = {tipo: count for tipo, count in casos_por_tipo_query}
+def _con_sesion(leer: Callable[[Session], Any]) -> Callable[[], Any]:
+    """
+    Cálculo para la caché con su propia sesión de lectura: lo comparten
+    peticiones simultáneas y puede seguir después de que termine (y cierre
+    su sesión) la que lo inició.
+    """
+    def calcular():
+        with read_session() as db:
+            return leer(db)
 
-    # Casos por semáforo (prioridad)
-    casos_por_semaforo_query = db.query(
-        Semaforo.colorHex, # O descripcion/nombre
-        func.count(Caso.id)
-    ).join(Semaforo, Caso.semaforoId == Semaforo.id).group_by(Semaforo.colorHex).all()
-    
-    casos_por_prioridad = {color: count for color, count in casos_por_semaforo_query}
+    return calcular
 
-    # Escalamientos (Total)
-    escalamientos_total = db.query(func.count(Escalamiento.id)).scalar()
 
-    # Casos vencidos (fechaVencimiento < now y estado no cerrado)
-    # Asumimos estado cerrado tiene algun ID o flag 'activo' en EstadoCaso?
-    # EstadoCaso tiene 'activo' boolean, pero eso es si el estado está habilitado en catalogo.
-    # Necesitamos saber qué ID es "cerrado". Por ahora chequeamos solo fecha.
-    casos_vencidos = db.query(func.count(Caso.id)).filter(
-        Caso.fechaVencimiento < datetime.utcnow()
-        # , Caso.estadoCasoId != ID_CERRADO # TODO: Definir ID cerrado
-    ).scalar()
-
-    # Casos creados últimos 7 días
-    fecha_semana = datetime.utcnow() - timedelta(days=7)
-    casos_ultima_semana = db.query(func.count(Caso.id)).filter(
-        Caso.createdAt >= fecha_semana
-    ).scalar()
+@router.get("/dashboard")
+async def get_dashboard_stats(
+    request: Request,
+    current_user = Depends(get_current_user_read_dep)
+) -> Dict[str, Any]:
+    """
+    Obtener estadísticas para el dashboard.
 
-    return {
-        "total_casos": total_casos,
-        "casos_por_estado": casos_por_estado,
-        "casos_por_tipo": casos_por_tipo,
-        "casos_por_prioridad": casos_por_prioridad,
-        "escalamientos_total": escalamientos_total,
-        "casos_vencidos": casos_vencidos,
-        "casos_ultima_semana": casos_ultima_semana
-    }
+    Se leen los contadores pre-agregados de tab_contadordashboard (una
+    consulta de pocas filas), que mantienen las escrituras de casos y
+    escalamientos y reconcilia periódicamente el scheduler.
+    """
+    return await reportes_cache.responder(request, _con_sesion(dashboard_service.leer))
 
 
 @router.get("/casos-mensuales")
 async def get_casos_mensuales(
-    meses: int = 12,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
+    request: Request,
+    meses: int = Query(12, ge=1, le=60),
+    tipo_tramite: Optional[str] = None,
+    responsable_id: Optional[int] = None,
+    current_user = Depends(get_current_user_read_dep)
 ):
-    """Obtener casos por mes"""
-    # Simplificado - implementar lógica completa según necesidades
-    return {"message": "Reporte de casos mensuales"}
+    """
+    Obtener casos recibidos por mes (los últimos `meses`, incluido el actual),
+    con el desglose por tipo de trámite, estado y responsable.
+
+    Se lee tab_resumenmensualcaso (unas filas por mes), que mantiene el job
+    resumen_mensual_job; los casos de los últimos minutos pueden no estar.
+    """
+    return await reportes_cache.responder(
+        request,
+        _con_sesion(lambda db: resumen_mensual_service.leer(
+            db, meses, tipo_tramite=tipo_tramite, responsable_id=responsable_id
+        ))
+    )
 
 
 @router.get("/tiempos-respuesta")
 async def get_tiempos_respuesta(
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user_dep)
+    request: Request,
+    meses: int = Query(12, ge=1, le=60),
+    tipo_tramite: Optional[str] = None,
+    responsable_id: Optional[int] = None,
+    current_user = Depends(get_current_user_read_dep)
 ):
-    """Obtener métricas de tiempos de respuesta"""
-    return {"message": "Reporte de tiempos de respuesta"}
+    """
+    Obtener percentiles (p50, p90, p99) y promedio de horas entre la
+    recepción y el envío de la respuesta: totales, por tipo de trámite,
+    por responsable y por mes de cierre.
+
+    Se fusionan los t-digests de tab_sketchtiemporespuesta de los buckets
+    del período, sin ordenar los casos.
+    """
+    return await reportes_cache.responder(
+        request,
+        _con_sesion(lambda db: tiempos_respuesta_service.leer(
+            db, meses, tipo_tramite=tipo_tramite, responsable_id=responsable_id
+        ))
+    )
@@ -5,7 +5,7 @@ from typing import List
 from app.api.deps import get_db, get_current_user_dep, get_admin_user
 from app.schemas.usuario import UsuarioCreate, UsuarioResponse, UsuarioUpdate
 from app.models.models import Usuario
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 
 router = APIRouter()
 
@@ -50,7 +50,7 @@ async def create_usuario(
     db_usuario = Usuario(
         nombre=usuario.nombre,
         correo=usuario.correo,
-        passwordHash=get_password_hash(usuario.password),
+        passwordHash=await get_password_hash_async(usuario.password),
     )
     db.add(db_usuario)
     db.commit()
@@ -76,7 +76,7 @@ async def update_usuario(
     if "password" in update_data:
         password = update_data.pop("password")
         if password:
-             db_usuario.passwordHash = get_password_hash(password)
+             db_usuario.passwordHash = await get_password_hash_async(password)
 
     for field, value in update_data.items():
         setattr(db_usuario, field, value)
@@ -12,12 +12,43 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    # Opcional: URL async explícita; por defecto se deriva de DATABASE_URL (pyodbc -> aioodbc)
+    DATABASE_ASYNC_URL: Optional[str] = None
+    # Réplica de lectura opcional para reportes y listados
+    DATABASE_READ_URL: Optional[str] = None
+    READ_REPLICA_MAX_LAG_SECONDS: int = 30       # Desactualización tolerada por defecto
+    READ_REPLICA_HEALTH_CHECK_SECONDS: int = 10  # Frecuencia del chequeo de salud
+
+    # Pool de conexiones OLTP (por worker: el total hacia SQL Server es
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30       # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 3600     # Reciclar conexiones cada hora
+    DB_CONNECT_TIMEOUT: int = 30    # Timeout al abrir una conexión nueva
+
+    # Pool de reportes/listados (réplica si existe, si no el primario)
+    DB_REPORTING_POOL_SIZE: int = 3
+    DB_REPORTING_MAX_OVERFLOW: int = 5
+    DB_REPORTING_POOL_TIMEOUT: int = 10
 
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_HOURS: int = 8
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Hash de contraseñas (argon2) en un pool propio: hilos y operaciones en cola admitidas
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDIENTES: int = 64
+    # Usuario autenticado en memoria (por worker): TTL y tope de entradas (TTL 0 = sin caché)
+    USUARIOS_CACHE_TTL_SECONDS: int = 60
+    USUARIOS_CACHE_MAX: int = 10000
+    # Sesiones revocadas en memoria: lectura incremental de tab_sesion (0 = nunca)
+    REVOCACIONES_REFRESH_SECONDS: int = 5
+    # Purga nocturna de sesiones expiradas (0 = no se purga)
+    SESIONES_RETENCION_DIAS: int = 30    # Días que se conserva una sesión tras expirar
+    SESIONES_PURGA_LOTE: int = 1000      # Filas por DELETE
+    SESIONES_PURGA_PAUSA_MS: int = 200   # Pausa entre lotes
 
     # Microsoft Graph
     MICROSOFT_CLIENT_ID: Optional[str] = None
@@ -25,10 +56,60 @@ class Settings(BaseSettings):
     MICROSOFT_TENANT_ID: Optional[str] = None
     MAILBOX_ADDRESS: Optional[str] = None
 
+    # Cliente HTTP compartido hacia Graph (uno por proceso, abierto en el lifespan)
+    GRAPH_BASE_URL: str = "https://graph.microsoft.com/v1.0"
+    GRAPH_LOGIN_URL: str = "https://login.microsoftonline.com"
+    GRAPH_HTTP2: bool = False                # Requiere el paquete h2 (httpx[http2])
+    GRAPH_MAX_CONNECTIONS: int = 20
+    GRAPH_MAX_KEEPALIVE: int = 10
+    GRAPH_KEEPALIVE_SECONDS: int = 60        # Conexiones ociosas se cierran pasado este tiempo
+    GRAPH_CONNECT_TIMEOUT: int = 5
+    GRAPH_TIMEOUT_SECONDS: int = 30          # Lecturas (mensajes, adjuntos)
+    GRAPH_SEND_TIMEOUT_SECONDS: int = 120    # Envío de correo con adjuntos
+
     # File Upload
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE_MB: int = 10
 
+    # Búsqueda de casos (índice invertido en memoria)
+    SEARCH_INDEX_ENABLED: bool = True
+    SEARCH_MAX_RESULTS: int = 1000  # Tope de IDs por búsqueda (SQL Server admite 2100 parámetros)
+
+    # Catálogos en memoria: cada cuánto se comprueba si cambiaron en la base (0 = nunca)
+    CATALOGOS_REFRESH_SECONDS: int = 60
+
+    # tab_configuracion en memoria: propagación de cambios entre workers (0 = nunca)
+    CONFIGURACION_REFRESH_SECONDS: int = 5
+
+    # Contadores del dashboard: reconciliación con tab_caso (0 = nunca)
+    DASHBOARD_RECONCILE_MINUTES: int = 15
+
+    # Resumen mensual de casos: actualización incremental (0 = nunca)
+    RESUMEN_MENSUAL_MINUTES: int = 10
+
+    # Sketches de tiempos de respuesta: reconstrucción nocturna e inicial
+    TIEMPOS_RESPUESTA_RECONSTRUIR: bool = True
+
+    # Caché de respuestas de /reportes (0 = solo se agrupan peticiones simultáneas)
+    REPORTES_CACHE_TTL_SECONDS: int = 30
+
+    # Carga masiva de casos (POST /casos/bulk)
+    BULK_MAX_ROWS: int = 5000       # Registros por petición
+    BULK_CHUNK_SIZE: int = 500      # Registros por transacción
+    BULK_RESULT_MAX_IDS: int = 1000  # PUT /casos/bulk: por encima solo se devuelve el conteo
+
+    # Auditoría: escritura por lotes en segundo plano con spool en disco
+    AUDITORIA_ASINCRONA: bool = True
+    AUDITORIA_LOTE: int = 200            # Eventos por INSERT
+    AUDITORIA_INTERVALO_MS: int = 500    # Espera máxima antes de escribir un lote incompleto
+    AUDITORIA_SPOOL_DIR: str = "./spool/auditoria"
+    AUDITORIA_FSYNC: bool = False        # fsync por evento (sobrevive a caídas del servidor, no solo del proceso)
+    # tab_auditoriaevento particionada por mes (sql/005): job que crea las particiones futuras
+    AUDITORIA_PARTICIONADA: bool = False
+
+    # Exportación de casos (GET /casos/export)
+    EXPORT_YIELD_PER: int = 1000    # Filas por lote del cursor del servidor
+
     # CORS
     CORS_ORIGINS: str = '["http://localhost:5173"]'
 
@@ -0,0 +1,346 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (desarrollo, un solo worker)
+    fcntl = None
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.database import SessionLocal
+from app.models.models import AuditoriaEvento
+
+logger = logging.getLogger(__name__)
+
+eventos_encolados = metrics.counter("auditoria_eventos_encolados_total", "Eventos de auditoría recibidos por el writer")
+eventos_escritos = metrics.counter("auditoria_eventos_escritos_total", "Eventos de auditoría escritos en la base")
+lotes_fallidos = metrics.counter("auditoria_lotes_fallidos_total", "Lotes de auditoría que fallaron (se reintentan)")
+eventos_rechazados = metrics.counter(
+    "auditoria_eventos_rechazados_total", "Eventos de auditoría que la base rechaza (van a rechazados/)"
+)
+
+Fila = Dict[str, Any]
+
+
+def _codificar(fila: Fila) -> str:
+    datos = dict(fila)
+    if datos.get("casoId") is not None:
+        datos["casoId"] = str(datos["casoId"])
+    if datos.get("fechaEvento") is not None:
+        datos["fechaEvento"] = datos["fechaEvento"].isoformat()
+    return json.dumps(datos, ensure_ascii=False)
+
+
+def _decodificar(linea: str) -> Fila:
+    datos = json.loads(linea)
+    if datos.get("casoId") is not None:
+        datos["casoId"] = uuid.UUID(datos["casoId"])
+    if datos.get("fechaEvento") is not None:
+        datos["fechaEvento"] = datetime.fromisoformat(datos["fechaEvento"])
+    return datos
+
+
+# SQLSTATE de errores que se resuelven reintentando: deadlock y timeout
+_SQLSTATE_TRANSITORIOS = ("40001", "HYT00", "HYT01")
+
+
+def es_transitorio(error: Exception) -> bool:
+    """
+    True si el error es de conexión o concurrencia y el mismo lote puede
+    escribirse más tarde. Los demás (FK, datos inválidos, ...) dependen de
+    las filas y reintentarlas no cambia el resultado.
+    """
+    if isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError)):
+        return True
+    if isinstance(error, DBAPIError):
+        if error.connection_invalidated:
+            return True
+        args = getattr(error.orig, "args", ())
+        return bool(args) and str(args[0]) in _SQLSTATE_TRANSITORIOS
+    return False
+
+
+def guardar_en_bd(filas: List[Fila]):
+    """Un INSERT multi-fila (executemany) y un commit por lote"""
+    with SessionLocal() as db:
+        db.execute(insert(AuditoriaEvento), filas)
+        db.commit()
+
+
+class _Segmento:
+    """
+    Archivo de spool con los eventos de un lote, abierto y bloqueado por el
+    proceso que lo escribe. Se borra cuando el lote queda en la base.
+    """
+
+    def __init__(self, ruta: str, archivo, filas: Optional[List[Fila]] = None):
+        self.ruta = ruta
+        self.archivo = archivo
+        self.filas: List[Fila] = filas or []
+
+    @staticmethod
+    def _bloquear(archivo) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    @classmethod
+    def crear(cls, ruta: str) -> "_Segmento":
+        # Se bloquea con un nombre temporal: la recuperación solo mira *.jsonl,
+        # así nunca adopta un segmento que otro proceso está creando
+        temporal = ruta + ".nuevo"
+        archivo = open(temporal, "a", encoding="utf-8")
+        cls._bloquear(archivo)
+        os.replace(temporal, ruta)
+        return cls(ruta, archivo)
+
+    @classmethod
+    def adoptar(cls, ruta: str) -> Optional["_Segmento"]:
+        """Abrir un segmento huérfano (proceso caído); None si otro proceso lo tiene"""
+        try:
+            archivo = open(ruta, "a+", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        if not cls._bloquear(archivo):
+            archivo.close()
+            return None
+        archivo.seek(0)
+        filas = []
+        for linea in archivo.read().splitlines():
+            try:
+                filas.append(_decodificar(linea))
+            except ValueError:
+                # Última línea a medio escribir cuando el proceso murió
+                logger.warning(f"Línea de auditoría ilegible en {ruta}")
+        return cls(ruta, archivo, filas)
+
+    def agregar(self, fila: Fila, fsync: bool):
+        self.archivo.write(_codificar(fila) + "\n")
+        self.archivo.flush()
+        if fsync:
+            os.fsync(self.archivo.fileno())
+        self.filas.append(fila)
+
+    def cerrar(self):
+        self.archivo.close()
+
+    def descartar(self):
+        self.archivo.close()
+        os.remove(self.ruta)
+
+
+class AuditoriaWriter:
+    """
+    Escritura de eventos de auditoría fuera del request.
+
+    `registrar` añade las filas al segmento actual del spool (una línea
+    JSON por evento, en disco antes de volver) y a memoria. Un hilo de
+    fondo las escribe con un INSERT multi-fila cuando el segmento llega a
+    `tamano_lote` eventos o cada `intervalo_ms`; si la base falla, el
+    segmento se reintenta en la siguiente pasada si el error es transitorio
+    (conexión, deadlock); los eventos que la base rechaza por sus datos se
+    apartan en `rechazados/` y el resto del lote se escribe. `detener`
+    (shutdown del lifespan) vacía lo pendiente.
+
+    Los segmentos de un proceso que murió quedan en el spool y el próximo
+    que arranque los adopta (entrega al menos una vez: un proceso que cae
+    entre el commit y el borrado del archivo produce duplicados).
+    """
+
+    def __init__(
+        self,
+        spool_dir: str,
+        tamano_lote: int = 200,
+        intervalo_ms: int = 500,
+        fsync: bool = False,
+        guardar: Callable[[List[Fila]], None] = guardar_en_bd,
+    ):
+        self.spool_dir = spool_dir
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo_ms / 1000
+        self.fsync = fsync
+        self._guardar = guardar
+        self._lock = threading.Lock()
+        self._hay_lote = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._prefijo = uuid.uuid4().hex[:12]
+        self._secuencia = 0
+        self._actual: Optional[_Segmento] = None
+        self._en_vuelo: List[_Segmento] = []
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    @property
+    def pendientes(self) -> int:
+        with self._lock:
+            actual = len(self._actual.filas) if self._actual else 0
+            return actual + sum(len(s.filas) for s in self._en_vuelo)
+
+    def _nuevo_segmento(self) -> _Segmento:
+        self._secuencia += 1
+        return _Segmento.crear(os.path.join(self.spool_dir, f"{self._prefijo}-{self._secuencia:08d}.jsonl"))
+
+    def _recuperar(self) -> int:
+        recuperados = 0
+        for ruta in sorted(glob.glob(os.path.join(self.spool_dir, "*.jsonl"))):
+            segmento = _Segmento.adoptar(ruta)
+            if segmento is None:
+                continue
+            if segmento.filas:
+                self._en_vuelo.append(segmento)
+                recuperados += len(segmento.filas)
+            else:
+                segmento.descartar()
+        return recuperados
+
+    def iniciar(self):
+        """Adoptar segmentos huérfanos y arrancar el hilo de escritura"""
+        if self.activo:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        recuperados = self._recuperar()
+        if recuperados:
+            logger.warning(f"Auditoría: {recuperados} eventos recuperados del spool")
+        self._actual = self._nuevo_segmento()
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="auditoria-writer", daemon=True)
+        self._hilo.start()
+
+    def registrar(self, filas: List[Fila]) -> bool:
+        """
+        Encolar eventos (ya en disco al volver). False si el writer se detuvo
+        entre la comprobación de `activo` y esta llamada (shutdown): quien
+        llama los inserta directamente.
+        """
+        with self._lock:
+            if self._actual is None:
+                return False
+            for fila in filas:
+                self._actual.agregar(fila, self.fsync)
+            lleno = len(self._actual.filas) >= self.tamano_lote
+        eventos_encolados.inc(len(filas))
+        if lleno:
+            self._hay_lote.set()
+        return True
+
+    def _ejecutar(self):
+        while not self._detener.is_set():
+            self._hay_lote.wait(self.intervalo)
+            self._hay_lote.clear()
+            self._despachar()
+        self._despachar()
+
+    def _rechazar(self, fila: Fila, error: Exception):
+        """Apartar un evento que la base no acepta, con el motivo"""
+        directorio = os.path.join(self.spool_dir, "rechazados")
+        os.makedirs(directorio, exist_ok=True)
+        linea = json.dumps({"evento": json.loads(_codificar(fila)), "error": str(error)[:500]}, ensure_ascii=False)
+        with open(os.path.join(directorio, f"{self._prefijo}.jsonl"), "a", encoding="utf-8") as archivo:
+            archivo.write(linea + "\n")
+        eventos_rechazados.inc()
+        logger.error(f"Auditoría: evento rechazado por la base, apartado en {directorio}: {error}")
+
+    def _guardar_segmento(self, segmento: _Segmento):
+        """
+        Escribir el segmento. Si la base rechaza el lote por sus datos (p. ej.
+        FK de un caso borrado antes del flush) se parte en mitades hasta
+        aislar las filas inválidas, que se apartan; las demás se escriben.
+        Las filas escritas salen de `segmento.filas`, así un error
+        transitorio a mitad de camino no las duplica al reintentar.
+        Los errores transitorios se propagan.
+        """
+        pendientes = [segmento.filas]
+        while pendientes:
+            parte = pendientes.pop()
+            try:
+                self._guardar(parte)
+                escritas = len(parte)
+            except Exception as e:
+                if es_transitorio(e):
+                    raise
+                if len(parte) > 1:
+                    mitad = len(parte) // 2
+                    pendientes.extend([parte[mitad:], parte[:mitad]])
+                    continue
+                self._rechazar(parte[0], e)
+                escritas = 0
+            ids = {id(f) for f in parte}
+            with self._lock:
+                segmento.filas = [f for f in segmento.filas if id(f) not in ids]
+            eventos_escritos.inc(escritas)
+
+    def _despachar(self) -> bool:
+        """Escribir lo pendiente. Devuelve False si quedó algo sin escribir"""
+        with self._lock:
+            # Sin segmento actual: `detener` ya cerró el spool tras vencer su espera
+            if self._actual is None:
+                return False
+            if self._actual.filas:
+                self._en_vuelo.append(self._actual)
+                self._actual = self._nuevo_segmento()
+            segmentos = list(self._en_vuelo)
+
+        for segmento in segmentos:
+            try:
+                self._guardar_segmento(segmento)
+            except Exception as e:
+                # Conexión o concurrencia: este y los siguientes se reintentan en la próxima pasada
+                lotes_fallidos.inc()
+                logger.error(f"Auditoría: no se pudo escribir un lote de {len(segmento.filas)} eventos: {e}")
+                return False
+            with self._lock:
+                self._en_vuelo.remove(segmento)
+            segmento.descartar()
+        return True
+
+    def detener(self, timeout: float = 10):
+        """Vaciar la cola y parar el hilo. Lo que no se pueda escribir queda en el spool"""
+        if not self.activo:
+            return
+        self._detener.set()
+        self._hay_lote.set()
+        self._hilo.join(timeout)
+        self._hilo = None
+        with self._lock:
+            restantes = sum(len(s.filas) for s in self._en_vuelo)
+            for segmento in self._en_vuelo:
+                segmento.cerrar()
+            self._en_vuelo = []
+            if self._actual.filas:
+                restantes += len(self._actual.filas)
+                self._actual.cerrar()
+            else:
+                self._actual.descartar()
+            self._actual = None
+        if restantes:
+            logger.error(f"Auditoría: {restantes} eventos quedan en {self.spool_dir} para el próximo arranque")
+
+
+auditoria_writer = AuditoriaWriter(
+    spool_dir=settings.AUDITORIA_SPOOL_DIR,
+    tamano_lote=settings.AUDITORIA_LOTE,
+    intervalo_ms=settings.AUDITORIA_INTERVALO_MS,
+    fsync=settings.AUDITORIA_FSYNC,
+)
+
+metrics.gauge(
+    "auditoria_eventos_pendientes",
+    "Eventos de auditoría en cola sin escribir en la base",
+    funcion=lambda: {(): auditoria_writer.pendientes},
+)
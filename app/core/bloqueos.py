@@ -0,0 +1,52 @@
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+
+# sp_getapplock devuelve 0/1 si concede el bloqueo y < 0 si vence la espera
+MSSQL_APPLOCK = text(
+    "SET NOCOUNT ON; "
+    "DECLARE @resultado INT; "
+    "EXEC @resultado = sp_getapplock @Resource = :recurso, @LockMode = 'Exclusive', "
+    "@LockOwner = 'Transaction', @LockTimeout = :espera_ms; "
+    "SELECT @resultado"
+)
+
+
+def _es_mssql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "mssql"
+
+
+def bloqueo_aplicacion(db: Session, recurso: str, espera_ms: int = 0) -> bool:
+    """
+    Tomar el bloqueo exclusivo `recurso` para la transacción actual de `db`
+    (se libera con su commit o rollback). False si otro proceso lo tiene y
+    no se liberó en `espera_ms`.
+
+    Cada worker de uvicorn arranca su propio scheduler: los jobs de
+    mantenimiento lo toman con espera 0 para que solo uno de ellos corra.
+    En SQLite (desarrollo y pruebas, un solo proceso) siempre se concede.
+    """
+    if not _es_mssql(db):
+        return True
+    resultado = db.execute(MSSQL_APPLOCK, {"recurso": recurso, "espera_ms": espera_ms}).scalar()
+    return resultado is not None and resultado >= 0
+
+
+def consulta_bloqueo_tabla(modelo):
+    """SELECT que deja la tabla de `modelo` con bloqueo exclusivo hasta el commit (SQL Server)"""
+    return (
+        select(modelo.id)
+        .with_hint(modelo, "WITH (TABLOCKX, HOLDLOCK)", "mssql")
+        .limit(1)
+    )
+
+
+def bloquear_tabla(db: Session, modelo):
+    """
+    Bloquear la tabla de `modelo` antes de recalcularla desde las tablas
+    fuente: las escrituras que la actualizan en su propia transacción
+    esperan al commit en lugar de perderse entre la lectura y el reemplazo.
+    SQLite ya serializa las escrituras de toda la base.
+    """
+    if _es_mssql(db):
+        db.execute(consulta_bloqueo_tabla(modelo))
@@ -0,0 +1,192 @@
+from sqlalchemy import event, select, func, literal, literal_column, union_all
+from sqlalchemy.orm import Session, object_session
+from typing import Dict, List, Optional, Type, Any
+import hashlib
+import logging
+import threading
+
+from app.models.models import EstadoCaso, Semaforo, TipoPDF, EstadoEnvio, TipoAdjunto, TipoAccion
+from app.schemas.catalogo import (
+    EstadoCasoResponse, SemaforoResponse, TipoPDFResponse, EstadoEnvioResponse,
+    TipoAdjuntoResponse, TipoAccionResponse
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Tablas de catálogo y el esquema con que se sirven
+CATALOGOS = {
+    EstadoCaso: EstadoCasoResponse,
+    Semaforo: SemaforoResponse,
+    TipoPDF: TipoPDFResponse,
+    EstadoEnvio: EstadoEnvioResponse,
+    TipoAdjunto: TipoAdjuntoResponse,
+    TipoAccion: TipoAccionResponse,
+}
+
+
+class CatalogoRegistry:
+    """
+    Catálogos (tab_estadocaso, tab_semaforo, ...) cargados una vez en memoria.
+
+    Las consultas por id o por código no tocan la base de datos. Cada
+    entrada es el esquema de respuesta del catálogo, inmutable y listo para
+    serializar.
+
+    - Una escritura ORM sobre un catálogo en este proceso invalida el
+      registro al hacer commit (eventos de mapper + after_commit).
+    - `refrescar` (job del scheduler) recoge cambios hechos por otros
+      workers o por SQL. En SQL Server compara antes un checksum por tabla
+      (una sola consulta) y solo relee los catálogos si cambió.
+    - Si está invalidado, la siguiente consulta lo recarga. `en_memoria` (la
+      usan los esquemas al serializar) nunca consulta la base: la app carga
+      el registro al iniciar y la dependency catalogos_vigentes lo recarga
+      antes del endpoint si un commit lo invalidó.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_id: Dict[type, Dict[int, Any]] = {}
+        self._por_codigo: Dict[type, Dict[str, Any]] = {}
+        self.version: Optional[str] = None
+        self.cargado = False
+        # Checksums por tabla de la última carga (solo SQL Server)
+        self._checksums: Optional[tuple] = None
+
+    # -----------------------------------------
+    # Carga
+    # -----------------------------------------
+
+    @staticmethod
+    def _leer(db: Session):
+        por_id, por_codigo = {}, {}
+        huella = hashlib.sha1()
+        for modelo, esquema in CATALOGOS.items():
+            filas = db.execute(select(modelo).order_by(modelo.id)).scalars().all()
+            entradas = [esquema.model_validate(f) for f in filas]
+            por_id[modelo] = {e.id: e for e in entradas}
+            por_codigo[modelo] = {e.codigo: e for e in entradas}
+            huella.update(modelo.__tablename__.encode())
+            for e in entradas:
+                huella.update(e.model_dump_json().encode())
+        return por_id, por_codigo, huella.hexdigest()
+
+    def cargar(self, db: Session) -> bool:
+        """Leer todos los catálogos. Devuelve True si cambiaron respecto a lo cargado"""
+        por_id, por_codigo, version = self._leer(db)
+        with self._lock:
+            cambio = version != self.version
+            self._por_id, self._por_codigo = por_id, por_codigo
+            self.version = version
+            self.cargado = True
+        if cambio:
+            logger.info(f"Catálogos cargados (versión {version[:8]})")
+        return cambio
+
+    @staticmethod
+    def consulta_checksums():
+        """Filas, y checksum de su contenido, de cada catálogo en un solo SELECT"""
+        return union_all(*(
+            select(
+                literal(modelo.__tablename__),
+                func.count(),
+                func.checksum_agg(func.binary_checksum(literal_column("*")))
+            ).select_from(modelo)
+            for modelo in CATALOGOS
+        ))
+
+    def _leer_checksums(self, db: Session) -> Optional[tuple]:
+        if db.get_bind().dialect.name != "mssql":
+            return None
+        return tuple(tuple(fila) for fila in db.execute(self.consulta_checksums()))
+
+    def refrescar(self, db: Session) -> bool:
+        """Chequeo periódico de versión (ver scheduler)"""
+        checksums = self._leer_checksums(db)
+        if checksums is not None and self.cargado and checksums == self._checksums:
+            return False
+        cambio = self.cargar(db)
+        # Si algo cambió entre ambas lecturas, el próximo chequeo vuelve a cargar
+        self._checksums = checksums
+        return cambio
+
+    def invalidar(self):
+        with self._lock:
+            self.cargado = False
+
+    def _asegurar(self, db: Optional[Session]):
+        if self.cargado:
+            return
+        if db is not None:
+            self.cargar(db)
+            return
+        from app.database import SessionLocal
+        with SessionLocal() as propia:
+            self.cargar(propia)
+
+    def asegurar(self):
+        """Cargar el registro, con su propia sesión, si está invalidado"""
+        self._asegurar(None)
+
+    # -----------------------------------------
+    # Consulta
+    # -----------------------------------------
+
+    def en_memoria(self, modelo: Type, id_valor: Optional[int]):
+        """
+        Como por_id pero sin tocar la base, para serializar (validators de
+        pydantic, event loop). Si el registro está invalidado sirve lo último
+        cargado; si nunca se cargó es un error de arranque, no un miss.
+        """
+        if id_valor is None:
+            return None
+        if self.version is None:
+            raise RuntimeError("Catálogos sin cargar: se cargan al iniciar la app (catalogos.cargar)")
+        return self._por_id.get(modelo, {}).get(id_valor)
+
+    def por_id(self, modelo: Type, id_valor: Optional[int], db: Optional[Session] = None):
+        """Entrada del catálogo con ese id (None si no existe)"""
+        if id_valor is None:
+            return None
+        self._asegurar(db)
+        return self._por_id.get(modelo, {}).get(id_valor)
+
+    def por_codigo(self, modelo: Type, codigo: str, db: Optional[Session] = None):
+        """Entrada del catálogo con ese código (None si no existe)"""
+        self._asegurar(db)
+        return self._por_codigo.get(modelo, {}).get(codigo)
+
+    def listar(self, modelo: Type, db: Optional[Session] = None) -> List[Any]:
+        """Todas las entradas del catálogo, ordenadas por id"""
+        self._asegurar(db)
+        return list(self._por_id.get(modelo, {}).values())
+
+
+catalogos = CatalogoRegistry()
+
+
+# -----------------------------------------
+# Invalidación al escribir en un catálogo
+# -----------------------------------------
+
+def _marcar_sesion(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["catalogos_modificados"] = True
+
+
+for _modelo in CATALOGOS:
+    for _evento in ("after_insert", "after_update", "after_delete"):
+        event.listen(_modelo, _evento, _marcar_sesion)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_tras_commit(session):
+    # Se invalida después del commit: recargar antes leería datos sin confirmar
+    if session.info.pop("catalogos_modificados", False):
+        catalogos.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_marca(session):
+    session.info.pop("catalogos_modificados", None)
@@ -0,0 +1,148 @@
+from typing import Dict, Tuple, Callable, Iterable, List, Optional
+import bisect
+import threading
+
+
+# Buckets por defecto (segundos) pensados para esperas de pool y latencias de I/O
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _formatear_labels(labelnames: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    partes = [f'{k}="{v}"' for k, v in zip(labelnames, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, descripcion: str, labelnames: Iterable[str] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _clave(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _cabecera(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Counter(_Metrica):
+    """Contador monótono"""
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, cantidad: float = 1, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valor(self, **labels) -> float:
+        return self._valores.get(self._clave(labels), 0)
+
+    def render(self) -> List[str]:
+        lineas = self._cabecera()
+        with self._lock:
+            for clave, valor in sorted(self._valores.items()):
+                lineas.append(f"{self.nombre}{_formatear_labels(self.labelnames, clave)} {valor}")
+        return lineas
+
+
+class Gauge(_Metrica):
+    """
+    Valor instantáneo. Puede fijarse con set() o calcularse al exportar
+    con una función que devuelve {(valores de labels): valor}.
+    """
+    tipo = "gauge"
+
+    def __init__(self, *args, funcion: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._funcion = funcion
+
+    def set(self, valor: float, **labels):
+        with self._lock:
+            self._valores[self._clave(labels)] = valor
+
+    def render(self) -> List[str]:
+        lineas = self._cabecera()
+        with self._lock:
+            valores = dict(self._valores)
+        if self._funcion:
+            valores.update(self._funcion())
+        for clave, valor in sorted(valores.items()):
+            lineas.append(f"{self.nombre}{_formatear_labels(self.labelnames, clave)} {valor}")
+        return lineas
+
+
+class Histogram(_Metrica):
+    """Histograma acumulado con buckets fijos"""
+    tipo = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # clave -> [conteos por bucket..., +Inf], suma
+        self._conteos: Dict[Tuple[str, ...], List[int]] = {}
+        self._sumas: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, valor: float, **labels):
+        clave = self._clave(labels)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            conteos = self._conteos.setdefault(clave, [0] * (len(self.buckets) + 1))
+            conteos[indice] += 1
+            self._sumas[clave] = self._sumas.get(clave, 0.0) + valor
+
+    def conteo(self, **labels) -> int:
+        return sum(self._conteos.get(self._clave(labels), []))
+
+    def render(self) -> List[str]:
+        lineas = self._cabecera()
+        with self._lock:
+            for clave in sorted(self._conteos):
+                acumulado = 0
+                for limite, conteo in zip(self.buckets + (float("inf"),), self._conteos[clave]):
+                    acumulado += conteo
+                    le = "+Inf" if limite == float("inf") else repr(limite)
+                    etiquetas = _formatear_labels(self.labelnames, clave, f'le="{le}"')
+                    lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+                etiquetas = _formatear_labels(self.labelnames, clave)
+                lineas.append(f"{self.nombre}_sum{etiquetas} {self._sumas[clave]}")
+                lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+class MetricsRegistry:
+    """Registro de métricas del proceso, exportadas en formato de texto Prometheus"""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+
+    def _registrar(self, metrica: _Metrica) -> _Metrica:
+        # Idempotente: módulos recargados reutilizan la métrica existente
+        return self._metricas.setdefault(metrica.nombre, metrica)
+
+    def counter(self, nombre: str, descripcion: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._registrar(Counter(nombre, descripcion, labelnames))
+
+    def gauge(self, nombre: str, descripcion: str, labelnames: Iterable[str] = (), funcion=None) -> Gauge:
+        return self._registrar(Gauge(nombre, descripcion, labelnames, funcion=funcion))
+
+    def histogram(self, nombre: str, descripcion: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._registrar(Histogram(nombre, descripcion, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.render())
+        return "\n".join(lineas) + "\n"
+
+
+metrics = MetricsRegistry()
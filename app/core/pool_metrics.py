@@ -0,0 +1,99 @@
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool, QueuePool
+from typing import Dict, Tuple, Type
+import time
+
+from app.core.metrics import metrics
+
+
+# Pools registrados por nombre ("oltp", "reporting", ...). Se guarda el engine
+# y no el pool porque engine.dispose() reemplaza el pool por uno nuevo.
+_engines: Dict[str, object] = {}
+
+
+def _pool_de(engine) -> Pool:
+    # AsyncEngine expone el pool en su sync_engine
+    return getattr(engine, "sync_engine", engine).pool
+
+
+def _leer_pools(lector) -> Dict[Tuple[str, ...], float]:
+    valores = {}
+    for nombre, engine in list(_engines.items()):
+        pool = _pool_de(engine)
+        if isinstance(pool, QueuePool):
+            valores[(nombre,)] = lector(pool)
+    return valores
+
+
+pool_wait_seconds = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Tiempo de espera para obtener una conexión del pool",
+    ["pool"],
+)
+pool_timeouts_total = metrics.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts que agotaron pool_timeout sin obtener conexión",
+    ["pool"],
+)
+pool_checkouts_total = metrics.counter(
+    "db_pool_checkouts_total",
+    "Conexiones entregadas por el pool",
+    ["pool"],
+)
+metrics.gauge(
+    "db_pool_connections_in_use",
+    "Conexiones prestadas en este momento",
+    ["pool"],
+    funcion=lambda: _leer_pools(lambda p: p.checkedout()),
+)
+metrics.gauge(
+    "db_pool_overflow",
+    "Conexiones abiertas por encima de pool_size (negativo: huecos libres del pool base)",
+    ["pool"],
+    funcion=lambda: _leer_pools(lambda p: p.overflow()),
+)
+metrics.gauge(
+    "db_pool_size",
+    "Tamaño configurado del pool base",
+    ["pool"],
+    funcion=lambda: _leer_pools(lambda p: p.size()),
+)
+
+
+def pool_instrumentado(base: Type[QueuePool], nombre: str) -> Type[QueuePool]:
+    """
+    Subclase de `base` (QueuePool o AsyncAdaptedQueuePool) que mide la
+    espera de cada checkout y cuenta los timeouts.
+
+    SQLAlchemy no emite un evento al *empezar* un checkout, por eso la espera
+    se mide envolviendo `_do_get`. El nombre viaja en la clase para que
+    sobreviva a `pool.recreate()` (engine.dispose()).
+    """
+
+    class PoolInstrumentado(base):
+        nombre_metricas = nombre
+
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                pool_timeouts_total.inc(pool=self.nombre_metricas)
+                raise
+            finally:
+                pool_wait_seconds.observe(time.perf_counter() - inicio, pool=self.nombre_metricas)
+
+    PoolInstrumentado.__name__ = f"{base.__name__}Instrumentado"
+    return PoolInstrumentado
+
+
+def registrar_engine(nombre: str, engine):
+    """Publicar las métricas del pool de un engine (sync o async) bajo `nombre`"""
+    _engines[nombre] = engine
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts_total.inc(pool=nombre)
+
+    return engine
@@ -0,0 +1,101 @@
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from typing import Optional, Any
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Retraso de la réplica en un Availability Group de SQL Server (desde la propia réplica)
+MSSQL_LAG_QUERY = text(
+    "SELECT secondary_lag_seconds FROM sys.dm_hadr_database_replica_states "
+    "WHERE is_local = 1 AND database_id = DB_ID()"
+)
+
+
+class ReadReplica:
+    """
+    Estado de la réplica de lectura y enrutamiento de sesiones.
+
+    El chequeo de salud (SELECT 1 + retraso de replicación) lo ejecuta un
+    job del scheduler cada pocos segundos; las dependencias de FastAPI solo
+    consultan el último resultado, sin I/O en el request.
+
+    Si la réplica no está configurada, no respondió al último chequeo, se
+    desconectó durante una consulta o su retraso supera la tolerancia del
+    endpoint, se usa la sesión del primario.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, async_engine: Optional[AsyncEngine] = None):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.saludable = False
+        self.lag_segundos: Optional[float] = None
+        self.ultimo_chequeo: Optional[float] = None
+        if engine is not None:
+            event.listen(engine, "handle_error", self._on_error)
+        if async_engine is not None:
+            # Los eventos del engine async se registran en su sync_engine
+            event.listen(async_engine.sync_engine, "handle_error", self._on_error)
+
+    @property
+    def configurada(self) -> bool:
+        return self.engine is not None
+
+    def _on_error(self, context: Any):
+        # Una desconexión en plena consulta saca a la réplica de rotación
+        # hasta el siguiente chequeo exitoso
+        if context.is_disconnect:
+            self.marcar_caida("desconexión durante una consulta")
+
+    def marcar_caida(self, motivo: str):
+        with self._lock:
+            if self.saludable:
+                logger.warning(f"Réplica de lectura fuera de rotación: {motivo}")
+            self.saludable = False
+
+    @staticmethod
+    def medir_lag(conn: Connection) -> float:
+        """Retraso de replicación en segundos (0 si no es medible, p. ej. SQLite)"""
+        if conn.dialect.name != "mssql":
+            return 0.0
+        try:
+            lag = conn.execute(MSSQL_LAG_QUERY).scalar()
+        except Exception as e:
+            # Sin permiso VIEW SERVER STATE o réplica fuera de un AG
+            logger.debug(f"No se pudo medir el retraso de la réplica: {e}")
+            return 0.0
+        return float(lag or 0)
+
+    def chequear(self) -> bool:
+        """Verificar conexión y retraso de la réplica"""
+        if not self.configurada:
+            return False
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                lag = self.medir_lag(conn)
+        except Exception as e:
+            self.marcar_caida(str(e))
+            self.ultimo_chequeo = time.monotonic()
+            return False
+
+        with self._lock:
+            if not self.saludable:
+                logger.info(f"Réplica de lectura disponible (retraso {lag:.0f} s)")
+            self.saludable = True
+            self.lag_segundos = lag
+            self.ultimo_chequeo = time.monotonic()
+        return True
+
+    def disponible(self, max_lag_segundos: float) -> bool:
+        """¿Se puede leer de la réplica con esta tolerancia de desactualización?"""
+        return (
+            self.configurada
+            and self.saludable
+            and self.lag_segundos is not None
+            and self.lag_segundos <= max_lag_segundos
+        )
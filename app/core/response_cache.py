@@ -0,0 +1,113 @@
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, Dict, Optional
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import time
+
+from app.core.metrics import metrics
+
+
+cache_requests_total = metrics.counter(
+    "http_response_cache_requests_total",
+    "Peticiones a endpoints cacheados según resultado (hit, miss, coalesced, not_modified)",
+    ["cache", "resultado"],
+)
+
+
+class _Entrada:
+    __slots__ = ("cuerpo", "etag", "expira")
+
+    def __init__(self, cuerpo: bytes, etag: str, expira: float):
+        self.cuerpo = cuerpo
+        self.etag = etag
+        self.expira = expira
+
+
+class ResponseCache:
+    """
+    Caché de respuestas JSON con TTL, ETag y single-flight.
+
+    - La clave es la ruta más los query params (las respuestas no dependen
+      del usuario; la autenticación la siguen resolviendo las dependencies).
+    - Si el cliente envía If-None-Match con el ETag vigente se responde 304
+      sin cuerpo.
+    - Peticiones idénticas que llegan mientras se calcula una respuesta
+      esperan ese mismo cálculo en lugar de lanzar otro (single-flight).
+    - El cálculo (síncrono) corre en el threadpool para no bloquear el event
+      loop mientras los demás esperan. Lo comparten varias peticiones y sigue
+      aunque la que lo lanzó termine: `calcular` abre su propia sesión de BD,
+      no usa la de la dependency del request.
+
+    La caché es por worker: con N workers hay como mucho N cálculos por TTL.
+    """
+
+    def __init__(self, nombre: str, ttl_segundos: int, max_entradas: int = 256):
+        self.nombre = nombre
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _clave(request: Request) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def _vigente(self, clave: str) -> Optional[_Entrada]:
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada.expira > time.monotonic():
+            return entrada
+        return None
+
+    def _guardar(self, clave: str, contenido: Any, ttl: int) -> _Entrada:
+        cuerpo = json.dumps(
+            jsonable_encoder(contenido), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        etag = '"' + hashlib.sha1(cuerpo).hexdigest() + '"'
+        entrada = _Entrada(cuerpo, etag, time.monotonic() + ttl)
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+        return entrada
+
+    async def _calcular(self, clave: str, calcular: Callable[[], Any], ttl: int) -> _Entrada:
+        contenido = await run_in_threadpool(calcular)
+        return self._guardar(clave, contenido, ttl)
+
+    def invalidar(self):
+        self._entradas.clear()
+
+    async def responder(self, request: Request, calcular: Callable[[], Any], ttl: Optional[int] = None) -> Response:
+        """Responder desde la caché o calculando (una sola vez por clave) con `calcular()`"""
+        ttl = self.ttl_segundos if ttl is None else ttl
+        clave = self._clave(request)
+
+        entrada = self._vigente(clave)
+        if entrada is not None:
+            resultado = "hit"
+        else:
+            vuelo = self._en_vuelo.get(clave)
+            if vuelo is None:
+                resultado = "miss"
+                vuelo = asyncio.ensure_future(self._calcular(clave, calcular, ttl))
+                self._en_vuelo[clave] = vuelo
+                vuelo.add_done_callback(lambda _: self._en_vuelo.pop(clave, None))
+            else:
+                resultado = "coalesced"
+            # shield: si este cliente se desconecta, los demás siguen esperando el cálculo
+            entrada = await asyncio.shield(vuelo)
+
+        restante = max(0, int(entrada.expira - time.monotonic()))
+        headers = {"ETag": entrada.etag, "Cache-Control": f"private, max-age={restante}"}
+
+        if entrada.etag in request.headers.get("if-none-match", ""):
+            cache_requests_total.inc(cache=self.nombre, resultado="not_modified")
+            return Response(status_code=304, headers=headers)
+
+        cache_requests_total.inc(cache=self.nombre, resultado=resultado)
+        return Response(content=entrada.cuerpo, media_type="application/json", headers=headers)
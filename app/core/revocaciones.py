@@ -0,0 +1,115 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Iterable, Optional, Tuple
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import threading
+
+from app.models.models import Sesion
+
+logger = logging.getLogger(__name__)
+
+# Margen al leer por fechaRevocacion: una revocación confirmada tarde con
+# una marca anterior a la última vista no se pierde (releerla no cambia nada)
+SOLAPE = timedelta(minutes=5)
+
+
+def hash_token(token: str) -> str:
+    """Huella de tamaño fijo con que se guarda y se busca el token de una sesión"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class RevocacionRegistry:
+    """
+    Sesiones revocadas y aún no expiradas.
+
+    Los tokens llevan el id de su sesión (claim `sid`, el id de tab_sesion):
+    revocar la sesión invalida a la vez el access token y el refresh token,
+    y los access tokens que se emitan después con ese refresh token. Para
+    tokens sin `sid` (emitidos antes) se conserva el hash del token.
+
+    `revocado` es una consulta a diccionarios: get_current_user la hace en
+    cada request sin ir a la base. La primera consulta carga las revocaciones
+    vigentes de tab_sesion; después `refrescar` (job del scheduler) lee solo
+    las filas con fechaRevocacion posterior a la última vista, así un logout
+    en otro worker se aplica en pocos segundos. Las revocaciones hechas en
+    este proceso se agregan al momento (`agregar`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # id de sesión / tokenHash -> fechaExpiracion (después ya no hay token válido)
+        self._sesiones: Dict[str, datetime] = {}
+        self._tokens: Dict[str, datetime] = {}
+        self._marca: Optional[datetime] = None
+        self.cargado = False
+
+    def __len__(self) -> int:
+        return len(self._sesiones)
+
+    def agregar(self, revocadas: Iterable[Tuple[Any, str, datetime]]):
+        """Registrar sesiones revocadas: (id de sesión, tokenHash, fechaExpiracion)"""
+        with self._lock:
+            for sesion_id, token_hash, expiracion in revocadas:
+                self._sesiones[str(sesion_id)] = expiracion
+                self._tokens[token_hash] = expiracion
+
+    def refrescar(self, db: Session) -> int:
+        """Leer revocaciones nuevas y olvidar las expiradas. Devuelve cuántas se leyeron"""
+        ahora = datetime.now()
+        stmt = select(Sesion.id, Sesion.tokenHash, Sesion.fechaExpiracion, Sesion.fechaRevocacion).where(
+            Sesion.fechaRevocacion.isnot(None),
+            Sesion.tokenHash.isnot(None),
+            Sesion.fechaExpiracion > ahora,
+        )
+        marca = self._marca if self.cargado else None
+        if marca is not None:
+            stmt = stmt.where(Sesion.fechaRevocacion > marca - SOLAPE)
+        filas = db.execute(stmt).all()
+
+        with self._lock:
+            if marca is None:
+                self._sesiones, self._tokens = {}, {}
+            for sesion_id, token_hash, expiracion, revocacion in filas:
+                self._sesiones[str(sesion_id)] = expiracion
+                self._tokens[token_hash] = expiracion
+                if self._marca is None or revocacion > self._marca:
+                    self._marca = revocacion
+            for registro in (self._sesiones, self._tokens):
+                for clave in [c for c, exp in registro.items() if exp <= ahora]:
+                    del registro[clave]
+            self.cargado = True
+        return len(filas)
+
+    def _contiene(self, token: str, sid: Optional[str]) -> bool:
+        if sid is not None and str(sid) in self._sesiones:
+            return True
+        return hash_token(token) in self._tokens
+
+    def revocado(self, token: str, db: Optional[Session] = None, sid: Optional[str] = None) -> bool:
+        """True si el token (o su sesión `sid`) fue revocado"""
+        if not self.cargado:
+            if db is not None:
+                self.refrescar(db)
+            else:
+                from app.database import SessionLocal
+                with SessionLocal() as propia:
+                    self.refrescar(propia)
+        return self._contiene(token, sid)
+
+    async def revocado_async(self, token: str, db: AsyncSession, sid: Optional[str] = None) -> bool:
+        """revocado para endpoints async: la carga inicial usa su AsyncSession"""
+        if not self.cargado:
+            await db.run_sync(self.refrescar)
+        return self._contiene(token, sid)
+
+    def invalidar(self):
+        with self._lock:
+            self._sesiones, self._tokens = {}, {}
+            self._marca = None
+            self.cargado = False
+
+
+revocaciones = RevocacionRegistry()
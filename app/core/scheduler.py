@@ -1,12 +1,20 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 
+from app.config import settings
+from app.core.bloqueos import bloqueo_aplicacion
+from app.database import SessionLocal, read_replica
+
 scheduler = BackgroundScheduler()
 
 
 def ingestion_job():
     """Job para ingesta de correos"""
+    from app.services.configuracion_service import configuracion_service
+    if not configuracion_service.get("CORREO_INGESTA_ACTIVA", True):
+        return
     print(f"[{datetime.now()}] Ejecutando job de ingesta de correos...")
     # Aquí se ejecutará la lógica de ingesta
     # from app.services.ingestion_service import process_emails
@@ -25,6 +33,196 @@ def cleanup_job():
     # Lógica para eliminar archivos antiguos
 
 
+def sesiones_purga_job():
+    """Job para borrar por lotes las sesiones expiradas fuera del periodo de retención"""
+    from app.services.session_service import SessionService
+    db = SessionLocal()
+    try:
+        resultado = SessionService.purge_expired_sessions(
+            db,
+            retencion_dias=settings.SESIONES_RETENCION_DIAS,
+            tamano_lote=settings.SESIONES_PURGA_LOTE,
+            pausa_ms=settings.SESIONES_PURGA_PAUSA_MS
+        )
+        print(
+            f"[{datetime.now()}] Purga de sesiones: {resultado['eliminadas']} filas en "
+            f"{resultado['lotes']} lotes, {resultado['segundos']} s ({resultado['filas_por_segundo']} filas/s)"
+        )
+    except Exception as e:
+        print(f"[{datetime.now()}] Error purgando sesiones: {e}")
+    finally:
+        db.close()
+
+
+def semaforo_recalculo_job():
+    """Job para recalcular el semáforo de los casos abiertos"""
+    from app.services.semaforo_service import semaforo_service
+    db = SessionLocal()
+    try:
+        resultado = semaforo_service.recalcular(db)
+        if resultado["actualizados"]:
+            print(f"[{datetime.now()}] Semáforo recalculado: {resultado['actualizados']} casos {resultado['por_semaforo']}")
+    except Exception as e:
+        print(f"[{datetime.now()}] Error recalculando semáforo: {e}")
+    finally:
+        db.close()
+
+
+def dashboard_reconcile_job():
+    """Job para reconciliar los contadores del dashboard con las tablas fuente"""
+    from app.services.dashboard_service import dashboard_service
+    db = SessionLocal()
+    try:
+        if not bloqueo_aplicacion(db, "dashboard_reconciliar"):
+            return  # Otro worker lo está reconciliando
+        dashboard_service.reconciliar(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error reconciliando contadores del dashboard: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def resumen_mensual_job():
+    """Job para actualizar el resumen mensual con los meses modificados"""
+    from app.services.resumen_mensual_service import resumen_mensual_service
+    db = SessionLocal()
+    try:
+        if not bloqueo_aplicacion(db, "resumen_mensual"):
+            return  # Otro worker lo está actualizando
+        meses = resumen_mensual_service.actualizar(db)
+        if meses:
+            print(f"[{datetime.now()}] Resumen mensual: {meses} meses recalculados")
+    except Exception as e:
+        print(f"[{datetime.now()}] Error actualizando resumen mensual: {e}")
+    finally:
+        db.close()
+
+
+def resumen_mensual_rebuild_job():
+    """Job para reconstruir el resumen mensual completo"""
+    from app.services.resumen_mensual_service import resumen_mensual_service
+    db = SessionLocal()
+    try:
+        # Recurso propio: una actualización en curso no debe saltarse la
+        # reconstrucción; ambas se serializan en el bloqueo de la tabla
+        if not bloqueo_aplicacion(db, "resumen_mensual_reconstruir"):
+            return  # Otro worker ya la está haciendo
+        resumen_mensual_service.reconstruir(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error reconstruyendo resumen mensual: {e}")
+    finally:
+        db.close()
+
+
+def tiempos_respuesta_init_job():
+    """Job para construir los sketches de tiempos de respuesta si aún no existen"""
+    from app.services.tiempos_respuesta_service import tiempos_respuesta_service
+    db = SessionLocal()
+    try:
+        if not bloqueo_aplicacion(db, "tiempos_respuesta"):
+            return  # Otro worker los está construyendo
+        if tiempos_respuesta_service.inicializar(db):
+            print(f"[{datetime.now()}] Sketches de tiempos de respuesta construidos")
+    except Exception as e:
+        print(f"[{datetime.now()}] Error inicializando tiempos de respuesta: {e}")
+    finally:
+        db.close()
+
+
+def tiempos_respuesta_rebuild_job():
+    """Job para reconstruir los sketches de tiempos de respuesta desde tab_caso"""
+    from app.services.tiempos_respuesta_service import tiempos_respuesta_service
+    db = SessionLocal()
+    try:
+        if not bloqueo_aplicacion(db, "tiempos_respuesta"):
+            return  # Otro worker ya la está haciendo
+        tiempos_respuesta_service.reconstruir(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error reconstruyendo tiempos de respuesta: {e}")
+    finally:
+        db.close()
+
+
+def auditoria_particiones_job():
+    """Job para crear por adelantado las particiones mensuales de auditoría"""
+    from app.services.auditoria_service import auditoria_service
+    db = SessionLocal()
+    try:
+        auditoria_service.mantener_particiones(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error creando particiones de auditoría: {e}")
+    finally:
+        db.close()
+
+
+def search_index_sync_job():
+    """Job para construir/sincronizar el índice de búsqueda de casos"""
+    from app.services.search_service import caso_search_index
+    db = SessionLocal()
+    try:
+        procesados = caso_search_index.sincronizar(db)
+        if procesados:
+            print(f"[{datetime.now()}] Índice de búsqueda: {procesados} casos indexados")
+    except Exception as e:
+        print(f"[{datetime.now()}] Error sincronizando índice de búsqueda: {e}")
+    finally:
+        db.close()
+
+
+def search_index_rebuild_job():
+    """Job para reconstruir el índice de búsqueda (limpia casos borrados en otros workers)"""
+    from app.services.search_service import caso_search_index
+    db = SessionLocal()
+    try:
+        caso_search_index.reconstruir(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error reconstruyendo índice de búsqueda: {e}")
+    finally:
+        db.close()
+
+
+def catalogos_refresh_job():
+    """Job para recargar los catálogos en memoria si cambiaron en la base de datos"""
+    from app.core.catalogos import catalogos
+    db = SessionLocal()
+    try:
+        catalogos.refrescar(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error refrescando catálogos: {e}")
+    finally:
+        db.close()
+
+
+def configuracion_refresh_job():
+    """Job para recoger cambios de configuración hechos desde otros workers"""
+    from app.services.configuracion_service import configuracion_service
+    db = SessionLocal()
+    try:
+        configuracion_service.refrescar(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error refrescando configuración: {e}")
+    finally:
+        db.close()
+
+
+def revocaciones_refresh_job():
+    """Job para recoger sesiones revocadas desde otros workers"""
+    from app.core.revocaciones import revocaciones
+    db = SessionLocal()
+    try:
+        revocaciones.refrescar(db)
+    except Exception as e:
+        print(f"[{datetime.now()}] Error refrescando sesiones revocadas: {e}")
+    finally:
+        db.close()
+
+
+def read_replica_health_job():
+    """Job para verificar salud y retraso de la réplica de lectura"""
+    read_replica.chequear()
+
+
 def start_scheduler():
     """Iniciar scheduler con jobs programados"""
 
@@ -55,6 +253,166 @@ def start_scheduler():
         replace_existing=True
     )
 
+    if settings.SESIONES_RETENCION_DIAS > 0:
+        # Purga de sesiones expiradas a las 2:30 AM
+        scheduler.add_job(
+            sesiones_purga_job,
+            trigger=CronTrigger(hour=2, minute=30),
+            id="sesiones_purga_job",
+            name="Purga de sesiones",
+            max_instances=1,
+            replace_existing=True
+        )
+
+    # Recálculo del semáforo cada hora (al cambiar el día todos los casos
+    # avanzan un día; los creados durante la hora traen el del cliente)
+    scheduler.add_job(
+        semaforo_recalculo_job,
+        trigger=CronTrigger(minute=5),
+        id="semaforo_recalculo_job",
+        name="Recálculo de semáforo",
+        max_instances=1,
+        replace_existing=True
+    )
+
+    if settings.DASHBOARD_RECONCILE_MINUTES > 0:
+        # Reconciliación de contadores del dashboard (la primera, inmediata,
+        # llena la tabla en una base recién migrada)
+        scheduler.add_job(
+            dashboard_reconcile_job,
+            trigger=IntervalTrigger(minutes=settings.DASHBOARD_RECONCILE_MINUTES),
+            id="dashboard_reconcile_job",
+            name="Reconciliación contadores dashboard",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
+    if settings.RESUMEN_MENSUAL_MINUTES > 0:
+        # Resumen mensual de casos: solo los meses con cambios (la primera
+        # ejecución, inmediata, lo construye en una base recién migrada)
+        scheduler.add_job(
+            resumen_mensual_job,
+            trigger=IntervalTrigger(minutes=settings.RESUMEN_MENSUAL_MINUTES),
+            id="resumen_mensual_job",
+            name="Actualización resumen mensual",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
+        # Reconstrucción completa diaria a las 3:30 AM
+        scheduler.add_job(
+            resumen_mensual_rebuild_job,
+            trigger=CronTrigger(hour=3, minute=30),
+            id="resumen_mensual_rebuild_job",
+            name="Reconstrucción resumen mensual",
+            max_instances=1,
+            replace_existing=True
+        )
+
+    if settings.TIEMPOS_RESPUESTA_RECONSTRUIR:
+        # Sketches de tiempos de respuesta: se construyen al arrancar si la
+        # tabla está vacía y se reconstruyen cada noche a las 4 AM
+        scheduler.add_job(
+            tiempos_respuesta_init_job,
+            id="tiempos_respuesta_init_job",
+            name="Inicialización tiempos de respuesta",
+            next_run_time=datetime.now(),
+            replace_existing=True
+        )
+        scheduler.add_job(
+            tiempos_respuesta_rebuild_job,
+            trigger=CronTrigger(hour=4, minute=0),
+            id="tiempos_respuesta_rebuild_job",
+            name="Reconstrucción tiempos de respuesta",
+            max_instances=1,
+            replace_existing=True
+        )
+
+    if settings.AUDITORIA_PARTICIONADA:
+        # Particiones de auditoría: al arrancar y el día 1 de cada mes se
+        # asegura que existan las de los próximos meses
+        scheduler.add_job(
+            auditoria_particiones_job,
+            trigger=CronTrigger(day=1, hour=1, minute=0),
+            id="auditoria_particiones_job",
+            name="Particiones de auditoría",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
+    if settings.SEARCH_INDEX_ENABLED:
+        # Sincronización del índice de búsqueda cada minuto (la primera
+        # ejecución, inmediata, construye el índice completo)
+        scheduler.add_job(
+            search_index_sync_job,
+            trigger=IntervalTrigger(minutes=1),
+            id="search_index_sync_job",
+            name="Sincronización índice de búsqueda",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
+        # Reconstrucción completa diaria a las 3 AM
+        scheduler.add_job(
+            search_index_rebuild_job,
+            trigger=CronTrigger(hour=3, minute=0),
+            id="search_index_rebuild_job",
+            name="Reconstrucción índice de búsqueda",
+            replace_existing=True
+        )
+
+    if settings.CATALOGOS_REFRESH_SECONDS > 0:
+        # Chequeo de versión de los catálogos (el primero, inmediato, los carga)
+        scheduler.add_job(
+            catalogos_refresh_job,
+            trigger=IntervalTrigger(seconds=settings.CATALOGOS_REFRESH_SECONDS),
+            id="catalogos_refresh_job",
+            name="Refresco de catálogos",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
+    if settings.CONFIGURACION_REFRESH_SECONDS > 0:
+        # Propagación de cambios de tab_configuracion (la primera ejecución la carga)
+        scheduler.add_job(
+            configuracion_refresh_job,
+            trigger=IntervalTrigger(seconds=settings.CONFIGURACION_REFRESH_SECONDS),
+            id="configuracion_refresh_job",
+            name="Refresco de configuración",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
+    if settings.REVOCACIONES_REFRESH_SECONDS > 0:
+        # Logouts e invalidaciones de sesión hechos en otros workers
+        scheduler.add_job(
+            revocaciones_refresh_job,
+            trigger=IntervalTrigger(seconds=settings.REVOCACIONES_REFRESH_SECONDS),
+            id="revocaciones_refresh_job",
+            name="Refresco de sesiones revocadas",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
+    if read_replica.configurada:
+        # Chequeo de la réplica de lectura (el primero, inmediato)
+        scheduler.add_job(
+            read_replica_health_job,
+            trigger=IntervalTrigger(seconds=settings.READ_REPLICA_HEALTH_CHECK_SECONDS),
+            id="read_replica_health_job",
+            name="Chequeo réplica de lectura",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            replace_existing=True
+        )
+
     scheduler.start()
     print("✅ Scheduler iniciado correctamente")
 
@@ -1,12 +1,20 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+import uuid
+import bcrypt
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.core.metrics import metrics
 from app.database import get_db
 
 # Contexto para encriptación de contraseñas
@@ -16,10 +24,40 @@ pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+hash_espera = metrics.histogram(
+    "password_hash_espera_segundos",
+    "Tiempo en cola antes de calcular un hash de contraseña",
+    ["operacion"],
+)
+hash_duracion = metrics.histogram(
+    "password_hash_duracion_segundos",
+    "Tiempo de cálculo de un hash de contraseña",
+    ["operacion"],
+)
+hash_rechazados = metrics.counter(
+    "password_hash_rechazados_total",
+    "Operaciones de contraseña rechazadas por cola llena",
+    ["operacion"],
+)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verificar contraseña. Devuelve (válida, hash nuevo); el hash nuevo (argon2)
+    solo viene si la contraseña es válida y el guardado es de un esquema obsoleto.
+    """
+    if pwd_context.identify(hashed_password) == "bcrypt":
+        # Hashes bcrypt heredados: con bcrypt >= 4.1 el backend de passlib
+        # falla al cargarse, se verifican con la librería directamente
+        # (bcrypt solo usa los primeros 72 bytes)
+        valida = bcrypt.checkpw(plain_password.encode("utf-8")[:72], hashed_password.encode("utf-8"))
+        return valida, (pwd_context.hash(plain_password) if valida else None)
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar contraseña"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
 
 
 def get_password_hash(password: str) -> str:
@@ -27,6 +65,73 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PoolContrasenas:
+    """
+    Hashes de contraseña (argon2) fuera del event loop.
+
+    Cada hash consume decenas de milisegundos de CPU; calculado dentro de un
+    endpoint async congela todos los requests del worker. Aquí corren en un
+    pool de `workers` hilos (argon2-cffi libera el GIL mientras calcula),
+    que además limita cuántos se calculan a la vez. Con `max_pendientes`
+    operaciones en curso o en cola, las nuevas se rechazan con 503 en lugar
+    de acumular latencia.
+    """
+
+    def __init__(self, workers: int, max_pendientes: int):
+        self.max_pendientes = max_pendientes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pendientes = 0
+
+    async def ejecutar(self, operacion: str, funcion: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            if self.pendientes >= self.max_pendientes:
+                hash_rechazados.inc(operacion=operacion)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Servicio ocupado, intente de nuevo",
+                    headers={"Retry-After": "1"},
+                )
+            self.pendientes += 1
+        encolado = time.perf_counter()
+
+        def _calcular():
+            inicio = time.perf_counter()
+            hash_espera.observe(inicio - encolado, operacion=operacion)
+            try:
+                return funcion(*args)
+            finally:
+                hash_duracion.observe(time.perf_counter() - inicio, operacion=operacion)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, _calcular)
+        finally:
+            with self._lock:
+                self.pendientes -= 1
+
+
+pool_contrasenas = PoolContrasenas(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pendientes=settings.PASSWORD_HASH_MAX_PENDIENTES,
+)
+
+metrics.gauge(
+    "password_hash_pendientes",
+    "Operaciones de contraseña en curso o en cola",
+    funcion=lambda: {(): pool_contrasenas.pendientes},
+)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password en el pool de contraseñas"""
+    return await pool_contrasenas.ejecutar("verificar", verify_and_update_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash en el pool de contraseñas"""
+    return await pool_contrasenas.ejecutar("hash", get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crear token de acceso JWT"""
     to_encode = data.copy()
@@ -35,6 +140,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
 
+    # jti: dos logins en el mismo segundo no producen el mismo token (ni el mismo hash de sesión)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -65,29 +172,67 @@ def decode_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    """Obtener usuario actual desde el token"""
+def _claims_del_token(token: str) -> Tuple[int, Optional[str]]:
+    """Id del usuario (claim sub) y de la sesión (claim sid) de un access token válido"""
     payload = decode_token(token)
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    try:
+        return int(payload["sub"]), payload.get("sid")
+    except (KeyError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No se pudo validar las credenciales",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Buscar usuario en la base de datos
-    from app.models.models import Usuario
-    user = db.query(Usuario).filter(Usuario.id == user_id).first()
+
+def _sesion_cerrada() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="La sesión fue cerrada",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _usuario_encontrado(user):
     if user is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    
     return user
 
 
+def resolver_usuario(token: str, db: Session):
+    """
+    Usuario del token con una Session: revocaciones y caché de usuarios en
+    memoria, la base solo en la primera carga o en un miss (la sesión no
+    abre conexión si no se usa).
+    """
+    from app.core.revocaciones import revocaciones
+    from app.core.usuarios_cache import usuarios_cache
+
+    user_id, sid = _claims_del_token(token)
+    if revocaciones.revocado(token, db, sid=sid):
+        raise _sesion_cerrada()
+    return _usuario_encontrado(usuarios_cache.obtener(db, user_id))
+
+
+async def resolver_usuario_async(token: str, db: AsyncSession):
+    """resolver_usuario con la AsyncSession del endpoint (misma conexión)"""
+    from app.core.revocaciones import revocaciones
+    from app.core.usuarios_cache import usuarios_cache
+
+    user_id, sid = _claims_del_token(token)
+    if await revocaciones.revocado_async(token, db, sid=sid):
+        raise _sesion_cerrada()
+    return _usuario_encontrado(await usuarios_cache.obtener_async(db, user_id))
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Obtener usuario actual desde el token (endpoints con get_db)"""
+    return resolver_usuario(token, db)
+
+
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     """Verificar que el usuario esté activo"""
     # if not current_user.activo:
@@ -0,0 +1,149 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import math
+
+
+class TDigest:
+    """
+    t-digest (variante "merging") para cuantiles aproximados.
+
+    Resume una distribución en unos pocos centroides (media, peso), más
+    finos en las colas, así p99 mantiene buena precisión. Dos digests se
+    fusionan sin perder precisión apreciable, por eso se guardan por
+    bucket y se combinan al consultar. `compresion` acota el número de
+    centroides (≈ compresion / 2 tras comprimir).
+    """
+
+    def __init__(self, compresion: float = 100):
+        self.compresion = compresion
+        self._centroides: List[Tuple[float, float]] = []
+        self._buffer: List[Tuple[float, float]] = []
+        self.conteo = 0.0
+        self.suma = 0.0
+        self.minimo: Optional[float] = None
+        self.maximo: Optional[float] = None
+
+    # -----------------------------------------
+    # Construcción
+    # -----------------------------------------
+
+    def agregar(self, valor: float, peso: float = 1):
+        self._buffer.append((valor, peso))
+        self.conteo += peso
+        self.suma += valor * peso
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+        if len(self._buffer) > 5 * self.compresion:
+            self._comprimir()
+
+    def fusionar(self, otro: "TDigest") -> "TDigest":
+        if not otro.conteo:
+            return self
+        self._buffer.extend(otro._centroides)
+        self._buffer.extend(otro._buffer)
+        self.conteo += otro.conteo
+        self.suma += otro.suma
+        self.minimo = otro.minimo if self.minimo is None else min(self.minimo, otro.minimo)
+        self.maximo = otro.maximo if self.maximo is None else max(self.maximo, otro.maximo)
+        self._comprimir()
+        return self
+
+    @classmethod
+    def combinar(cls, digests: Iterable["TDigest"], compresion: float = 100) -> "TDigest":
+        resultado = cls(compresion)
+        for digest in digests:
+            resultado.fusionar(digest)
+        return resultado
+
+    def _k(self, q: float) -> float:
+        return self.compresion / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k: float) -> float:
+        angulo = 2 * math.pi * k / self.compresion
+        if angulo >= math.pi / 2:
+            return 1.0
+        return (math.sin(angulo) + 1) / 2
+
+    def _comprimir(self):
+        if not self._buffer:
+            return
+        centroides = sorted(self._centroides + self._buffer)
+        self._buffer = []
+        total = sum(peso for _, peso in centroides)
+
+        comprimidos: List[Tuple[float, float]] = []
+        acumulado = 0.0
+        media, peso = centroides[0]
+        limite = self._q(self._k(0) + 1)
+        for siguiente_media, siguiente_peso in centroides[1:]:
+            if (acumulado + peso + siguiente_peso) / total <= limite:
+                peso += siguiente_peso
+                media += (siguiente_media - media) * siguiente_peso / peso
+            else:
+                comprimidos.append((media, peso))
+                acumulado += peso
+                limite = self._q(self._k(acumulado / total) + 1)
+                media, peso = siguiente_media, siguiente_peso
+        comprimidos.append((media, peso))
+        self._centroides = comprimidos
+
+    # -----------------------------------------
+    # Consulta
+    # -----------------------------------------
+
+    def cuantil(self, q: float) -> Optional[float]:
+        """Valor aproximado del cuantil q (0..1); None si está vacío"""
+        if not self.conteo:
+            return None
+        if q <= 0:
+            return self.minimo
+        if q >= 1:
+            return self.maximo
+        self._comprimir()
+        centroides = self._centroides
+        if len(centroides) == 1:
+            return centroides[0][0]
+
+        indice = q * self.conteo
+        primera_media, primer_peso = centroides[0]
+        if indice < primer_peso / 2:
+            return self.minimo + (primera_media - self.minimo) * indice / (primer_peso / 2)
+
+        acumulado = 0.0
+        for (media, peso), (siguiente_media, siguiente_peso) in zip(centroides, centroides[1:]):
+            centro = acumulado + peso / 2
+            siguiente_centro = acumulado + peso + siguiente_peso / 2
+            if indice <= siguiente_centro:
+                t = (indice - centro) / (siguiente_centro - centro)
+                return media + (siguiente_media - media) * t
+            acumulado += peso
+
+        ultima_media, ultimo_peso = centroides[-1]
+        restante = self.conteo - indice
+        return self.maximo - (self.maximo - ultima_media) * restante / (ultimo_peso / 2)
+
+    @property
+    def promedio(self) -> Optional[float]:
+        return self.suma / self.conteo if self.conteo else None
+
+    # -----------------------------------------
+    # Serialización
+    # -----------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._comprimir()
+        return {
+            "compresion": self.compresion,
+            "centroides": [[round(media, 4), peso] for media, peso in self._centroides],
+        }
+
+    @classmethod
+    def from_dict(cls, datos: Dict[str, Any], conteo: float, suma: float,
+                  minimo: Optional[float], maximo: Optional[float]) -> "TDigest":
+        """Reconstruir un digest; conteo, suma y extremos se guardan aparte (columnas)"""
+        digest = cls(datos.get("compresion", 100))
+        digest._centroides = [(media, peso) for media, peso in datos.get("centroides", [])]
+        digest.conteo = conteo
+        digest.suma = suma
+        digest.minimo = minimo
+        digest.maximo = maximo
+        return digest
@@ -0,0 +1,143 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Set
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+import threading
+import time
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.models.models import Usuario
+
+
+consultas_total = metrics.counter(
+    "usuarios_cache_consultas_total",
+    "Búsquedas del usuario autenticado según resultado (hit, miss)",
+    ["resultado"],
+)
+
+
+@dataclass(frozen=True)
+class UsuarioActual:
+    """Copia inmutable de las columnas de tab_usuario que usa la API por request"""
+
+    id: int
+    nombre: str
+    correo: str
+    activo: bool
+    createdAt: datetime
+    updatedAt: datetime
+
+    @classmethod
+    def desde(cls, usuario: Usuario) -> "UsuarioActual":
+        return cls(
+            id=usuario.id,
+            nombre=usuario.nombre,
+            correo=usuario.correo,
+            activo=usuario.activo,
+            createdAt=usuario.createdAt,
+            updatedAt=usuario.updatedAt,
+        )
+
+
+class UsuariosCache:
+    """
+    Usuarios activos por id, para resolver el usuario del token sin ir a la
+    base en cada request autenticado.
+
+    - Entradas con TTL y tope de tamaño (se descarta la menos usada).
+    - Solo se guardan usuarios activos; los inactivos se consultan siempre.
+    - Un update o delete ORM de un usuario en este proceso lo invalida al
+      hacer commit (mismo mecanismo que el registro de catálogos). En otros
+      workers el cambio se ve, como mucho, al vencer el TTL.
+    """
+
+    def __init__(self, ttl_segundos: int, max_entradas: int = 10000):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[int, tuple]" = OrderedDict()
+        # Cambia con cada invalidación: una carga que empezó antes no se guarda
+        self._generacion = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obtener(self, db: Session, usuario_id: int) -> Optional[UsuarioActual]:
+        """Usuario con ese id (None si no existe)"""
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._entradas.move_to_end(usuario_id)
+                consultas_total.inc(resultado="hit")
+                return entrada[1]
+            generacion = self._generacion
+        consultas_total.inc(resultado="miss")
+
+        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+        if usuario is None:
+            return None
+        actual = UsuarioActual.desde(usuario)
+        if actual.activo and self.ttl_segundos > 0:
+            with self._lock:
+                if generacion == self._generacion:
+                    self._entradas[usuario_id] = (time.monotonic() + self.ttl_segundos, actual)
+                    self._entradas.move_to_end(usuario_id)
+                    while len(self._entradas) > self.max_entradas:
+                        self._entradas.popitem(last=False)
+        return actual
+
+    async def obtener_async(self, db: AsyncSession, usuario_id: int) -> Optional[UsuarioActual]:
+        """obtener con una AsyncSession (en un miss consulta por su conexión)"""
+        return await db.run_sync(self.obtener, usuario_id)
+
+    def invalidar(self, usuario_ids: Optional[Set[int]] = None):
+        """Quitar esos usuarios (todos si no se indican)"""
+        with self._lock:
+            self._generacion += 1
+            if usuario_ids is None:
+                self._entradas.clear()
+            else:
+                for usuario_id in usuario_ids:
+                    self._entradas.pop(usuario_id, None)
+
+
+usuarios_cache = UsuariosCache(
+    ttl_segundos=settings.USUARIOS_CACHE_TTL_SECONDS,
+    max_entradas=settings.USUARIOS_CACHE_MAX,
+)
+
+metrics.gauge(
+    "usuarios_cache_entradas",
+    "Usuarios en el caché de autenticación",
+    funcion=lambda: {(): len(usuarios_cache)},
+)
+
+
+# -----------------------------------------
+# Invalidación al modificar un usuario
+# -----------------------------------------
+
+def _marcar_usuario(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("usuarios_modificados", set()).add(target.id)
+
+
+for _evento in ("after_update", "after_delete"):
+    event.listen(Usuario, _evento, _marcar_usuario)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_tras_commit(session):
+    usuario_ids = session.info.pop("usuarios_modificados", None)
+    if usuario_ids:
+        usuarios_cache.invalidar(usuario_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_marca(session):
+    session.info.pop("usuarios_modificados", None)
@@ -1,22 +1,81 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from typing import Optional
 
 from app.config import settings
+from app.core.pool_metrics import pool_instrumentado, registrar_engine
+from app.core.read_replica import ReadReplica
 
-# Crear engine de SQLAlchemy para SQL Server con pyodbc
-engine = create_engine(
+# Drivers async equivalentes a los síncronos de DATABASE_URL
+ASYNC_DRIVERS = {
+    "mssql": "mssql+aioodbc",
+    "mssql+pyodbc": "mssql+aioodbc",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Traducir DATABASE_URL a su driver async (pyodbc -> aioodbc)"""
+    sa_url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(sa_url.drivername, sa_url.drivername)
+    return sa_url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def _opciones_pool(pool_size: int, max_overflow: int, pool_timeout: int) -> dict:
+    """Parámetros comunes de pool; el dimensionamiento viene de Settings"""
+    return dict(
+        pool_size=pool_size,                            # Número de conexiones en el pool
+        max_overflow=max_overflow,                      # Conexiones adicionales permitidas
+        pool_timeout=pool_timeout,                      # Espera máxima por una conexión libre
+        pool_pre_ping=True,                             # Verificar conexiones antes de usar
+        pool_recycle=settings.DB_POOL_RECYCLE,          # Reciclar conexiones periódicamente
+        echo=settings.DEBUG,                            # Log de queries SQL en modo debug
+        connect_args={
+            "timeout": settings.DB_CONNECT_TIMEOUT,     # Timeout de conexión
+        }
+    )
+
+
+def crear_engines(nombre: str, url: str, async_url: str, pool_size: int, max_overflow: int, pool_timeout: int):
+    """
+    Crear el par de engines (sync y async) de un pool con métricas publicadas
+    en /metrics bajo `nombre` y `nombre`_async.
+    """
+    opciones = _opciones_pool(pool_size, max_overflow, pool_timeout)
+    sa_url = make_url(url)
+    # pyodbc envía los executemany (cargas masivas) como un solo arreglo de
+    # parámetros en lugar de un round trip por fila
+    extra = {"fast_executemany": True} if sa_url.get_backend_name() == "mssql" and sa_url.get_driver_name() == "pyodbc" else {}
+    sync_engine = create_engine(
+        url,
+        poolclass=pool_instrumentado(QueuePool, nombre),
+        **opciones,
+        **extra
+    )
+    async_engine = create_async_engine(
+        async_url,
+        poolclass=pool_instrumentado(AsyncAdaptedQueuePool, f"{nombre}_async"),
+        **opciones
+    )
+    registrar_engine(nombre, sync_engine)
+    registrar_engine(f"{nombre}_async", async_engine)
+    return sync_engine, async_engine
+
+
+# Pool OLTP: escrituras, autenticación y lecturas que deben ver lo último.
+# Engine síncrono (pyodbc) y async (aioodbc, no bloquea el event loop de uvicorn).
+engine, async_engine = crear_engines(
+    "oltp",
     settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,                    # Número de conexiones en el pool
-    max_overflow=10,                # Conexiones adicionales permitidas
-    pool_pre_ping=True,             # Verificar conexiones antes de usar
-    pool_recycle=3600,              # Reciclar conexiones cada hora
-    echo=settings.DEBUG,            # Log de queries SQL en modo debug
-    connect_args={
-        "timeout": 30,              # Timeout de conexión
-    }
+    settings.DATABASE_ASYNC_URL or get_async_database_url(settings.DATABASE_URL),
+    settings.DB_POOL_SIZE,
+    settings.DB_MAX_OVERFLOW,
+    settings.DB_POOL_TIMEOUT,
 )
 
 # Crear SessionLocal con sessionmaker
@@ -26,6 +85,46 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# expire_on_commit=False: en async no se puede recargar atributos de forma
+# perezosa después del commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+# Pool de reportes y listados (read_db): apunta a la réplica de lectura
+# (DATABASE_READ_URL) si existe, si no al primario. Va separado del OLTP para
+# que un reporte pesado no deje sin conexiones a los endpoints de escritura.
+_reporting_url = settings.DATABASE_READ_URL or settings.DATABASE_URL
+_reporting_async_url = (
+    get_async_database_url(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL
+    else settings.DATABASE_ASYNC_URL or get_async_database_url(settings.DATABASE_URL)
+)
+read_engine, async_read_engine = crear_engines(
+    "reporting",
+    _reporting_url,
+    _reporting_async_url,
+    settings.DB_REPORTING_POOL_SIZE,
+    settings.DB_REPORTING_MAX_OVERFLOW,
+    settings.DB_REPORTING_POOL_TIMEOUT,
+)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Solo hay réplica que vigilar si DATABASE_READ_URL está definida
+read_replica = (
+    ReadReplica(read_engine, async_read_engine) if settings.DATABASE_READ_URL
+    else ReadReplica(None)
+)
+
 # Base declarativa para modelos
 Base = declarative_base()
 
@@ -47,6 +146,76 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Dependency para obtener sesión async de base de datos.
+
+    Ejemplo:
+        @app.get("/items")
+        async def read_items(db: AsyncSession = Depends(get_async_db)):
+            return (await db.execute(select(Item))).scalars().all()
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _usar_pool_reportes(tolerancia: int) -> bool:
+    return not read_replica.configurada or read_replica.disponible(tolerancia)
+
+
+def read_session(max_lag_seconds: Optional[int] = None):
+    """
+    Sesión de solo lectura con la misma elección de pool que read_db, para
+    código que no puede usar una dependency: las dependencies con yield se
+    cierran antes de enviar un StreamingResponse. Quien la abre la cierra.
+    """
+    tolerancia = settings.READ_REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+    factory = ReadSessionLocal if _usar_pool_reportes(tolerancia) else SessionLocal
+    return factory()
+
+
+def read_db(max_lag_seconds: Optional[int] = None):
+    """
+    Fábrica de dependencies de solo lectura.
+
+    Devuelve una sesión del pool de reportes: la réplica si está sana y su
+    retraso no supera `max_lag_seconds` (por defecto
+    READ_REPLICA_MAX_LAG_SECONDS), o el primario si no hay réplica
+    configurada. Si la réplica existe pero no cumple, usa el pool OLTP del
+    primario. Solo para endpoints que no escriben.
+
+    Ejemplo:
+        @router.get("/dashboard")
+        async def dashboard(db: Session = Depends(read_db(max_lag_seconds=60))):
+            ...
+    """
+    def get_read_db():
+        db = read_session(max_lag_seconds)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return get_read_db
+
+
+def async_read_db(max_lag_seconds: Optional[int] = None):
+    """Versión async de read_db para endpoints que usan AsyncSession"""
+    tolerancia = settings.READ_REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+
+    async def get_async_read_db():
+        factory = AsyncReadSessionLocal if _usar_pool_reportes(tolerancia) else AsyncSessionLocal
+        async with factory() as db:
+            yield db
+
+    return get_async_read_db
+
+
+# Dependencies con la tolerancia por defecto
+get_read_db = read_db()
+get_async_read_db = async_read_db()
+
+
 def verify_connection():
     """Verificar conexión a la base de datos"""
     try:
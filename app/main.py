@@ -1,12 +1,17 @@
 from fastapi import FastAPI, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.api.v1.router import api_router
+from app.core.auditoria_writer import auditoria_writer
+from app.core.catalogos import catalogos
+from app.core.metrics import metrics
 from app.core.scheduler import start_scheduler, stop_scheduler
-from app.database import verify_connection, engine
+from app.services.graph_service import graph_service
+from app.database import verify_connection, SessionLocal, engine, async_engine, read_engine, async_read_engine
 
 
 @asynccontextmanager
@@ -22,6 +27,22 @@ async def lifespan(app: FastAPI):
     else:
         print("⚠️  Advertencia: No se pudo conectar a la base de datos")
 
+    # Catálogos en memoria antes de atender: serializar un caso no consulta la base
+    print("📚 Cargando catálogos...")
+    try:
+        with SessionLocal() as db:
+            catalogos.cargar(db)
+    except Exception as e:
+        print(f"⚠️  Advertencia: No se pudieron cargar los catálogos: {e}")
+
+    if settings.AUDITORIA_ASINCRONA:
+        # Escritura de auditoría por lotes (adopta lo que quedó en el spool)
+        print("📝 Iniciando writer de auditoría...")
+        auditoria_writer.iniciar()
+
+    # Cliente HTTP compartido hacia Microsoft Graph (keep-alive entre llamadas)
+    await graph_service.iniciar()
+
     # Iniciar scheduler para tareas programadas
     print("⏰ Iniciando scheduler de tareas...")
     start_scheduler()
@@ -29,6 +50,7 @@ async def lifespan(app: FastAPI):
     print(f"✨ {settings.APP_NAME} iniciado correctamente")
     print(f"📚 Documentación disponible en: /docs")
     print(f"🔍 Health check disponible en: /health")
+    print(f"📈 Métricas disponibles en: /metrics")
 
     yield
 
@@ -39,9 +61,19 @@ async def lifespan(app: FastAPI):
     print("⏰ Deteniendo scheduler...")
     stop_scheduler()
 
+    # Escribir la auditoría pendiente antes de cerrar el pool
+    print("📝 Vaciando cola de auditoría...")
+    auditoria_writer.detener()
+
+    # Cerrar las conexiones HTTP hacia Graph
+    await graph_service.cerrar()
+
     # Cerrar conexiones de base de datos
     print("📊 Cerrando conexiones a base de datos...")
     engine.dispose()
+    await async_engine.dispose()
+    read_engine.dispose()
+    await async_read_engine.dispose()
 
     print(f"✅ {settings.APP_NAME} detenido correctamente")
 
@@ -63,6 +95,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor de la página siguiente en los listados de auditoría
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Montar directorio de uploads para servir archivos estáticos
@@ -104,3 +138,18 @@ async def health_check():
         "version": "1.0.0",
         "database": "connected" if db_status else "disconnected"
     }
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Métricas del proceso en formato de texto Prometheus.
+
+    Incluye por pool (oltp, reporting y sus variantes async):
+        - db_pool_checkout_wait_seconds: histograma de espera por una conexión
+        - db_pool_connections_in_use / db_pool_overflow / db_pool_size
+        - db_pool_checkout_timeouts_total: checkouts que agotaron pool_timeout
+
+    Los valores son de este worker: con varios workers, cada uno expone los suyos.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
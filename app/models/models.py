@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Float, Text, ForeignKey, BigInteger, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER, DATETIME2, BIT
 from datetime import datetime
@@ -108,6 +108,13 @@ class Usuario(Base):
 
 class Caso(Base):
     __tablename__ = "tab_caso"
+    __table_args__ = (
+        # Soporta el ORDER BY y la paginación keyset del listado de casos
+        Index("ix_tab_caso_createdAt_id", "createdAt", "id"),
+        # Casos modificados desde una marca (jobs incrementales) y casos de un mes
+        Index("ix_tab_caso_updatedAt", "updatedAt"),
+        Index("ix_tab_caso_fechaRecepcion", "fechaRecepcion"),
+    )
 
     id = Column(UNIQUEIDENTIFIER(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
@@ -237,8 +244,17 @@ class FuenteCorreo(Base):
 
 class AuditoriaEvento(Base):
     __tablename__ = "tab_auditoriaevento"
-
-    id = Column(BigInteger, primary_key=True, index=True)
+    __table_args__ = (
+        # Orden y paginación keyset (fechaEvento, id) de los listados; con
+        # sql/005 es el índice clustered, particionado por mes de fechaEvento
+        Index("ix_tab_auditoriaevento_fechaEvento_id", "fechaEvento", "id"),
+        Index("ix_tab_auditoriaevento_caso_fecha", "casoId", "fechaEvento", "id"),
+        Index("ix_tab_auditoriaevento_usuario_fecha", "usuarioId", "fechaEvento", "id"),
+    )
+
+    # Sin index=True: un índice propio sobre id no quedaría alineado con la
+    # partición de sql/005 (las búsquedas por id usan la PK)
+    id = Column(BigInteger, primary_key=True)
     casoId = Column(UNIQUEIDENTIFIER(as_uuid=True), ForeignKey("tab_caso.id"), nullable=True)
     usuarioId = Column(Integer, ForeignKey("tab_usuario.id"), nullable=True)
     tipoAccionId = Column(Integer, ForeignKey("tab_tipoaccion.id"), nullable=False)
@@ -295,12 +311,70 @@ class Sesion(Base):
 
     id = Column(UNIQUEIDENTIFIER(as_uuid=True), primary_key=True, default=uuid.uuid4)
     usuarioId = Column(Integer, ForeignKey("tab_usuario.id"), nullable=False)
-    token = Column(String(500), nullable=False, index=True)
+    tokenHash = Column(String(64), nullable=False, index=True)  # SHA-256 del JWT (hex), no el token
     fechaCreacion = Column(DATETIME2, default=datetime.now, nullable=False)
     fechaExpiracion = Column(DATETIME2, nullable=False, index=True)
     activa = Column(Boolean, default=True, nullable=False)
+    fechaRevocacion = Column(DATETIME2, nullable=True, index=True)  # Logout o invalidación
     ipOrigen = Column(String(45), nullable=True)
     userAgent = Column(String(500), nullable=True)
 
     # Relaciones
     usuario = relationship("Usuario", back_populates="sesiones")
+
+
+# =============================================
+# TABLAS DERIVADAS
+# =============================================
+
+class ContadorDashboard(Base):
+    """Contadores pre-agregados del dashboard (ver dashboard_service)"""
+    __tablename__ = "tab_contadordashboard"
+    __table_args__ = (
+        UniqueConstraint("dimension", "clave", name="uq_tab_contadordashboard_dimension_clave"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String(30), nullable=False)   # total, estado, tipo, semaforo, ...
+    clave = Column(String(100), nullable=False, default="")  # Valor de la dimensión ('' si es escalar)
+    valor = Column(BigInteger, nullable=False, default=0)
+    updatedAt = Column(DATETIME2, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+
+class ResumenMensualCaso(Base):
+    """Casos recibidos por mes × tipo de trámite × estado × responsable (ver resumen_mensual_service)"""
+    __tablename__ = "tab_resumenmensualcaso"
+    __table_args__ = (
+        UniqueConstraint(
+            "mes", "tipoTramite", "estadoCasoId", "responsableId",
+            name="uq_tab_resumenmensualcaso_grupo"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    mes = Column(Date, nullable=False)  # Primer día del mes de fechaRecepcion
+    tipoTramite = Column(String(100), nullable=False)
+    estadoCasoId = Column(Integer, nullable=False)
+    responsableId = Column(Integer, nullable=True)
+    total = Column(Integer, nullable=False, default=0)
+    marcaCaso = Column(DATETIME2, nullable=False)  # MAX(tab_caso.updatedAt) al calcular la fila; 1900-01-01 si hay que recalcular el mes
+    updatedAt = Column(DATETIME2, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+
+class SketchTiempoRespuesta(Base):
+    """t-digest de horas de respuesta por mes de cierre × tipo de trámite × responsable (ver tiempos_respuesta_service)"""
+    __tablename__ = "tab_sketchtiemporespuesta"
+    __table_args__ = (
+        UniqueConstraint("mes", "tipoTramite", "responsableId", name="uq_tab_sketchtiemporespuesta_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    mes = Column(Date, nullable=False)  # Primer día del mes de correoEnvioFecha
+    tipoTramite = Column(String(100), nullable=False)
+    responsableId = Column(Integer, nullable=True)
+    conteo = Column(BigInteger, nullable=False, default=0)
+    sumaHoras = Column(Float, nullable=False, default=0)
+    minimoHoras = Column(Float, nullable=True)
+    maximoHoras = Column(Float, nullable=True)
+    digest = Column(Text, nullable=False)  # JSON con los centroides
+    updatedAt = Column(DATETIME2, default=datetime.now, onupdate=datetime.now, nullable=False)
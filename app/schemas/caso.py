@@ -1,8 +1,18 @@
-from pydantic import BaseModel, EmailStr, UUID4, Field
-from typing import Optional, List, Any
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, UUID4, Field, model_validator
+from typing import Optional, List, Any, Dict
+from datetime import datetime, date
 from app.schemas.catalogo import EstadoCasoResponse, SemaforoResponse, TipoPDFResponse, EstadoEnvioResponse
 from app.schemas.usuario import UsuarioResponse
+from app.core.catalogos import catalogos
+from app.models.models import EstadoCaso, Semaforo, TipoPDF, EstadoEnvio
+
+# Relaciones de CasoResponse que se resuelven con el registro de catálogos
+CATALOGOS_CASO = {
+    "estado_caso": (EstadoCaso, "estadoCasoId"),
+    "semaforo": (Semaforo, "semaforoId"),
+    "tipo_pdf": (TipoPDF, "tipoPDFId"),
+    "correo_envio_estado": (EstadoEnvio, "correoEnvioEstadoId"),
+}
 
 # ==========================================
 # Esquemas para Casos
@@ -94,6 +104,73 @@ class CasoResponse(CasoBase):
     class Config:
         from_attributes = True
 
+    @model_validator(mode="before")
+    @classmethod
+    def resolver_catalogos(cls, data: Any) -> Any:
+        """Tomar los catálogos del registro en memoria en lugar de cargarlos del caso (sin I/O)"""
+        if not hasattr(data, "_sa_instance_state"):
+            return data
+        valores = {c.key: getattr(data, c.key) for c in data.__table__.columns}
+        for campo, (modelo, fk) in CATALOGOS_CASO.items():
+            valores[campo] = catalogos.en_memoria(modelo, valores[fk])
+        valores["responsable"] = data.responsable
+        valores["identificadores"] = data.identificadores
+        return valores
+
 class CasoListResponse(BaseModel):
-    total: int
+    # None cuando el cliente pide include_total=false
+    total: Optional[int] = None
     items: List[CasoResponse]
+    # Cursor opaco para pedir la siguiente página con `after`
+    next_cursor: Optional[str] = None
+
+
+# ==========================================
+# Carga masiva de casos
+# ==========================================
+
+class CasoBulkCreate(BaseModel):
+    # Cada registro se valida como CasoCreate en el servicio, así un registro
+    # inválido se reporta en su fila en lugar de rechazar todo el lote
+    casos: List[Dict[str, Any]] = Field(..., min_length=1)
+
+class CasoBulkError(BaseModel):
+    indice: int  # Posición del registro en `casos`
+    radicado: Optional[str] = None
+    errores: List[str]
+
+class CasoBulkResult(BaseModel):
+    recibidos: int
+    creados: int
+    fallidos: int
+    errores: List[CasoBulkError] = []
+
+
+class CasoBulkUpdate(BaseModel):
+    # Casos a modificar: lista de IDs o un filtro (uno de los dos)
+    ids: Optional[List[UUID4]] = Field(None, min_length=1)
+    filtro: Optional[CasoFilter] = None
+    cambios: CasoUpdate
+
+    @model_validator(mode="after")
+    def validar_seleccion(self):
+        if (self.ids is None) == (self.filtro is None):
+            raise ValueError("Indique 'ids' o 'filtro', no ambos")
+        if self.filtro is not None and not self.filtro.model_dump(exclude_none=True):
+            # Un filtro vacío modificaría todos los casos
+            raise ValueError("El filtro debe tener al menos un criterio")
+        if not self.cambios.model_dump(exclude_unset=True):
+            raise ValueError("No hay cambios para aplicar")
+        return self
+
+class CasoBulkUpdateResult(BaseModel):
+    actualizados: int
+    # None si se modificaron más de BULK_RESULT_MAX_IDS casos (solo el conteo)
+    ids: Optional[List[UUID4]] = None
+
+
+class RecalculoSemaforoResult(BaseModel):
+    fecha: date
+    actualizados: int
+    # Casos que pasaron a cada semáforo (por código)
+    por_semaforo: Dict[str, int] = {}
@@ -18,6 +18,7 @@ class EstadoCasoResponse(CatalogoBase):
 
 class SemaforoResponse(CatalogoBase):
     id: int
+    descripcion: Optional[str] = None  # Nullable en tab_semaforo
     colorHex: str
     diasMin: int
     diasMax: Optional[int] = None
@@ -10,7 +10,7 @@ from uuid import UUID
 class SesionBase(BaseModel):
     """Schema base de sesión"""
     usuarioId: int
-    token: str
+    tokenHash: str
     fechaExpiracion: datetime
     activa: bool = True
     ipOrigen: Optional[str] = None
@@ -29,6 +29,7 @@ class SesionResponse(BaseModel):
     fechaCreacion: datetime
     fechaExpiracion: datetime
     activa: bool
+    fechaRevocacion: Optional[datetime] = None
     ipOrigen: Optional[str] = None
 
     class Config:
@@ -39,6 +40,7 @@ class SesionInDB(SesionBase):
     """Schema completo de sesión en DB"""
     id: UUID
     fechaCreacion: datetime
+    fechaRevocacion: Optional[datetime] = None
 
     class Config:
         from_attributes = True
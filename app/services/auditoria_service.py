@@ -1,19 +1,80 @@
-from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any, List
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, text, and_, or_
+from typing import Optional, Dict, Any, List, Tuple
 import json
 import uuid
 from datetime import datetime
 
-from app.models.models import AuditoriaEvento
+from app.core.auditoria_writer import auditoria_writer
+from app.core.catalogos import catalogos
+from app.models.models import AuditoriaEvento, TipoAccion
 # from app.schemas.auditoria import AuditoriaFilter # Filter is generic or custom
 
 class AuditoriaService:
-    """Servicio para auditoría y registro de acciones"""
+    """
+    Servicio para auditoría y registro de acciones.
+
+    Con el writer de auditoría activo (la API lo arranca en el lifespan),
+    registrar solo encola el evento: no hay commit en la sesión de quien
+    llama ni ida y vuelta a la base en el request. Sin writer (scripts,
+    pruebas) se escribe en la sesión recibida como antes.
+    """
+
+    # Código en tab_tipoaccion de cada acción registrada por la API
+    ACCION_CODIGOS = {
+        "crear": "CASO_CREADO",
+        "actualizar": "CASO_ACTUALIZADO",
+        "eliminar": "CASO_ELIMINADO",
+        "login": "LOGIN",
+        "recuperar_pass": "RECUPERAR_PASSWORD",
+        "crear_escalamiento": "CASO_ESCALADO",
+        "actualizar_escalamiento": "ESCALAMIENTO_ACTUALIZADO",
+    }
+
+    # IDs usados antes del catálogo; respaldo si la base aún no tiene el código
+    TIPO_ACCION_MAP = {
+        "crear": 1,
+        "actualizar": 2,
+        "eliminar": 3,
+        "login": 4,
+        "recuperar_pass": 5,
+        "crear_escalamiento": 6,
+        "actualizar_escalamiento": 7
+    }
+
+    def _tipo_accion_id(self, accion: str, db: Optional[Session] = None) -> int:
+        """Resolver el tipoAccionId de una acción con el registro de catálogos"""
+        codigo = self.ACCION_CODIGOS.get(accion, accion.upper())
+        tipo = catalogos.por_codigo(TipoAccion, codigo, db=db)
+        if tipo is not None:
+            return tipo.id
+        return self.TIPO_ACCION_MAP.get(accion, 99) # 99=Desconocido o genérico
+
+    def _fila(
+        self,
+        db: Session,
+        accion: str,
+        usuario_id: Optional[int],
+        caso_id: Optional[uuid.UUID],
+        detalles: Optional[Dict[str, Any]],
+        ip_address: Optional[str],
+        fecha: datetime
+    ) -> Dict[str, Any]:
+        return {
+            "tipoAccionId": self._tipo_accion_id(accion, db),
+            "usuarioId": usuario_id,
+            "casoId": caso_id,
+            "detalleJson": json.dumps(detalles, default=str) if detalles else None,
+            "ipOrigen": ip_address,
+            # La fecha es la de la acción, no la de la escritura del lote
+            "fechaEvento": fecha,
+        }
 
     def registrar_accion(
         self,
         db: Session,
-        accion: str, # TODO: Mapear 'accion' string a 'tipoAccionId' int
+        accion: str, # Ver ACCION_CODIGOS
         entidad: str, # No usado directamente en modelo, solo para logica
         entidad_id: Optional[str] = None, # Puede ser int o uuid
         usuario_id: Optional[int] = None,
@@ -21,41 +82,13 @@ class AuditoriaService:
         detalles: Optional[Dict[str, Any]] = None,
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None
-    ) -> AuditoriaEvento:
-        """Registrar acción de auditoría"""
-        
-        # Mapeo temporal de acciones a IDs (esto debería venir de DB o constante)
-        # Asumimos IDs : 1=Login, 2=CrearCaso, 3=ActualizarCaso, 4=EliminarCaso, etc.
-        # Por ahora usaremos 1 genérico si no lo tenemos, o mejor, no registramos si no tenemos el ID
-        # Necesitamos la tabla `tab_tipoaccion` poblada. 
-        # Supongamos:
-        # 1: Crear
-        # 2: Actualizar
-        # 3: Eliminar
-        # 4: Login
-        # 5: Escalar
-        
-        tipo_accion_map = {
-            "crear": 1,
-            "actualizar": 2,
-            "eliminar": 3,
-            "login": 4,
-            "recuperar_pass": 5,
-            "crear_escalamiento": 6, # Asumido
-            "actualizar_escalamiento": 7
-        }
-        
-        tipo_accion_id = tipo_accion_map.get(accion, 99) # 99=Desconocido o genérico
-
-        auditoria = AuditoriaEvento(
-            tipoAccionId=tipo_accion_id,
-            usuarioId=usuario_id,
-            casoId=caso_id,
-            detalleJson=json.dumps(detalles) if detalles else None,
-            ipOrigen=ip_address
-            # entidad_id no se guarda explícitamente si no es casoId, pero podríamos meterlo en detalles
-        )
+    ) -> Optional[AuditoriaEvento]:
+        """Registrar acción de auditoría (devuelve el evento solo si se escribió en el momento)"""
+        fila = self._fila(db, accion, usuario_id, caso_id, detalles, ip_address, datetime.now())
+        if auditoria_writer.activo and auditoria_writer.registrar([fila]):
+            return None
 
+        auditoria = AuditoriaEvento(**fila)
         db.add(auditoria)
         try:
             db.commit()
@@ -67,17 +100,118 @@ class AuditoriaService:
             
         return auditoria
 
-    def get_auditoria(self, db: Session, skip: int=0, limit: int=100, filters: Any=None):
-        # Implementado en endpoint directamente por simplicidad ahora
-        pass
+    def registrar_acciones(
+        self,
+        db: Session,
+        accion: str,
+        eventos: List[Tuple[Optional[uuid.UUID], Optional[Dict[str, Any]]]],
+        usuario_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> int:
+        """
+        Registrar la misma acción sobre varios casos con un único INSERT
+        (executemany). `eventos` es una lista de (caso_id, detalles).
+        Devuelve el número de eventos registrados.
+        """
+        if not eventos:
+            return 0
 
-    def get_cambios_caso(self, db: Session, caso_id: uuid.UUID):
-        return db.query(AuditoriaEvento).filter(AuditoriaEvento.casoId == caso_id).order_by(AuditoriaEvento.fechaEvento).all()
+        ahora = datetime.now()
+        filas = [
+            self._fila(db, accion, usuario_id, caso_id, detalles, ip_address, ahora)
+            for caso_id, detalles in eventos
+        ]
+        if auditoria_writer.activo and auditoria_writer.registrar(filas):
+            return len(filas)
+
+        try:
+            db.execute(insert(AuditoriaEvento), filas)
+            db.commit()
+        except Exception as e:
+            print(f"Error registrando auditoria: {e}")
+            db.rollback()
+            return 0
+        return len(filas)
+
+    @staticmethod
+    def _select_auditoria(
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        usuario_id: Optional[int] = None,
+        caso_id: Optional[uuid.UUID] = None,
+        tipo_accion_id: Optional[int] = None,
+        fecha_desde: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ):
+        """
+        SELECT de eventos con filtros, más recientes primero.
+
+        Con `after` (fechaEvento, id del último evento de la página anterior)
+        pagina por keyset: la base salta directo a la posición en el índice
+        (fechaEvento, id) en lugar de leer y descartar `skip` filas.
+        """
+        # AuditoriaResponse serializa tipo_accion y usuario: se cargan en el mismo JOIN
+        stmt = select(AuditoriaEvento).options(
+            joinedload(AuditoriaEvento.tipo_accion),
+            joinedload(AuditoriaEvento.usuario)
+        )
+        if usuario_id:
+            stmt = stmt.where(AuditoriaEvento.usuarioId == usuario_id)
+        if caso_id:
+            stmt = stmt.where(AuditoriaEvento.casoId == caso_id)
+        if tipo_accion_id:
+            stmt = stmt.where(AuditoriaEvento.tipoAccionId == tipo_accion_id)
+        if fecha_desde:
+            stmt = stmt.where(AuditoriaEvento.fechaEvento >= fecha_desde)
+        if after:
+            fecha_cursor, id_cursor = after
+            stmt = stmt.where(or_(
+                AuditoriaEvento.fechaEvento < fecha_cursor,
+                and_(AuditoriaEvento.fechaEvento == fecha_cursor, AuditoriaEvento.id < id_cursor)
+            ))
+
+        # id desempata eventos del mismo instante (un lote comparte fechaEvento)
+        stmt = stmt.order_by(AuditoriaEvento.fechaEvento.desc(), AuditoriaEvento.id.desc())
+        if skip:
+            stmt = stmt.offset(skip)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    def get_auditoria(self, db: Session, skip: int = 0, limit: Optional[int] = 100, **filtros) -> List[AuditoriaEvento]:
+        return db.execute(self._select_auditoria(skip, limit, **filtros)).scalars().all()
+
+    async def get_auditoria_async(
+        self, db: AsyncSession, skip: int = 0, limit: Optional[int] = 100, **filtros
+    ) -> List[AuditoriaEvento]:
+        result = await db.execute(self._select_auditoria(skip, limit, **filtros))
+        return result.scalars().all()
+
+    def get_cambios_caso(self, db: Session, caso_id: uuid.UUID, limit: int = 500):
+        """Últimos `limit` eventos de un caso, en orden cronológico"""
+        recientes = db.query(AuditoriaEvento).filter(
+            AuditoriaEvento.casoId == caso_id
+        ).order_by(AuditoriaEvento.fechaEvento.desc(), AuditoriaEvento.id.desc()).limit(limit).all()
+        return list(reversed(recientes))
 
     def get_acciones_usuario(self, db: Session, usuario_id: int, limit: int = 50):
         return db.query(AuditoriaEvento).filter(
             AuditoriaEvento.usuarioId == usuario_id
-        ).order_by(AuditoriaEvento.fechaEvento.desc()).limit(limit).all()
+        ).order_by(AuditoriaEvento.fechaEvento.desc(), AuditoriaEvento.id.desc()).limit(limit).all()
+
+    async def get_acciones_usuario_async(
+        self, db: AsyncSession, usuario_id: int, limit: int = 50, after: Optional[Tuple[datetime, int]] = None
+    ):
+        return await self.get_auditoria_async(db, limit=limit, usuario_id=usuario_id, after=after)
+
+    def mantener_particiones(self, db: Session, meses_adelante: int = 3):
+        """
+        Crear las particiones mensuales de los próximos `meses_adelante` meses
+        (sql/005). Solo SQL Server con la tabla ya particionada.
+        """
+        db.execute(text("EXEC dbo.usp_auditoria_particiones @meses_adelante = :meses"), {"meses": meses_adelante})
+        db.commit()
 
 
 auditoria_service = AuditoriaService()
@@ -1,12 +1,33 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional, Any
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import or_, and_, func, select, insert, update
+from pydantic import ValidationError
+from typing import List, Optional, Any, Tuple, Dict, Iterable
 from datetime import datetime, timedelta
+from types import SimpleNamespace
+from collections import Counter
 import uuid
 
-from app.models.models import Caso, CasoIdentificador
-from app.schemas.caso import CasoCreate, CasoUpdate, CasoFilter
+from app.config import settings
+from app.models.models import Caso, CasoIdentificador, EstadoCaso, Semaforo, Usuario, TipoPDF, EstadoEnvio
+from app.schemas.caso import CasoCreate, CasoUpdate, CasoFilter, CasoBulkError, CasoBulkResult
+from app.core.catalogos import catalogos, CATALOGOS
 from app.core.exceptions import NotFoundException
+from app.services.dashboard_service import dashboard_service, deltas_caso, snapshot_caso, ESTADO, ESCALAMIENTOS
+from app.services.search_service import caso_search_index
+from app.services.resumen_mensual_service import resumen_mensual_service
+from app.services.tiempos_respuesta_service import tiempos_respuesta_service
+
+
+# Relaciones que serializa CasoResponse. Los catálogos salen del registro en
+# memoria (app.core.catalogos); el responsable va en el mismo JOIN y los
+# identificadores en un único SELECT ... IN, así una página cuesta un número
+# fijo de queries sin importar su tamaño.
+CASO_RESPONSE_OPTIONS = (
+    joinedload(Caso.responsable),
+    selectinload(Caso.identificadores),
+)
 
 
 def create_caso(db: Session, caso: CasoCreate) -> Caso:
@@ -53,47 +74,226 @@ def create_caso(db: Session, caso: CasoCreate) -> Caso:
             )
             db.add(db_ident)
 
+    dashboard_service.aplicar(db, deltas_caso(db_caso))
     db.commit()
     db.refresh(db_caso)
+    caso_search_index.indexar(db_caso)
     return db_caso
 
 
+# =============================================
+# Carga masiva
+# =============================================
+
+# Claves foráneas de tab_caso que se validan antes de insertar (los
+# catálogos contra el registro en memoria, los usuarios contra la base)
+REFERENCIAS_CASO = {
+    "estadoCasoId": EstadoCaso,
+    "semaforoId": Semaforo,
+    "responsableId": Usuario,
+    "tipoPDFId": TipoPDF,
+    "correoEnvioEstadoId": EstadoEnvio,
+}
+
+# SQL Server admite 2100 parámetros por sentencia
+_MAX_PARAMETROS_IN = 1000
+
+
+def _en_bloques(valores: List[Any], tamanio: int) -> Iterable[List[Any]]:
+    for i in range(0, len(valores), tamanio):
+        yield valores[i:i + tamanio]
+
+
+def _existentes(db: Session, columna, valores: Iterable[Any]) -> set:
+    """Valores de `columna` que ya existen en la base de datos"""
+    valores = list(set(valores))
+    encontrados = set()
+    for bloque in _en_bloques(valores, _MAX_PARAMETROS_IN):
+        encontrados.update(db.execute(select(columna).where(columna.in_(bloque))).scalars())
+    return encontrados
+
+
+def _validar_lote(db: Session, registros: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, CasoCreate]], Dict[int, List[str]]]:
+    """
+    Validar todo el lote en una pasada: esquema de cada registro, radicados
+    repetidos (en el lote y en la base) y referencias a catálogos/usuarios.
+    Las comprobaciones contra la base son una consulta IN por columna, no por fila.
+    """
+    errores: Dict[int, List[str]] = {}
+    validos: List[Tuple[int, CasoCreate]] = []
+
+    for indice, registro in enumerate(registros):
+        try:
+            validos.append((indice, CasoCreate.model_validate(registro)))
+        except ValidationError as e:
+            errores[indice] = [
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ]
+
+    vistos: Dict[str, int] = {}
+    for indice, caso in validos:
+        if caso.radicado in vistos:
+            errores.setdefault(indice, []).append(
+                f"radicado: repetido en el lote (registro {vistos[caso.radicado]})"
+            )
+        else:
+            vistos[caso.radicado] = indice
+
+    for radicado in _existentes(db, Caso.radicado, vistos):
+        errores.setdefault(vistos[radicado], []).append("radicado: ya existe")
+
+    for campo, modelo in REFERENCIAS_CASO.items():
+        usados = {getattr(caso, campo) for _, caso in validos} - {None}
+        if modelo in CATALOGOS:
+            existentes = {v for v in usados if catalogos.por_id(modelo, v, db=db)}
+        else:
+            existentes = _existentes(db, modelo.id, usados)
+        faltantes = usados - existentes
+        for indice, caso in validos:
+            if getattr(caso, campo) in faltantes:
+                errores.setdefault(indice, []).append(f"{campo}: {getattr(caso, campo)} no existe")
+
+    return [(i, c) for i, c in validos if i not in errores], errores
+
+
+def _filas_insert(bloque: List[Tuple[int, CasoCreate]], ahora: datetime) -> Tuple[List[dict], List[dict]]:
+    """Parámetros de INSERT para casos e identificadores (ids generados aquí)"""
+    casos, identificadores = [], []
+    for _, caso in bloque:
+        caso_id = uuid.uuid4()
+        fila = caso.model_dump(exclude={"identificadores"})
+        fila.update(id=caso_id, createdAt=ahora, updatedAt=ahora)
+        casos.append(fila)
+        identificadores.extend(
+            {"casoId": caso_id, "clave": ident.clave, "valor": ident.valor}
+            for ident in caso.identificadores or []
+        )
+    return casos, identificadores
+
+
+def _insertar_bloque(db: Session, bloque: List[Tuple[int, CasoCreate]], ahora: datetime) -> List[dict]:
+    """INSERT ... executemany de casos e identificadores en la transacción actual"""
+    casos, identificadores = _filas_insert(bloque, ahora)
+    db.execute(insert(Caso), casos)
+    if identificadores:
+        db.execute(insert(CasoIdentificador), identificadores)
+    deltas = Counter()
+    for fila in casos:
+        deltas.update(deltas_caso(SimpleNamespace(**fila), ahora=ahora))
+    dashboard_service.aplicar(db, deltas)
+    return casos
+
+
+def _radicado_de(registro: Any) -> Optional[str]:
+    radicado = registro.get("radicado") if isinstance(registro, dict) else None
+    return str(radicado) if radicado is not None else None
+
+
+def _mensaje_error_bd(e: SQLAlchemyError) -> str:
+    return str(getattr(e, "orig", None) or e)[:300]
+
+
+def create_casos_bulk(db: Session, registros: List[Dict[str, Any]], chunk_size: Optional[int] = None) -> CasoBulkResult:
+    """
+    Crear casos en lote.
+
+    Los registros válidos se insertan en transacciones de `chunk_size`
+    (BULK_CHUNK_SIZE) con un executemany por tabla; en SQL Server el engine
+    usa fast_executemany de pyodbc. Si un bloque falla (p. ej. un radicado
+    creado por otro proceso mientras tanto) se reintenta fila por fila para
+    aislar el registro culpable sin perder el resto del bloque.
+    """
+    chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+    pendientes, errores = _validar_lote(db, registros)
+    ahora = datetime.now()
+    creados: List[dict] = []
+
+    for bloque in _en_bloques(pendientes, chunk_size):
+        try:
+            filas = _insertar_bloque(db, bloque, ahora)
+            db.commit()
+            creados.extend(filas)
+            continue
+        except SQLAlchemyError:
+            db.rollback()
+
+        for item in bloque:
+            try:
+                filas = _insertar_bloque(db, [item], ahora)
+                db.commit()
+                creados.extend(filas)
+            except SQLAlchemyError as e:
+                db.rollback()
+                errores[item[0]] = [_mensaje_error_bd(e)]
+
+    for fila in creados:
+        caso_search_index.indexar(SimpleNamespace(**fila))
+
+    return CasoBulkResult(
+        recibidos=len(registros),
+        creados=len(creados),
+        fallidos=len(errores),
+        errores=[
+            CasoBulkError(
+                indice=indice,
+                radicado=_radicado_de(registros[indice]),
+                errores=mensajes
+            )
+            for indice, mensajes in sorted(errores.items())
+        ]
+    )
+
+
 def get_caso(db: Session, caso_id: uuid.UUID) -> Caso:
     """Obtener caso por ID"""
-    caso = db.query(Caso).filter(Caso.id == caso_id).first()
+    caso = db.query(Caso).options(*CASO_RESPONSE_OPTIONS).filter(Caso.id == caso_id).first()
     if not caso:
         raise NotFoundException(f"Caso {caso_id} no encontrado")
     return caso
 
 
-def get_casos(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
-    filters: Optional[CasoFilter] = None
-) -> List[Caso]:
-    """Listar casos con filtros"""
-    query = db.query(Caso)
-
-    if filters:
-        if filters.tipoTramite:
-            query = query.filter(Caso.tipoTramite == filters.tipoTramite)
-        if filters.estadoCasoId:
-            query = query.filter(Caso.estadoCasoId == filters.estadoCasoId)
-        if filters.semaforoId:
-            query = query.filter(Caso.semaforoId == filters.semaforoId)
-        if filters.responsableId:
-            query = query.filter(Caso.responsableId == filters.responsableId)
-        if filters.fechaDesde:
-            query = query.filter(Caso.fechaRecepcion >= filters.fechaDesde)
-        if filters.fechaHasta:
-            query = query.filter(Caso.fechaRecepcion <= filters.fechaHasta)
-        if filters.radicado:
-            query = query.filter(Caso.radicado == filters.radicado)
-            
-        if filters.busqueda:
-            search = f"%{filters.busqueda}%"
-            query = query.filter(
+def build_caso_criteria(filters: Optional[CasoFilter] = None) -> List[Any]:
+    """
+    Construir la lista de condiciones WHERE para un CasoFilter.
+    Es la única fuente de filtros para el listado, el conteo y demás
+    consultas sobre casos, así todas aplican exactamente los mismos criterios.
+    """
+    criterios = []
+    if not filters:
+        return criterios
+
+    if filters.tipoTramite:
+        criterios.append(Caso.tipoTramite == filters.tipoTramite)
+    if filters.estadoCasoId:
+        criterios.append(Caso.estadoCasoId == filters.estadoCasoId)
+    if filters.semaforoId:
+        criterios.append(Caso.semaforoId == filters.semaforoId)
+    if filters.responsableId:
+        criterios.append(Caso.responsableId == filters.responsableId)
+    if filters.fechaDesde:
+        criterios.append(Caso.fechaRecepcion >= filters.fechaDesde)
+    if filters.fechaHasta:
+        criterios.append(Caso.fechaRecepcion <= filters.fechaHasta)
+    if filters.radicado:
+        criterios.append(Caso.radicado == filters.radicado)
+
+    if filters.busqueda:
+        search = f"%{filters.busqueda}%"
+        ids = caso_search_index.buscar_ids(filters.busqueda) if caso_search_index.ready else None
+        if ids is not None:
+            # Índice invertido para el texto; radicado y correo siguen
+            # admitiendo fragmentos (el índice solo encuentra palabras completas)
+            criterios.append(
+                or_(
+                    Caso.id.in_(ids),
+                    Caso.radicado.like(search),
+                    Caso.peticionarioCorreo.like(search)
+                )
+            )
+        else:
+            # Respaldo mientras el índice se construye, si está deshabilitado
+            # o si la búsqueda pasa de SEARCH_MAX_RESULTS coincidencias
+            criterios.append(
                 or_(
                     Caso.radicado.like(search),
                     Caso.peticionarioNombre.like(search),
@@ -102,43 +302,283 @@ def get_casos(
                 )
             )
 
-    return query.order_by(Caso.createdAt.desc()).offset(skip).limit(limit).all()
+    return criterios
+
+
+def _select_casos_pagina(
+    skip: int,
+    limit: int,
+    filters: Optional[CasoFilter],
+    after: Optional[Tuple[datetime, uuid.UUID]],
+    include_total: bool
+):
+    """Construir el SELECT de una página de casos (compartido por la versión sync y async)"""
+    criterios = build_caso_criteria(filters)
+    stmt = select(Caso).options(*CASO_RESPONSE_OPTIONS).where(*criterios)
+
+    if include_total:
+        total_subq = (
+            select(func.count())
+            .select_from(Caso)
+            .where(*criterios)
+            .correlate(None)
+            .scalar_subquery()
+        )
+        stmt = stmt.add_columns(total_subq.label("total"))
+
+    if after:
+        fecha_cursor, id_cursor = after
+        stmt = stmt.where(
+            or_(
+                Caso.createdAt < fecha_cursor,
+                and_(Caso.createdAt == fecha_cursor, Caso.id < id_cursor)
+            )
+        )
+        skip = 0
+
+    # El id desempata casos con el mismo createdAt para que el orden sea estable
+    return stmt.order_by(Caso.createdAt.desc(), Caso.id.desc()).offset(skip).limit(limit)
+
+
+def _total_pagina(filas, skip: int, after) -> Optional[int]:
+    """Total filtrado tomado de la primera fila; None si hay que contarlo aparte"""
+    if filas:
+        return filas[0].total
+    if skip == 0 and not after:
+        return 0
+    return None
+
+
+def get_casos_pagina(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[CasoFilter] = None,
+    after: Optional[Tuple[datetime, uuid.UUID]] = None,
+    include_total: bool = True
+) -> Tuple[List[Caso], Optional[int]]:
+    """
+    Obtener una página de casos y el total filtrado en un solo round trip.
+
+    El total viaja como columna extra de la misma consulta (subconsulta
+    escalar COUNT(*) con los mismos filtros, sin el cursor). Si la página
+    llega vacía más allá del inicio se recurre a un COUNT aparte.
+    Con include_total=False no se cuenta nada y el total es None.
+
+    Si se indica `after` (createdAt, id) se usa paginación keyset: se buscan
+    directamente las filas posteriores al cursor sobre el índice
+    (createdAt, id) y se ignora `skip`.
+    """
+    stmt = _select_casos_pagina(skip, limit, filters, after, include_total)
+    filas = db.execute(stmt).all()
+
+    casos = [fila[0] for fila in filas]
+    if not include_total:
+        return casos, None
+
+    total = _total_pagina(filas, skip, after)
+    if total is None:
+        total = count_casos(db, filters)
+    return casos, total
+
+
+def get_casos(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[CasoFilter] = None,
+    after: Optional[Tuple[datetime, uuid.UUID]] = None
+) -> List[Caso]:
+    """Listar casos con filtros (ver get_casos_pagina)"""
+    casos, _ = get_casos_pagina(db, skip=skip, limit=limit, filters=filters, after=after, include_total=False)
+    return casos
 
 
 def update_caso(db: Session, caso_id: uuid.UUID, caso_update: CasoUpdate) -> Caso:
     """Actualizar caso"""
     db_caso = get_caso(db, caso_id)
+    antes = snapshot_caso(db_caso)
+    cerrado_antes = db_caso.correoEnvioFecha is not None
 
     update_data = caso_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_caso, field, value)
 
+    deltas = deltas_caso(antes, -1)
+    deltas.update(deltas_caso(db_caso))
+    dashboard_service.aplicar(db, deltas)
+    if not cerrado_antes and db_caso.correoEnvioFecha is not None:
+        tiempos_respuesta_service.registrar_cierres(db, [
+            (db_caso.fechaRecepcion, db_caso.correoEnvioFecha, db_caso.tipoTramite, db_caso.responsableId)
+        ])
     db.commit()
     db.refresh(db_caso)
+    caso_search_index.indexar(db_caso)
     return db_caso
 
 
+def _aplicar_cambio_estado(db: Session, criterios: List[Any], nuevo_estado: int):
+    """Mover en los contadores del dashboard los casos que cambian de estado"""
+    filas = db.execute(
+        select(Caso.estadoCasoId, func.count(Caso.id))
+        .where(*criterios, Caso.estadoCasoId != nuevo_estado)
+        .group_by(Caso.estadoCasoId)
+    ).all()
+    deltas = Counter()
+    for estado_id, total in filas:
+        deltas[(ESTADO, str(estado_id))] -= total
+        deltas[(ESTADO, str(nuevo_estado))] += total
+    dashboard_service.aplicar(db, deltas)
+
+
+def _registrar_cierres(db: Session, criterios: List[Any], valores: Dict[str, Any]):
+    """Sumar a los tiempos de respuesta los casos que se cierran con este cambio"""
+    filas = db.execute(
+        select(Caso.fechaRecepcion, Caso.tipoTramite, Caso.responsableId)
+        .where(*criterios, Caso.correoEnvioFecha.is_(None))
+    ).all()
+    envio = valores["correoEnvioFecha"]
+    tiempos_respuesta_service.registrar_cierres(db, [
+        (recepcion, envio, tipo, valores.get("responsableId", responsable))
+        for recepcion, tipo, responsable in filas
+    ])
+
+
+def referencias_inexistentes(db: Session, valores: Dict[str, Any]) -> List[str]:
+    """
+    Un mensaje por cada referencia de `valores` (columnas de REFERENCIAS_CASO)
+    que no existe, para rechazar un cambio antes de que el UPDATE falle por FK.
+    """
+    errores = []
+    for campo, modelo in REFERENCIAS_CASO.items():
+        valor = valores.get(campo)
+        if valor is None:
+            continue
+        if modelo in CATALOGOS:
+            existe = catalogos.por_id(modelo, valor, db=db) is not None
+        else:
+            existe = bool(_existentes(db, modelo.id, [valor]))
+        if not existe:
+            errores.append(f"{campo}: {valor} no existe")
+    return errores
+
+
+def update_casos_bulk(
+    db: Session,
+    caso_update: CasoUpdate,
+    ids: Optional[List[uuid.UUID]] = None,
+    filters: Optional[CasoFilter] = None
+) -> List[uuid.UUID]:
+    """
+    Aplicar el mismo cambio a varios casos con UPDATE ... WHERE sobre el
+    conjunto (reasignaciones, cambios de estado masivos), sin cargar los casos.
+
+    La selección es una lista de IDs (un UPDATE por bloque de 1000 por el
+    límite de parámetros de SQL Server) o los criterios de un CasoFilter.
+    Todo va en una transacción. Devuelve los IDs modificados (OUTPUT/RETURNING).
+    """
+    valores = caso_update.model_dump(exclude_unset=True)
+    valores["updatedAt"] = datetime.now()
+
+    if ids is not None:
+        selecciones = [[Caso.id.in_(bloque)] for bloque in _en_bloques(list(set(ids)), _MAX_PARAMETROS_IN)]
+    else:
+        selecciones = [build_caso_criteria(filters)]
+
+    actualizados: List[uuid.UUID] = []
+    try:
+        for criterios in selecciones:
+            if "estadoCasoId" in valores:
+                _aplicar_cambio_estado(db, criterios, valores["estadoCasoId"])
+            if valores.get("correoEnvioFecha"):
+                _registrar_cierres(db, criterios, valores)
+            stmt = (
+                update(Caso)
+                .where(*criterios)
+                .values(**valores)
+                .returning(Caso.id)
+                .execution_options(synchronize_session=False)
+            )
+            actualizados.extend(db.execute(stmt).scalars())
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+
+    # Ningún campo de CasoUpdate está en el índice de búsqueda: no hay que reindexar
+    return actualizados
+
+
 def delete_caso(db: Session, caso_id: uuid.UUID) -> bool:
     """Eliminar caso"""
     db_caso = get_caso(db, caso_id)
+    deltas = deltas_caso(db_caso, -1)
+    # Los escalamientos se eliminan en cascada con el caso
+    deltas[(ESCALAMIENTOS, "")] -= len(db_caso.escalamientos)
+    dashboard_service.aplicar(db, deltas)
+    # Un borrado no deja updatedAt que el job del resumen mensual pueda ver
+    resumen_mensual_service.restar_caso(db, db_caso)
     db.delete(db_caso)
     db.commit()
+    caso_search_index.eliminar(caso_id)
     return True
 
 
+def buscar_casos(db: Session, texto: str, limit: int = 20) -> List[Caso]:
+    """Búsqueda de texto libre con resultados ordenados por relevancia"""
+    if not caso_search_index.ready:
+        # Sin índice no hay ranking: se cae al filtro LIKE por fecha
+        return get_casos(db, limit=limit, filters=CasoFilter(busqueda=texto))
+
+    ranking = [caso_id for caso_id, _ in caso_search_index.buscar(texto, limit)]
+    if not ranking:
+        return []
+    casos = db.query(Caso).options(*CASO_RESPONSE_OPTIONS).filter(Caso.id.in_(ranking)).all()
+    por_id = {c.id: c for c in casos}
+    # Casos borrados por otro worker pueden seguir en el índice hasta su sincronización
+    return [por_id[caso_id] for caso_id in ranking if caso_id in por_id]
+
+
 def count_casos(db: Session, filters: Optional[CasoFilter] = None) -> int:
-    """Contar casos"""
-    query = db.query(Caso)
-    if filters:
-        if filters.tipoTramite:
-            query = query.filter(Caso.tipoTramite == filters.tipoTramite)
-        if filters.estadoCasoId:
-            query = query.filter(Caso.estadoCasoId == filters.estadoCasoId)
-        if filters.semaforoId:
-            query = query.filter(Caso.semaforoId == filters.semaforoId)
-        if filters.responsableId:
-            query = query.filter(Caso.responsableId == filters.responsableId)
-        if filters.radicado:
-            query = query.filter(Caso.radicado == filters.radicado)
-            
-    return query.count()
+    """Contar casos con los mismos filtros del listado"""
+    return db.query(func.count(Caso.id)).filter(*build_caso_criteria(filters)).scalar()
+
+
+# =============================================
+# Versiones async (AsyncSession) para los endpoints de lectura
+# =============================================
+
+async def get_caso_async(db: AsyncSession, caso_id: uuid.UUID) -> Caso:
+    """Obtener caso por ID (async)"""
+    stmt = select(Caso).options(*CASO_RESPONSE_OPTIONS).where(Caso.id == caso_id)
+    caso = (await db.execute(stmt)).scalars().first()
+    if not caso:
+        raise NotFoundException(f"Caso {caso_id} no encontrado")
+    return caso
+
+
+async def get_casos_pagina_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[CasoFilter] = None,
+    after: Optional[Tuple[datetime, uuid.UUID]] = None,
+    include_total: bool = True
+) -> Tuple[List[Caso], Optional[int]]:
+    """Página de casos + total en un solo round trip (async, ver get_casos_pagina)"""
+    stmt = _select_casos_pagina(skip, limit, filters, after, include_total)
+    filas = (await db.execute(stmt)).all()
+
+    casos = [fila[0] for fila in filas]
+    if not include_total:
+        return casos, None
+
+    total = _total_pagina(filas, skip, after)
+    if total is None:
+        total = await count_casos_async(db, filters)
+    return casos, total
+
+
+async def count_casos_async(db: AsyncSession, filters: Optional[CasoFilter] = None) -> int:
+    """Contar casos con los mismos filtros del listado (async)"""
+    return await db.scalar(select(func.count(Caso.id)).where(*build_caso_criteria(filters)))
@@ -0,0 +1,108 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+import json
+import logging
+import threading
+
+from app.models.models import Configuracion
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_bool(valor: str) -> bool:
+    normalizado = valor.strip().lower()
+    if normalizado in ("true", "1", "si", "sí", "yes"):
+        return True
+    if normalizado in ("false", "0", "no"):
+        return False
+    raise ValueError(f"'{valor}' no es un booleano")
+
+
+# Conversión de `valor` (texto) según `tipoDato`
+PARSERS = {
+    "STRING": str,
+    "INT": lambda v: int(v.strip()),
+    "DECIMAL": lambda v: float(v.strip()),
+    "BOOL": _parse_bool,
+    "JSON": json.loads,
+}
+
+
+def parse_valor(valor: str, tipo_dato: str) -> Any:
+    """Convertir el texto guardado al tipo declarado. ValueError si no es válido"""
+    parser = PARSERS.get((tipo_dato or "STRING").upper())
+    if parser is None:
+        raise ValueError(f"tipoDato '{tipo_dato}' no soportado")
+    try:
+        return parser(valor)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Valor inválido para {tipo_dato}: {e}")
+
+
+class ConfiguracionService:
+    """
+    Configuración de tab_configuracion ya convertida a su tipo y en memoria.
+
+    `get` es una consulta a un diccionario. Los cambios hechos con
+    PUT /configuracion/{clave} recargan este worker al instante; los demás
+    workers los recogen con el job `configuracion_refresh_job`, que cada
+    pocos segundos compara (MAX(updatedAt), COUNT(*)) de la tabla y solo
+    relee las filas si cambió.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores: Dict[str, Any] = {}
+        self._version: Optional[Tuple[Optional[datetime], int]] = None
+        self.cargado = False
+
+    @staticmethod
+    def _version_actual(db: Session) -> Tuple[Optional[datetime], int]:
+        fila = db.execute(select(func.max(Configuracion.updatedAt), func.count(Configuracion.id))).one()
+        return fila[0], fila[1]
+
+    def recargar(self, db: Session):
+        """Leer y convertir todas las claves"""
+        version = self._version_actual(db)
+        valores = {}
+        for config in db.execute(select(Configuracion)).scalars():
+            try:
+                valores[config.clave] = parse_valor(config.valor, config.tipoDato)
+            except ValueError as e:
+                # Un valor corrupto no debe tumbar el resto: se deja como texto
+                logger.warning(f"Configuración {config.clave}: {e}")
+                valores[config.clave] = config.valor
+
+        with self._lock:
+            self._valores = valores
+            self._version = version
+            self.cargado = True
+
+    def refrescar(self, db: Session) -> bool:
+        """Recargar solo si la tabla cambió. Devuelve True si recargó"""
+        if self.cargado and self._version_actual(db) == self._version:
+            return False
+        self.recargar(db)
+        logger.info(f"Configuración recargada ({len(self._valores)} claves)")
+        return True
+
+    def _asegurar(self):
+        if self.cargado:
+            return
+        from app.database import SessionLocal
+        with SessionLocal() as db:
+            self.recargar(db)
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        """Valor tipado de una clave (default si no existe)"""
+        self._asegurar()
+        return self._valores.get(clave, default)
+
+    def invalidar(self):
+        with self._lock:
+            self.cargado = False
+
+
+configuracion_service = ConfiguracionService()
@@ -0,0 +1,210 @@
+from sqlalchemy import func, select, update, insert, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, Tuple, Any, Iterable
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.catalogos import catalogos
+from app.models.models import Caso, Escalamiento, EstadoCaso, Semaforo, ContadorDashboard
+
+
+# Dimensiones de tab_contadordashboard
+TOTAL = "total"
+ESTADO = "estado"
+TIPO = "tipo"
+SEMAFORO = "semaforo"
+ESCALAMIENTOS = "escalamientos"
+VENCIDOS = "vencidos"
+ULTIMA_SEMANA = "ultima_semana"
+
+Deltas = Counter  # (dimension, clave) -> incremento
+
+
+def deltas_caso(caso: Any, signo: int = 1, ahora: datetime = None) -> Deltas:
+    """
+    Contadores que aporta un caso (objeto o fila con sus columnas); signo -1
+    para retirarlo. Para una modificación: deltas(antes, -1) + deltas(después, +1).
+    """
+    ahora = ahora or datetime.now()
+    deltas = Counter({
+        (TOTAL, ""): signo,
+        (ESTADO, str(caso.estadoCasoId)): signo,
+        (TIPO, caso.tipoTramite): signo,
+        (SEMAFORO, str(caso.semaforoId)): signo,
+    })
+    if caso.fechaVencimiento and caso.fechaVencimiento < ahora:
+        deltas[(VENCIDOS, "")] += signo
+    if caso.createdAt and caso.createdAt >= ahora - timedelta(days=7):
+        deltas[(ULTIMA_SEMANA, "")] += signo
+    return deltas
+
+
+def snapshot_caso(caso: Caso) -> SimpleNamespace:
+    """Copia de las columnas que cuentan en el dashboard, para calcular diferencias"""
+    campos = ("estadoCasoId", "tipoTramite", "semaforoId", "fechaVencimiento", "createdAt")
+    return SimpleNamespace(**{c: getattr(caso, c) for c in campos})
+
+
+class DashboardService:
+    """
+    Contadores del dashboard pre-agregados en tab_contadordashboard.
+
+    Las escrituras de casos y escalamientos suman sus deltas en la misma
+    transacción (`aplicar`), así el dashboard se responde leyendo unas
+    decenas de filas en lugar de agregar tab_caso.
+
+    `reconciliar` (job periódico) recalcula todo desde las tablas fuente:
+    corrige cualquier deriva y actualiza los contadores que dependen del
+    paso del tiempo (vencidos, últimos 7 días), que entre reconciliaciones
+    solo se mueven con las escrituras.
+
+    Limitación: toda alta o baja de casos suma en la fila (total, ""), así
+    que esas transacciones se serializan en su bloqueo hasta el commit. El
+    orden fijo de `aplicar` evita deadlocks, no esa espera; si llegara a ser
+    el cuello de botella habría que repartir el total en varias filas.
+    """
+
+    # -----------------------------------------
+    # Mantenimiento incremental
+    # -----------------------------------------
+
+    def _sumar(self, db: Session, dimension: str, clave: str, delta: int):
+        filtro = (ContadorDashboard.dimension == dimension, ContadorDashboard.clave == clave)
+        stmt = (
+            update(ContadorDashboard)
+            .where(*filtro)
+            .values(valor=ContadorDashboard.valor + delta, updatedAt=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(stmt).rowcount:
+            return
+        try:
+            with db.begin_nested():
+                db.execute(insert(ContadorDashboard).values(
+                    dimension=dimension, clave=clave, valor=delta, updatedAt=datetime.now()
+                ))
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            db.execute(stmt)
+
+    def aplicar(self, db: Session, deltas: Deltas):
+        """
+        Sumar deltas en la transacción actual (el commit lo hace quien llama).
+
+        Las filas se actualizan siempre en el mismo orden (dimensión, clave):
+        dos transacciones que tocan los mismos contadores esperan una a la
+        otra en lugar de bloquearse en cruz (deadlock).
+        """
+        for (dimension, clave), delta in sorted(deltas.items(), key=lambda d: (d[0][0], d[0][1] or "")):
+            if delta:
+                self._sumar(db, dimension, clave, delta)
+
+    # -----------------------------------------
+    # Cálculo desde las tablas fuente
+    # -----------------------------------------
+
+    @staticmethod
+    def _agrupado(db: Session, columna) -> Iterable[Tuple[str, int]]:
+        filas = db.execute(select(columna, func.count(Caso.id)).group_by(columna)).all()
+        return [(str(valor), total) for valor, total in filas]
+
+    def calcular(self, db: Session, dimensiones: Iterable[str] = None) -> Deltas:
+        """Contadores calculados directamente sobre tab_caso / tab_escalamiento"""
+        ahora = datetime.now()
+        dimensiones = set(dimensiones or (TOTAL, ESTADO, TIPO, SEMAFORO, ESCALAMIENTOS, VENCIDOS, ULTIMA_SEMANA))
+        contadores = Counter()
+        if TOTAL in dimensiones:
+            contadores[(TOTAL, "")] = db.scalar(select(func.count(Caso.id)))
+        for dimension, columna in ((ESTADO, Caso.estadoCasoId), (TIPO, Caso.tipoTramite), (SEMAFORO, Caso.semaforoId)):
+            if dimension in dimensiones:
+                for clave, total in self._agrupado(db, columna):
+                    contadores[(dimension, clave)] = total
+        if ESCALAMIENTOS in dimensiones:
+            contadores[(ESCALAMIENTOS, "")] = db.scalar(select(func.count(Escalamiento.id)))
+        if VENCIDOS in dimensiones:
+            contadores[(VENCIDOS, "")] = db.scalar(
+                select(func.count(Caso.id)).where(Caso.fechaVencimiento < ahora)
+            )
+        if ULTIMA_SEMANA in dimensiones:
+            contadores[(ULTIMA_SEMANA, "")] = db.scalar(
+                select(func.count(Caso.id)).where(Caso.createdAt >= ahora - timedelta(days=7))
+            )
+        return contadores
+
+    @staticmethod
+    def consulta_bloqueo(dimensiones: Iterable[str]):
+        """
+        SELECT que bloquea los contadores de `dimensiones` (y el rango de
+        claves, para filas nuevas) hasta el commit. En SQL Server son los
+        hints UPDLOCK + HOLDLOCK; with_for_update cubre otros motores.
+        """
+        return (
+            select(ContadorDashboard.id)
+            .where(ContadorDashboard.dimension.in_(list(dimensiones)))
+            .with_hint(ContadorDashboard, "WITH (UPDLOCK, HOLDLOCK)", "mssql")
+            .with_for_update()
+        )
+
+    def reconciliar(self, db: Session, dimensiones: Iterable[str] = None, commit: bool = True) -> Deltas:
+        """
+        Reemplazar los contadores (todos o los de `dimensiones`) por los calculados.
+
+        Los contadores se bloquean antes de calcular: una escritura que llega
+        mientras tanto espera en `aplicar` hasta el commit y suma su delta
+        sobre los valores nuevos, en lugar de quedar pisada por el reemplazo.
+        """
+        dimensiones = list(dimensiones or (TOTAL, ESTADO, TIPO, SEMAFORO, ESCALAMIENTOS, VENCIDOS, ULTIMA_SEMANA))
+        db.execute(self.consulta_bloqueo(dimensiones)).all()
+        contadores = self.calcular(db, dimensiones)
+        ahora = datetime.now()
+        db.execute(
+            delete(ContadorDashboard)
+            .where(ContadorDashboard.dimension.in_(dimensiones))
+            .execution_options(synchronize_session=False)
+        )
+        if contadores:
+            db.execute(insert(ContadorDashboard), [
+                {"dimension": d, "clave": c, "valor": v, "updatedAt": ahora}
+                for (d, c), v in contadores.items()
+            ])
+        if commit:
+            db.commit()
+        return contadores
+
+    # -----------------------------------------
+    # Lectura
+    # -----------------------------------------
+
+    def leer(self, db: Session) -> Dict[str, Any]:
+        """Estadísticas del dashboard desde los contadores (una sola consulta)"""
+        filas = db.execute(select(ContadorDashboard.dimension, ContadorDashboard.clave, ContadorDashboard.valor)).all()
+        # Tabla aún sin reconciliar: se calcula en vivo
+        contadores = Counter({(d, c): v for d, c, v in filas}) if filas else self.calcular(db)
+
+        por_dimension: Dict[str, Dict[str, int]] = {}
+        for (dimension, clave), valor in contadores.items():
+            if valor:
+                por_dimension.setdefault(dimension, {})[clave] = valor
+
+        def etiquetar(dimension: str, modelo, atributo: str) -> Dict[str, int]:
+            resultado: Dict[str, int] = {}
+            for clave, valor in por_dimension.get(dimension, {}).items():
+                entrada = catalogos.por_id(modelo, int(clave), db=db) if clave.isdigit() else None
+                etiqueta = getattr(entrada, atributo) if entrada else clave
+                resultado[etiqueta] = resultado.get(etiqueta, 0) + valor
+            return resultado
+
+        return {
+            "total_casos": contadores.get((TOTAL, ""), 0),
+            "casos_por_estado": etiquetar(ESTADO, EstadoCaso, "descripcion"),
+            "casos_por_tipo": dict(por_dimension.get(TIPO, {})),
+            "casos_por_prioridad": etiquetar(SEMAFORO, Semaforo, "colorHex"),
+            "escalamientos_total": contadores.get((ESCALAMIENTOS, ""), 0),
+            "casos_vencidos": contadores.get((VENCIDOS, ""), 0),
+            "casos_ultima_semana": contadores.get((ULTIMA_SEMANA, ""), 0),
+        }
+
+
+dashboard_service = DashboardService()
@@ -0,0 +1,216 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+from xml.sax.saxutils import escape
+import csv
+import io
+import re
+import zipfile
+
+from app.config import settings
+from app.core.catalogos import catalogos
+from app.database import read_session
+from app.models.models import Caso, EstadoCaso, Semaforo, Usuario
+from app.schemas.caso import CasoFilter
+from app.services.caso_service import build_caso_criteria
+
+
+# Columnas exportadas: (encabezado, expresión). Estado y semáforo se
+# resuelven con el registro de catálogos, sin JOIN.
+COLUMNAS: List[Tuple[str, Any]] = [
+    ("Radicado", Caso.radicado),
+    ("Fecha recepción", Caso.fechaRecepcion),
+    ("Fecha vencimiento", Caso.fechaVencimiento),
+    ("Tipo trámite", Caso.tipoTramite),
+    ("Estado", Caso.estadoCasoId),
+    ("Semáforo", Caso.semaforoId),
+    ("Responsable", Usuario.nombre),
+    ("Peticionario", Caso.peticionarioNombre),
+    ("Correo peticionario", Caso.peticionarioCorreo),
+    ("Destinatario", Caso.destinatarioCorreo),
+    ("Fecha envío respuesta", Caso.correoEnvioFecha),
+    ("Creado", Caso.createdAt),
+]
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Filas que se acumulan antes de entregar un bloque de bytes al cliente
+_FILAS_POR_BLOQUE = 500
+
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M")
+    return str(valor)
+
+
+def filas_casos(db: Session, filters: Optional[CasoFilter] = None) -> Iterator[List[str]]:
+    """
+    Filas (ya como texto) de los casos que cumplen el filtro, leídas con un
+    cursor del servidor en lotes de EXPORT_YIELD_PER: sin objetos ORM y sin
+    cargar el resultado completo.
+    """
+    stmt = (
+        select(*[columna for _, columna in COLUMNAS])
+        .outerjoin(Usuario, Caso.responsableId == Usuario.id)
+        .where(*build_caso_criteria(filters))
+        .order_by(Caso.createdAt.desc(), Caso.id.desc())
+        .execution_options(yield_per=settings.EXPORT_YIELD_PER)
+    )
+    for fila in db.execute(stmt):
+        valores = list(fila)
+        estado = catalogos.por_id(EstadoCaso, valores[4], db=db)
+        semaforo = catalogos.por_id(Semaforo, valores[5], db=db)
+        valores[4] = estado.descripcion if estado else valores[4]
+        valores[5] = semaforo.codigo if semaforo else valores[5]
+        yield [_texto(v) for v in valores]
+
+
+# -----------------------------------------
+# CSV
+# -----------------------------------------
+
+def _celda_csv(valor: str) -> str:
+    # Nombres y correos llegan de correos externos: que Excel no los evalúe como fórmula
+    return "'" + valor if valor[:1] in ("=", "+", "-", "@") else valor
+
+
+def generar_csv(filas: Iterable[List[str]]) -> Iterator[bytes]:
+    """CSV UTF-8 con BOM (Excel lo abre con tildes correctas), por bloques"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff")
+    escritor.writerow([titulo for titulo, _ in COLUMNAS])
+    for n, fila in enumerate(filas, start=1):
+        escritor.writerow([_celda_csv(v) for v in fila])
+        if n % _FILAS_POR_BLOQUE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+# -----------------------------------------
+# XLSX
+# -----------------------------------------
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Casos" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_HOJA_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_HOJA_FIN = '</sheetData></worksheet>'
+
+# Caracteres de control que XML no admite
+_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _SalidaZip:
+    """Destino de escritura del zip: acumula bytes que el generador va entregando"""
+
+    def __init__(self):
+        self._pendiente = bytearray()
+
+    def write(self, datos: bytes) -> int:
+        self._pendiente.extend(datos)
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = bytes(self._pendiente)
+        self._pendiente.clear()
+        return datos
+
+
+def _fila_xml(valores: List[str]) -> str:
+    celdas = "".join(
+        f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_NO_XML.sub("", v))}</t></is></c>'
+        for v in valores
+    )
+    return f"<row>{celdas}</row>"
+
+
+def generar_xlsx(filas: Iterable[List[str]]) -> Iterator[bytes]:
+    """
+    Libro XLSX de una hoja escrito directamente como zip en streaming: la
+    hoja se comprime a medida que llegan las filas y los bytes se entregan
+    por bloques (el zip usa descriptores de datos, no necesita volver atrás).
+    Celdas de texto inline, sin sharedStrings ni estilos.
+    """
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        libro.writestr("_rels/.rels", _RELS)
+        libro.writestr("xl/workbook.xml", _WORKBOOK)
+        libro.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+
+        with libro.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as hoja:
+            bloque = [_HOJA_INICIO, _fila_xml([titulo for titulo, _ in COLUMNAS])]
+            for n, fila in enumerate(filas, start=1):
+                bloque.append(_fila_xml(fila))
+                if n % _FILAS_POR_BLOQUE == 0:
+                    hoja.write("".join(bloque).encode("utf-8"))
+                    bloque = []
+                    datos = salida.vaciar()
+                    if datos:
+                        yield datos
+            bloque.append(_HOJA_FIN)
+            hoja.write("".join(bloque).encode("utf-8"))
+    yield salida.vaciar()
+
+
+ESCRITORES = {"csv": generar_csv, "xlsx": generar_xlsx}
+
+
+def exportar_casos(formato: str, filters: Optional[CasoFilter] = None) -> Iterator[bytes]:
+    """
+    Contenido del archivo de exportación por bloques, para un StreamingResponse.
+    Abre su propia sesión de lectura (la de la dependency ya está cerrada
+    cuando se envía el cuerpo) y la cierra al terminar o si el cliente corta.
+    """
+    db = read_session()
+    try:
+        yield from ESCRITORES[formato](filas_casos(db, filters))
+    finally:
+        db.close()
@@ -1,13 +1,33 @@
 import httpx
-from typing import List, Dict, Any, Optional
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any, Optional
 from datetime import datetime
 
+try:
+    import h2  # noqa: F401  (habilita HTTP/2 en httpx)
+except ImportError:
+    h2 = None
+
 from app.config import settings
 from app.core.exceptions import EmailException
 
+logger = logging.getLogger(__name__)
+
+# El token se pide a otro host y es una respuesta pequeña
+TOKEN_TIMEOUT_SECONDS = 10
+
 
 class GraphService:
-    """Servicio para interactuar con Microsoft Graph API"""
+    """
+    Servicio para interactuar con Microsoft Graph API.
+
+    Usa un único httpx.AsyncClient por proceso, creado en `iniciar` y
+    cerrado en `cerrar` (lifespan de la app): las conexiones a Graph y a
+    login.microsoftonline.com se reutilizan con keep-alive en lugar de
+    pagar TCP + TLS en cada llamada. Fuera del lifespan (scripts) cada
+    llamada abre y cierra su propio cliente.
+    """
 
     def __init__(self):
         self.client_id = settings.MICROSOFT_CLIENT_ID
@@ -15,10 +35,53 @@ class GraphService:
         self.tenant_id = settings.MICROSOFT_TENANT_ID
         self.mailbox = settings.MAILBOX_ADDRESS
         self.access_token = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    # -----------------------------------------
+    # Cliente HTTP
+    # -----------------------------------------
+
+    @staticmethod
+    def _nuevo_cliente() -> httpx.AsyncClient:
+        http2 = settings.GRAPH_HTTP2 and h2 is not None
+        if settings.GRAPH_HTTP2 and not http2:
+            logger.warning("GRAPH_HTTP2 activo pero el paquete h2 no está instalado: se usa HTTP/1.1")
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.GRAPH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GRAPH_MAX_KEEPALIVE,
+                keepalive_expiry=settings.GRAPH_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(settings.GRAPH_TIMEOUT_SECONDS, connect=settings.GRAPH_CONNECT_TIMEOUT),
+        )
+
+    async def iniciar(self):
+        """Crear el cliente compartido (startup del lifespan)"""
+        if self._client is None:
+            self._client = self._nuevo_cliente()
+
+    async def cerrar(self):
+        """Cerrar el cliente compartido y sus conexiones (shutdown del lifespan)"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    @asynccontextmanager
+    async def _cliente(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self._client is not None:
+            yield self._client
+            return
+        async with self._nuevo_cliente() as client:
+            yield client
+
+    # -----------------------------------------
+    # Operaciones
+    # -----------------------------------------
 
     async def get_access_token(self) -> str:
         """Obtener token de acceso de Microsoft Graph"""
-        url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
+        url = f"{settings.GRAPH_LOGIN_URL}/{self.tenant_id}/oauth2/v2.0/token"
 
         data = {
             "client_id": self.client_id,
@@ -27,8 +90,8 @@ class GraphService:
             "grant_type": "client_credentials"
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, data=data)
+        async with self._cliente() as client:
+            response = await client.post(url, data=data, timeout=TOKEN_TIMEOUT_SECONDS)
             if response.status_code == 200:
                 self.access_token = response.json()["access_token"]
                 return self.access_token
@@ -45,7 +108,7 @@ class GraphService:
         if not self.access_token:
             await self.get_access_token()
 
-        url = f"https://graph.microsoft.com/v1.0/users/{self.mailbox}/mailFolders/{folder}/messages"
+        url = f"{settings.GRAPH_BASE_URL}/users/{self.mailbox}/mailFolders/{folder}/messages"
         params = {"$top": top}
 
         if filter_query:
@@ -53,7 +116,7 @@ class GraphService:
 
         headers = {"Authorization": f"Bearer {self.access_token}"}
 
-        async with httpx.AsyncClient() as client:
+        async with self._cliente() as client:
             response = await client.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 return response.json().get("value", [])
@@ -65,10 +128,10 @@ class GraphService:
         if not self.access_token:
             await self.get_access_token()
 
-        url = f"https://graph.microsoft.com/v1.0/users/{self.mailbox}/messages/{message_id}/attachments"
+        url = f"{settings.GRAPH_BASE_URL}/users/{self.mailbox}/messages/{message_id}/attachments"
         headers = {"Authorization": f"Bearer {self.access_token}"}
 
-        async with httpx.AsyncClient() as client:
+        async with self._cliente() as client:
             response = await client.get(url, headers=headers)
             if response.status_code == 200:
                 return response.json().get("value", [])
@@ -87,7 +150,7 @@ class GraphService:
         if not self.access_token:
             await self.get_access_token()
 
-        url = f"https://graph.microsoft.com/v1.0/users/{self.mailbox}/sendMail"
+        url = f"{settings.GRAPH_BASE_URL}/users/{self.mailbox}/sendMail"
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
@@ -110,8 +173,14 @@ class GraphService:
         if attachments:
             message["message"]["attachments"] = attachments
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=message)
+        async with self._cliente() as client:
+            # Los adjuntos van en base64 dentro del JSON: más margen que una lectura
+            response = await client.post(
+                url,
+                headers=headers,
+                json=message,
+                timeout=httpx.Timeout(settings.GRAPH_SEND_TIMEOUT_SECONDS, connect=settings.GRAPH_CONNECT_TIMEOUT)
+            )
             if response.status_code in [200, 202]:
                 return {"success": True}
             else:
@@ -122,7 +191,7 @@ class GraphService:
         if not self.access_token:
             await self.get_access_token()
 
-        url = f"https://graph.microsoft.com/v1.0/users/{self.mailbox}/messages/{message_id}"
+        url = f"{settings.GRAPH_BASE_URL}/users/{self.mailbox}/messages/{message_id}"
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
@@ -130,7 +199,7 @@ class GraphService:
 
         data = {"isRead": True}
 
-        async with httpx.AsyncClient() as client:
+        async with self._cliente() as client:
             response = await client.patch(url, headers=headers, json=data)
             return response.status_code == 200
 
@@ -0,0 +1,207 @@
+from sqlalchemy import func, select, update, insert, delete
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, Set
+from datetime import date, datetime, timedelta
+
+from app.core.bloqueos import bloquear_tabla
+from app.core.catalogos import catalogos
+from app.models.models import Caso, EstadoCaso, Usuario, ResumenMensualCaso
+
+
+# Casos que se confirman con un updatedAt anterior a la marca (transacciones
+# largas) se recogen igual: recalcular un mes dos veces no cambia el resultado
+_SOLAPE_MARCA = timedelta(minutes=5)
+
+# marcaCaso de los meses con casos borrados: el próximo `actualizar` los recalcula
+_MARCA_PENDIENTE = datetime(1900, 1, 1)
+
+SIN_RESPONSABLE = "Sin asignar"
+
+
+def inicio_mes(fecha: date) -> date:
+    return date(fecha.year, fecha.month, 1)
+
+
+def mes_siguiente(mes: date) -> date:
+    return date(mes.year + 1, 1, 1) if mes.month == 12 else date(mes.year, mes.month + 1, 1)
+
+
+def meses_atras(mes: date, n: int) -> date:
+    indice = mes.year * 12 + mes.month - 1 - n
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+class ResumenMensualService:
+    """
+    Resumen de casos por mes de recepción × tipoTramite × estado × responsable
+    en tab_resumenmensualcaso.
+
+    `actualizar` (job periódico) busca los meses con casos modificados desde
+    la última ejecución —la marca es el MAX(updatedAt) de tab_caso guardado
+    en las filas (marcaCaso)— y recalcula solo esos meses. Los borrados no
+    dejan updatedAt: `restar_caso` marca su mes como pendiente en la misma
+    transacción del DELETE. `reconstruir` recalcula todo (job nocturno) y
+    corrige cualquier deriva.
+    """
+
+    # -----------------------------------------
+    # Mantenimiento
+    # -----------------------------------------
+
+    @staticmethod
+    def marca(db: Session) -> Optional[datetime]:
+        return db.scalar(select(func.max(ResumenMensualCaso.marcaCaso)))
+
+    @staticmethod
+    def meses_modificados(db: Session, desde: Optional[datetime]) -> Set[date]:
+        """
+        Meses de recepción de los casos modificados después de `desde` (todos
+        si None), más los marcados como pendientes por un borrado
+        """
+        stmt = select(Caso.fechaRecepcion)
+        if desde:
+            stmt = stmt.where(Caso.updatedAt > desde)
+        filas = db.execute(stmt.execution_options(yield_per=5000)).scalars()
+        pendientes = db.execute(
+            select(ResumenMensualCaso.mes).where(ResumenMensualCaso.marcaCaso == _MARCA_PENDIENTE).distinct()
+        ).scalars()
+        return {inicio_mes(f) for f in filas} | set(pendientes)
+
+    @staticmethod
+    def _recalcular_mes(db: Session, mes: date, marca: datetime, ahora: datetime):
+        grupo = (Caso.tipoTramite, Caso.estadoCasoId, Caso.responsableId)
+        filas = db.execute(
+            select(*grupo, func.count(Caso.id))
+            .where(Caso.fechaRecepcion >= mes, Caso.fechaRecepcion < mes_siguiente(mes))
+            .group_by(*grupo)
+        ).all()
+        db.execute(
+            delete(ResumenMensualCaso)
+            .where(ResumenMensualCaso.mes == mes)
+            .execution_options(synchronize_session=False)
+        )
+        if filas:
+            db.execute(insert(ResumenMensualCaso), [
+                {
+                    "mes": mes, "tipoTramite": tipo, "estadoCasoId": estado, "responsableId": responsable,
+                    "total": total, "marcaCaso": marca, "updatedAt": ahora,
+                }
+                for tipo, estado, responsable, total in filas
+            ])
+
+    def actualizar(self, db: Session, completo: bool = False) -> int:
+        """
+        Recalcular los meses modificados desde la última marca (todos si
+        `completo` o si la tabla está vacía). Devuelve cuántos meses procesó.
+
+        Todo va en una transacción: si falla a la mitad no queda una marca
+        nueva que haga saltar los meses pendientes. La tabla se bloquea
+        antes de leer tab_caso, así un borrado que llega mientras tanto
+        espera el commit y marca su mes sobre las filas nuevas.
+        """
+        try:
+            bloquear_tabla(db, ResumenMensualCaso)
+            marca_nueva = db.scalar(select(func.max(Caso.updatedAt)))
+            if marca_nueva is None:
+                # Sin casos (p. ej. se borró el último): no queda nada que resumir
+                db.execute(delete(ResumenMensualCaso).execution_options(synchronize_session=False))
+                db.commit()
+                return 0
+
+            marca_anterior = None if completo else self.marca(db)
+            desde = marca_anterior - _SOLAPE_MARCA if marca_anterior else None
+            meses = self.meses_modificados(db, desde)
+
+            ahora = datetime.now()
+            if completo:
+                # Meses que ya no tienen casos
+                db.execute(
+                    delete(ResumenMensualCaso)
+                    .where(ResumenMensualCaso.mes.notin_(meses))
+                    .execution_options(synchronize_session=False)
+                )
+            for mes in sorted(meses):
+                self._recalcular_mes(db, mes, marca_nueva, ahora)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(meses)
+
+    def reconstruir(self, db: Session) -> int:
+        return self.actualizar(db, completo=True)
+
+    @staticmethod
+    def restar_caso(db: Session, caso: Caso):
+        """
+        Marcar el mes de un caso que se elimina para que `actualizar` lo
+        recalcule (el commit lo hace quien llama). No se descuenta del grupo
+        actual del caso: si cambió de estado o responsable desde el último
+        resumen, se restaría de una fila en la que no está.
+        """
+        db.execute(
+            update(ResumenMensualCaso)
+            .where(ResumenMensualCaso.mes == inicio_mes(caso.fechaRecepcion))
+            .values(marcaCaso=_MARCA_PENDIENTE, updatedAt=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    # -----------------------------------------
+    # Lectura
+    # -----------------------------------------
+
+    def leer(
+        self,
+        db: Session,
+        meses: int = 12,
+        tipo_tramite: Optional[str] = None,
+        responsable_id: Optional[int] = None,
+        hoy: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """Serie de los últimos `meses` meses (incluido el actual), con ceros en los meses sin casos"""
+        hasta = inicio_mes(hoy or date.today())
+        desde = meses_atras(hasta, meses - 1)
+
+        stmt = select(
+            ResumenMensualCaso.mes, ResumenMensualCaso.tipoTramite, ResumenMensualCaso.estadoCasoId,
+            ResumenMensualCaso.responsableId, ResumenMensualCaso.total,
+        ).where(ResumenMensualCaso.mes >= desde, ResumenMensualCaso.mes <= hasta, ResumenMensualCaso.total > 0)
+        if tipo_tramite:
+            stmt = stmt.where(ResumenMensualCaso.tipoTramite == tipo_tramite)
+        if responsable_id is not None:
+            stmt = stmt.where(ResumenMensualCaso.responsableId == responsable_id)
+        filas = db.execute(stmt).all()
+
+        responsables = {fila.responsableId for fila in filas if fila.responsableId is not None}
+        nombres = dict(
+            db.execute(select(Usuario.id, Usuario.nombre).where(Usuario.id.in_(responsables))).all()
+        ) if responsables else {}
+
+        serie: Dict[date, Dict[str, Any]] = {}
+        mes = desde
+        while mes <= hasta:
+            serie[mes] = {"mes": mes.strftime("%Y-%m"), "total": 0, "por_tipo": {}, "por_estado": {}, "por_responsable": {}}
+            mes = mes_siguiente(mes)
+
+        for fila in filas:
+            punto = serie[fila.mes]
+            estado = catalogos.por_id(EstadoCaso, fila.estadoCasoId, db=db)
+            etiquetas = (
+                ("por_tipo", fila.tipoTramite),
+                ("por_estado", estado.descripcion if estado else str(fila.estadoCasoId)),
+                ("por_responsable", nombres.get(fila.responsableId, str(fila.responsableId))
+                    if fila.responsableId is not None else SIN_RESPONSABLE),
+            )
+            punto["total"] += fila.total
+            for campo, etiqueta in etiquetas:
+                punto[campo][etiqueta] = punto[campo].get(etiqueta, 0) + fila.total
+
+        return {
+            "desde": desde,
+            "hasta": hasta,
+            "total": sum(p["total"] for p in serie.values()),
+            "meses": list(serie.values()),
+        }
+
+
+resumen_mensual_service = ResumenMensualService()
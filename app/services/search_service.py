@@ -0,0 +1,255 @@
+from sqlalchemy.orm import Session
+from typing import List, Dict, Tuple, Optional, Iterable
+from datetime import datetime, timedelta
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+import uuid
+
+from app.config import settings
+from app.models.models import Caso
+
+logger = logging.getLogger(__name__)
+
+
+# Peso de cada campo indexado en el puntaje (un acierto en el radicado
+# pesa más que uno en el detalle de la solicitud)
+CAMPOS_INDEXADOS = {
+    "radicado": 3,
+    "peticionarioNombre": 2,
+    "peticionarioCorreo": 2,
+    "detalleSolicitud": 1,
+}
+
+STOPWORDS_ES = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde
+durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este
+esto estos fue ha hay la las le les lo los mas me mi mis muy ni no nos o os otra otro
+para pero por porque que se segun ser si sin sobre su sus tambien te tiene tu un una
+uno unos y ya yo
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Parámetros BM25
+_K1 = 1.2
+_B = 0.75
+
+# Margen al sincronizar: un caso puede confirmarse después de otro con
+# updatedAt posterior; reindexar de más es inocuo
+_SOLAPE_SINCRONIZACION = timedelta(minutes=1)
+
+_ESTADO = ("_postings", "_doc_terms", "_doc_len", "_doc_por_id", "_id_por_doc", "_siguiente_doc", "_total_len")
+
+
+def normalizar(texto: str) -> str:
+    """Pasar a minúsculas y quitar tildes/diacríticos (á -> a, ñ -> n)"""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def _stem(token: str) -> str:
+    """Stemming ligero para español: unifica singular y plural"""
+    if len(token) > 4 and token.endswith("es"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    """Tokenizar texto en español de forma insensible a tildes y mayúsculas"""
+    if not texto:
+        return []
+    return [
+        _stem(token)
+        for token in _TOKEN_RE.findall(normalizar(texto))
+        if token not in STOPWORDS_ES
+    ]
+
+
+class CasoSearchIndex:
+    """
+    Índice invertido en memoria sobre radicado, peticionario y detalle de los casos.
+
+    Se construye completo una vez (job del scheduler) y luego se mantiene de
+    forma incremental: caso_service lo actualiza al crear/actualizar/eliminar
+    en este proceso y `sincronizar` recoge cada minuto lo modificado por otros
+    workers (updatedAt > última sincronización).
+
+    La búsqueda es AND sobre los términos, empezando por la lista de
+    postings más corta, y ordena los candidatos por BM25.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self.ultima_sincronizacion: Optional[datetime] = None
+
+    def _reset(self):
+        # término -> {doc: frecuencia ponderada}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # doc -> términos indexados (para poder desindexar en una actualización)
+        self._doc_terms: Dict[int, Dict[str, int]] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._doc_por_id: Dict[uuid.UUID, int] = {}
+        self._id_por_doc: Dict[int, uuid.UUID] = {}
+        self._siguiente_doc = 0
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_por_id)
+
+    # -----------------------------------------
+    # Mantenimiento
+    # -----------------------------------------
+
+    @staticmethod
+    def _terminos(valores: Dict[str, Optional[str]]) -> Dict[str, int]:
+        terminos: Dict[str, int] = {}
+        for campo, peso in CAMPOS_INDEXADOS.items():
+            for token in tokenizar(valores.get(campo)):
+                terminos[token] = terminos.get(token, 0) + peso
+        return terminos
+
+    def _quitar(self, doc: int):
+        for termino in self._doc_terms.pop(doc, {}):
+            posting = self._postings.get(termino)
+            if posting is not None:
+                posting.pop(doc, None)
+                if not posting:
+                    del self._postings[termino]
+        self._total_len -= self._doc_len.pop(doc, 0)
+
+    def _indexar(self, caso_id: uuid.UUID, valores: Dict[str, Optional[str]]):
+        doc = self._doc_por_id.get(caso_id)
+        if doc is None:
+            doc = self._siguiente_doc
+            self._siguiente_doc += 1
+            self._doc_por_id[caso_id] = doc
+            self._id_por_doc[doc] = caso_id
+        else:
+            self._quitar(doc)
+
+        terminos = self._terminos(valores)
+        for termino, frecuencia in terminos.items():
+            self._postings.setdefault(termino, {})[doc] = frecuencia
+        self._doc_terms[doc] = terminos
+        longitud = sum(terminos.values())
+        self._doc_len[doc] = longitud
+        self._total_len += longitud
+
+    def indexar(self, caso: Caso):
+        """Indexar (o reindexar) un caso. No hace nada si el índice no está construido"""
+        if not self.ready:
+            return
+        valores = {campo: getattr(caso, campo) for campo in CAMPOS_INDEXADOS}
+        with self._lock:
+            self._indexar(caso.id, valores)
+
+    def eliminar(self, caso_id: uuid.UUID):
+        """Quitar un caso del índice"""
+        if not self.ready:
+            return
+        with self._lock:
+            doc = self._doc_por_id.pop(caso_id, None)
+            if doc is not None:
+                self._id_por_doc.pop(doc, None)
+                self._quitar(doc)
+
+    @staticmethod
+    def _filas(db: Session, desde: Optional[datetime]) -> Iterable:
+        columnas = [Caso.id, Caso.updatedAt] + [getattr(Caso, c) for c in CAMPOS_INDEXADOS]
+        query = db.query(*columnas)
+        if desde:
+            query = query.filter(Caso.updatedAt > desde)
+        return query.yield_per(1000)
+
+    def reconstruir(self, db: Session) -> int:
+        """Construir el índice completo desde la base de datos"""
+        nuevo = CasoSearchIndex()
+        marca = None
+        for fila in self._filas(db, None):
+            nuevo._indexar(fila.id, fila._asdict())
+            if marca is None or fila.updatedAt > marca:
+                marca = fila.updatedAt
+
+        with self._lock:
+            for atributo in _ESTADO:
+                setattr(self, atributo, getattr(nuevo, atributo))
+            self.ultima_sincronizacion = marca
+            self.ready = True
+        logger.info(f"Índice de búsqueda construido con {len(self)} casos")
+        return len(self)
+
+    def sincronizar(self, db: Session) -> int:
+        """Reindexar los casos modificados desde la última sincronización"""
+        if not self.ready:
+            return self.reconstruir(db)
+
+        procesados = 0
+        marca = self.ultima_sincronizacion
+        desde = marca - _SOLAPE_SINCRONIZACION if marca else None
+        for fila in self._filas(db, desde):
+            with self._lock:
+                self._indexar(fila.id, fila._asdict())
+            if marca is None or fila.updatedAt > marca:
+                marca = fila.updatedAt
+            procesados += 1
+        self.ultima_sincronizacion = marca
+        return procesados
+
+    # -----------------------------------------
+    # Consulta
+    # -----------------------------------------
+
+    def buscar(self, texto: str, limite: int = 100) -> List[Tuple[uuid.UUID, float]]:
+        """Buscar casos que contengan todos los términos, ordenados por relevancia"""
+        terminos = list(dict.fromkeys(tokenizar(texto)))
+        if not terminos:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(t) for t in terminos]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+
+            total_docs = len(self._doc_len)
+            promedio = self._total_len / total_docs if total_docs else 1
+            idfs = [
+                math.log(1 + (total_docs - len(p) + 0.5) / (len(p) + 0.5))
+                for p in postings
+            ]
+
+            def puntaje(doc: int) -> float:
+                norma = _K1 * (1 - _B + _B * self._doc_len[doc] / promedio)
+                total = 0.0
+                for posting, idf in zip(postings, idfs):
+                    tf = posting[doc]
+                    total += idf * tf * (_K1 + 1) / (tf + norma)
+                return total
+
+            mas_corta, resto = postings[0], postings[1:]
+            candidatos = (d for d in mas_corta if all(d in p for p in resto))
+            mejores = heapq.nlargest(limite, ((puntaje(d), d) for d in candidatos))
+            return [(self._id_por_doc[doc], score) for score, doc in mejores]
+
+    def buscar_ids(self, texto: str) -> Optional[List[uuid.UUID]]:
+        """
+        IDs de todos los casos que coinciden, o None si pasan de
+        SEARCH_MAX_RESULTS: una lista recortada dejaría fuera casos del
+        listado, del total, de las actualizaciones masivas y de la exportación.
+        """
+        tope = settings.SEARCH_MAX_RESULTS
+        encontrados = self.buscar(texto, tope + 1)
+        if len(encontrados) > tope:
+            return None
+        return [caso_id for caso_id, _ in encontrados]
+
+
+caso_search_index = CasoSearchIndex()
@@ -0,0 +1,88 @@
+from sqlalchemy import case, update, and_
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+from datetime import date, datetime, time, timedelta
+
+from app.core.catalogos import catalogos
+from app.models.models import Caso, EstadoCaso, Semaforo
+from app.services.dashboard_service import dashboard_service, SEMAFORO
+
+
+# Estados en los que el caso ya no corre contra su fecha de vencimiento
+ESTADOS_CERRADOS = ("CERRADO", "ENVIADO_ENTIDAD")
+
+
+class SemaforoService:
+    """Recalcular el semáforo de los casos abiertos según tab_semaforo"""
+
+    @staticmethod
+    def _umbral(hoy: date, dias: int) -> datetime:
+        # Días restantes = días calendario entre hoy y la fecha de vencimiento
+        # (igual que DATEDIFF(day, hoy, fechaVencimiento)). "Quedan al menos
+        # `dias`" equivale a vencer a partir de la medianoche de hoy + dias,
+        # así la columna se compara sin funciones y se usa su índice.
+        return datetime.combine(hoy + timedelta(days=dias), time.min)
+
+    def expresion_semaforo(self, db: Session, hoy: date):
+        """
+        CASE que asigna la banda de tab_semaforo a cada caso: la de mayor
+        diasMin que el caso alcanza; los vencidos caen en la más urgente.
+        """
+        bandas = sorted(catalogos.listar(Semaforo, db=db), key=lambda s: s.diasMin, reverse=True)
+        if not bandas:
+            return None
+        *holgadas, mas_urgente = bandas
+        if not holgadas:
+            return mas_urgente.id
+        return case(
+            *[(Caso.fechaVencimiento >= self._umbral(hoy, b.diasMin), b.id) for b in holgadas],
+            else_=mas_urgente.id
+        )
+
+    def recalcular(self, db: Session, hoy: Optional[date] = None) -> Dict[str, object]:
+        """
+        Un solo UPDATE ... SET semaforoId = CASE ... sobre los casos abiertos
+        cuyo semáforo no coincide con el calculado; las filas correctas no se
+        tocan. updatedAt se conserva: el paso del tiempo no es una
+        modificación del caso (ni debe disparar el resumen mensual).
+        Devuelve cuántos casos entraron en cada banda.
+        """
+        hoy = hoy or date.today()
+        nuevo = self.expresion_semaforo(db, hoy)
+        if nuevo is None:
+            return {"fecha": hoy, "actualizados": 0, "por_semaforo": {}}
+
+        cerrados = [
+            e.id for e in (catalogos.por_codigo(EstadoCaso, c, db=db) for c in ESTADOS_CERRADOS) if e
+        ]
+        criterios = [Caso.semaforoId != nuevo]
+        if cerrados:
+            criterios.append(Caso.estadoCasoId.notin_(cerrados))
+
+        stmt = (
+            update(Caso)
+            .where(and_(*criterios))
+            .values(semaforoId=nuevo, updatedAt=Caso.updatedAt)
+            .returning(Caso.semaforoId)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            nuevos_ids = db.execute(stmt).scalars().all()
+            if nuevos_ids:
+                # Los contadores por semáforo se recalculan en la misma transacción
+                dashboard_service.reconciliar(db, [SEMAFORO], commit=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        por_semaforo: Dict[str, int] = {}
+        for semaforo_id in nuevos_ids:
+            semaforo = catalogos.por_id(Semaforo, semaforo_id, db=db)
+            codigo = semaforo.codigo if semaforo else str(semaforo_id)
+            por_semaforo[codigo] = por_semaforo.get(codigo, 0) + 1
+
+        return {"fecha": hoy, "actualizados": len(nuevos_ids), "por_semaforo": por_semaforo}
+
+
+semaforo_service = SemaforoService()
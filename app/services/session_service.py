@@ -1,8 +1,13 @@
+from sqlalchemy import select, update, delete
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 import logging
+import time
+import uuid
 
+from app.core.revocaciones import revocaciones, hash_token
 from app.models.models import Sesion, Usuario
 from app.schemas.sesion import SesionCreate, SesionInDB
 
@@ -10,7 +15,15 @@ logger = logging.getLogger(__name__)
 
 
 class SessionService:
-    """Servicio para gestionar sesiones de usuario"""
+    """
+    Servicio para gestionar sesiones de usuario.
+
+    El id de la sesión va en los tokens (claim `sid`) y la sesión dura lo
+    que su refresh token; se guarda además el SHA-256 del access token del
+    login, no el token. Invalidar una sesión marca fechaRevocacion y la
+    agrega al registro de revocaciones, que get_current_user y /auth/refresh
+    consultan en memoria.
+    """
     
     @staticmethod
     def create_session(
@@ -19,7 +32,8 @@ class SessionService:
         token: str,
         expiration_hours: int,
         ip_origen: Optional[str] = None,
-        user_agent: Optional[str] = None
+        user_agent: Optional[str] = None,
+        sesion_id: Optional[uuid.UUID] = None
     ) -> Optional[Sesion]:
         """
         Crear un nuevo registro de sesión en la base de datos.
@@ -31,6 +45,7 @@ class SessionService:
             expiration_hours: Horas hasta la expiración del token
             ip_origen: IP del cliente (opcional)
             user_agent: User agent del navegador (opcional)
+            sesion_id: Id de la sesión, el mismo del claim sid de los tokens (opcional)
             
         Returns:
             Objeto Sesion creado o None si hay error
@@ -47,8 +62,9 @@ class SessionService:
             
             # Crear nueva sesión
             nueva_sesion = Sesion(
+                id=sesion_id or uuid.uuid4(),
                 usuarioId=usuario_id,
-                token=token[:500],  # Limitar a 500 caracteres
+                tokenHash=hash_token(token),
                 fechaExpiracion=fecha_expiracion,
                 activa=True,
                 ipOrigen=ip_origen,
@@ -67,6 +83,58 @@ class SessionService:
             db.rollback()
             return None
     
+    @staticmethod
+    async def create_session_async(
+        db: AsyncSession,
+        usuario_id: int,
+        token: str,
+        expiration_hours: int,
+        ip_origen: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        sesion_id: Optional[uuid.UUID] = None
+    ) -> Optional[Sesion]:
+        """
+        Crear un nuevo registro de sesión (versión async de create_session).
+
+        Args:
+            db: Sesión async de base de datos
+            usuario_id: ID del usuario autenticado
+            token: Access token JWT generado
+            expiration_hours: Horas hasta la expiración del token
+            ip_origen: IP del cliente (opcional)
+            user_agent: User agent del navegador (opcional)
+            sesion_id: Id de la sesión, el mismo del claim sid de los tokens (opcional)
+
+        Returns:
+            Objeto Sesion creado o None si hay error
+        """
+        try:
+            usuario = await db.get(Usuario, usuario_id)
+            if not usuario:
+                logger.error(f"Usuario {usuario_id} no encontrado al crear sesión")
+                return None
+
+            nueva_sesion = Sesion(
+                id=sesion_id or uuid.uuid4(),
+                usuarioId=usuario_id,
+                tokenHash=hash_token(token),
+                fechaExpiracion=datetime.now() + timedelta(hours=expiration_hours),
+                activa=True,
+                ipOrigen=ip_origen,
+                userAgent=user_agent
+            )
+
+            db.add(nueva_sesion)
+            await db.commit()
+
+            logger.info(f"Sesión creada exitosamente para usuario {usuario_id}")
+            return nueva_sesion
+
+        except Exception as e:
+            logger.error(f"Error al crear sesión para usuario {usuario_id}: {str(e)}")
+            await db.rollback()
+            return None
+
     @staticmethod
     def get_active_sessions(
         db: Session,
@@ -111,7 +179,9 @@ class SessionService:
             sesion = db.query(Sesion).filter(Sesion.id == session_id).first()
             if sesion:
                 sesion.activa = False
+                sesion.fechaRevocacion = datetime.now()
                 db.commit()
+                revocaciones.agregar([(sesion.id, sesion.tokenHash, sesion.fechaExpiracion)])
                 logger.info(f"Sesión {session_id} invalidada")
                 return True
             return False
@@ -136,11 +206,15 @@ class SessionService:
             Número de sesiones invalidadas
         """
         try:
-            result = db.query(Sesion).filter(
-                Sesion.usuarioId == usuario_id,
-                Sesion.activa == True
-            ).update({"activa": False})
+            filtro = (Sesion.usuarioId == usuario_id, Sesion.activa == True)
+            revocadas = db.execute(
+                select(Sesion.id, Sesion.tokenHash, Sesion.fechaExpiracion).where(*filtro)
+            ).all()
+            result = db.query(Sesion).filter(*filtro).update(
+                {"activa": False, "fechaRevocacion": datetime.now()}, synchronize_session=False
+            )
             db.commit()
+            revocaciones.agregar(revocadas)
             logger.info(f"{result} sesiones invalidadas para usuario {usuario_id}")
             return result
         except Exception as e:
@@ -148,6 +222,88 @@ class SessionService:
             db.rollback()
             return 0
     
+    @staticmethod
+    async def renew_session_async(
+        db: AsyncSession,
+        sesion_id: uuid.UUID,
+        expiration_hours: int
+    ) -> bool:
+        """
+        Extender una sesión no revocada hasta la expiración del refresh token
+        recién emitido (/auth/refresh), para que una revocación posterior se
+        recuerde mientras ese token sea válido.
+
+        Returns:
+            True si la sesión existe y no está revocada
+        """
+        try:
+            result = await db.execute(
+                update(Sesion)
+                .where(Sesion.id == sesion_id, Sesion.fechaRevocacion.is_(None))
+                .values(fechaExpiracion=datetime.now() + timedelta(hours=expiration_hours))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return result.rowcount > 0
+        except Exception as e:
+            logger.error(f"Error al renovar la sesión {sesion_id}: {str(e)}")
+            await db.rollback()
+            return False
+
+    @staticmethod
+    async def revoke_token_async(
+        db: AsyncSession,
+        usuario_id: int,
+        token: str,
+        fecha_expiracion: datetime,
+        sesion_id: Optional[uuid.UUID] = None
+    ) -> bool:
+        """
+        Revocar la sesión de un token (logout): la del claim sid si el token
+        lo trae, o la registrada con el hash del token. Si no hay sesión
+        registrada (p. ej. un refresh token sin sid) se crea una ya revocada,
+        para que los demás workers también lo rechacen.
+
+        Args:
+            db: Sesión async de base de datos
+            usuario_id: ID del usuario dueño del token
+            token: JWT a revocar
+            fecha_expiracion: Expiración del token (hasta entonces se recuerda)
+            sesion_id: Id de la sesión (claim sid), si el token lo trae
+
+        Returns:
+            True si se revocó exitosamente, False en caso contrario
+        """
+        token_hash = hash_token(token)
+        ahora = datetime.now()
+        filtro = Sesion.id == sesion_id if sesion_id is not None else Sesion.tokenHash == token_hash
+        try:
+            sesion = await db.scalar(select(Sesion).where(filtro, Sesion.usuarioId == usuario_id))
+            if sesion is None:
+                sesion = Sesion(
+                    id=sesion_id or uuid.uuid4(),
+                    usuarioId=usuario_id,
+                    tokenHash=token_hash,
+                    fechaExpiracion=fecha_expiracion,
+                    activa=False,
+                    fechaRevocacion=ahora
+                )
+                db.add(sesion)
+            else:
+                if sesion.fechaRevocacion is None:
+                    sesion.activa = False
+                    sesion.fechaRevocacion = ahora
+                # Se recuerda mientras quede algún token de la sesión vigente
+                sesion.fechaExpiracion = max(sesion.fechaExpiracion, fecha_expiracion)
+            revocada = (sesion.id, sesion.tokenHash, sesion.fechaExpiracion)
+            await db.commit()
+            revocaciones.agregar([revocada])
+            return True
+        except Exception as e:
+            logger.error(f"Error al revocar token del usuario {usuario_id}: {str(e)}")
+            await db.rollback()
+            return False
+
     @staticmethod
     def cleanup_expired_sessions(db: Session) -> int:
         """
@@ -172,3 +328,63 @@ class SessionService:
             logger.error(f"Error al limpiar sesiones expiradas: {str(e)}")
             db.rollback()
             return 0
+
+    @staticmethod
+    def purge_expired_sessions(
+        db: Session,
+        retencion_dias: int,
+        tamano_lote: int = 1000,
+        pausa_ms: int = 200
+    ) -> Dict[str, Any]:
+        """
+        Borrar las sesiones expiradas hace más de `retencion_dias` días, en
+        lotes de `tamano_lote` filas con una transacción por lote y una pausa
+        entre lotes. Cada DELETE toca pocas filas (por debajo del umbral de
+        escalado a bloqueo de tabla de SQL Server) y los logins concurrentes
+        no esperan detrás de un borrado largo.
+
+        Args:
+            db: Sesión de base de datos
+            retencion_dias: Días que se conserva una sesión después de expirar
+            tamano_lote: Filas por DELETE (máximo 2100 por los parámetros del IN)
+            pausa_ms: Espera entre lotes
+
+        Returns:
+            Resumen de la ejecución: eliminadas, lotes, segundos y filas_por_segundo
+        """
+        corte = datetime.now() - timedelta(days=retencion_dias)
+        eliminadas = lotes = 0
+        inicio = time.monotonic()
+
+        while True:
+            # Las más antiguas primero, por el índice de fechaExpiracion
+            ids = db.execute(
+                select(Sesion.id)
+                .where(Sesion.fechaExpiracion < corte)
+                .order_by(Sesion.fechaExpiracion)
+                .limit(tamano_lote)
+            ).scalars().all()
+            if not ids:
+                break
+            try:
+                db.execute(
+                    delete(Sesion).where(Sesion.id.in_(ids)).execution_options(synchronize_session=False)
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            eliminadas += len(ids)
+            lotes += 1
+            if len(ids) < tamano_lote:
+                break
+            if pausa_ms > 0:
+                time.sleep(pausa_ms / 1000)
+
+        segundos = time.monotonic() - inicio
+        return {
+            "eliminadas": eliminadas,
+            "lotes": lotes,
+            "segundos": round(segundos, 3),
+            "filas_por_segundo": round(eliminadas / segundos, 1) if segundos > 0 else 0.0,
+        }
@@ -0,0 +1,226 @@
+from sqlalchemy import func, select, update, insert, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Optional, Tuple
+from datetime import date, datetime
+import json
+
+from app.core.bloqueos import bloquear_tabla
+from app.core.tdigest import TDigest
+from app.models.models import Caso, Usuario, SketchTiempoRespuesta
+from app.services.resumen_mensual_service import inicio_mes, mes_siguiente, meses_atras, SIN_RESPONSABLE
+
+
+PERCENTILES = {"p50": 0.50, "p90": 0.90, "p99": 0.99}
+
+# (fechaRecepcion, correoEnvioFecha, tipoTramite, responsableId)
+Cierre = Tuple[datetime, datetime, str, Optional[int]]
+Bucket = Tuple[date, str, Optional[int]]
+
+
+def horas_respuesta(recepcion: datetime, envio: datetime) -> float:
+    return max(0.0, (envio - recepcion).total_seconds() / 3600)
+
+
+def _resumen(digest: TDigest) -> Dict[str, Any]:
+    resumen = {"conteo": int(digest.conteo), "promedio": None}
+    resumen.update({nombre: None for nombre in PERCENTILES})
+    if digest.conteo:
+        resumen["promedio"] = round(digest.promedio, 2)
+        for nombre, q in PERCENTILES.items():
+            resumen[nombre] = round(digest.cuantil(q), 2)
+    return resumen
+
+
+class TiemposRespuestaService:
+    """
+    Tiempo de respuesta (horas entre fechaRecepcion y correoEnvioFecha) como
+    t-digests en tab_sketchtiemporespuesta, uno por mes de cierre × tipo
+    de trámite × responsable.
+
+    Cuando un caso recibe su correoEnvioFecha se suma a su bucket en la
+    misma transacción (`registrar_cierres`). Los percentiles de cualquier
+    combinación de buckets salen de fusionar sus digests al consultar, sin
+    ordenar el histórico. Un digest no permite quitar valores: correcciones
+    de fechas, reasignaciones posteriores al cierre o casos borrados quedan
+    en el sketch hasta la reconstrucción nocturna (`reconstruir`).
+    """
+
+    # -----------------------------------------
+    # Mantenimiento
+    # -----------------------------------------
+
+    @staticmethod
+    def _digest(fila) -> TDigest:
+        return TDigest.from_dict(
+            json.loads(fila.digest), fila.conteo, fila.sumaHoras, fila.minimoHoras, fila.maximoHoras
+        )
+
+    @staticmethod
+    def _columnas(digest: TDigest) -> Dict[str, Any]:
+        return {
+            "conteo": int(digest.conteo),
+            "sumaHoras": digest.suma,
+            "minimoHoras": digest.minimo,
+            "maximoHoras": digest.maximo,
+            "digest": json.dumps(digest.to_dict(), separators=(",", ":")),
+            "updatedAt": datetime.now(),
+        }
+
+    @staticmethod
+    def agrupar(cierres: Iterable[Cierre]) -> Dict[Bucket, TDigest]:
+        por_bucket: Dict[Bucket, TDigest] = {}
+        for recepcion, envio, tipo, responsable in cierres:
+            clave = (inicio_mes(envio), tipo, responsable)
+            por_bucket.setdefault(clave, TDigest()).agregar(horas_respuesta(recepcion, envio))
+        return por_bucket
+
+    @staticmethod
+    def consulta_bucket(bucket: Bucket):
+        """
+        SELECT del bucket con bloqueo de la fila hasta el commit: dos cierres
+        simultáneos del mismo bucket se serializan en lugar de pisarse.
+        En SQL Server FOR UPDATE no existe (el dialecto lo omite): el
+        bloqueo es el hint UPDLOCK; with_for_update cubre otros motores.
+        """
+        mes, tipo, responsable = bucket
+        columnas = (
+            SketchTiempoRespuesta.id, SketchTiempoRespuesta.conteo, SketchTiempoRespuesta.sumaHoras,
+            SketchTiempoRespuesta.minimoHoras, SketchTiempoRespuesta.maximoHoras, SketchTiempoRespuesta.digest,
+        )
+        return (
+            select(*columnas)
+            .where(
+                SketchTiempoRespuesta.mes == mes,
+                SketchTiempoRespuesta.tipoTramite == tipo,
+                SketchTiempoRespuesta.responsableId == responsable,
+            )
+            .with_hint(SketchTiempoRespuesta, "WITH (UPDLOCK, ROWLOCK)", "mssql")
+            .with_for_update()
+        )
+
+    def _fusionar_en_bucket(self, db: Session, bucket: Bucket, nuevo: TDigest):
+        mes, tipo, responsable = bucket
+        consulta = self.consulta_bucket(bucket)
+
+        fila = db.execute(consulta).first()
+        if fila is None:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(SketchTiempoRespuesta).values(
+                        mes=mes, tipoTramite=tipo, responsableId=responsable, **self._columnas(nuevo)
+                    ))
+                return
+            except IntegrityError:
+                # Otro proceso creó el bucket entre el SELECT y el INSERT
+                fila = db.execute(consulta).first()
+
+        digest = self._digest(fila).fusionar(nuevo)
+        db.execute(
+            update(SketchTiempoRespuesta)
+            .where(SketchTiempoRespuesta.id == fila.id)
+            .values(**self._columnas(digest))
+            .execution_options(synchronize_session=False)
+        )
+
+    def registrar_cierres(self, db: Session, cierres: Iterable[Cierre]):
+        """Sumar casos que acaban de cerrarse (el commit lo hace quien llama)"""
+        for bucket, digest in self.agrupar(cierres).items():
+            self._fusionar_en_bucket(db, bucket, digest)
+
+    def reconstruir(self, db: Session) -> int:
+        """
+        Recalcular todos los sketches desde tab_caso. Devuelve cuántos buckets quedaron.
+
+        La tabla se bloquea antes de leer los cierres: un cierre que llega
+        mientras tanto espera el commit y se suma sobre los sketches nuevos
+        en lugar de perderse con el DELETE.
+        """
+        try:
+            bloquear_tabla(db, SketchTiempoRespuesta)
+            stmt = select(
+                Caso.fechaRecepcion, Caso.correoEnvioFecha, Caso.tipoTramite, Caso.responsableId
+            ).where(Caso.correoEnvioFecha.isnot(None))
+            por_bucket = self.agrupar(db.execute(stmt.execution_options(yield_per=5000)))
+
+            db.execute(delete(SketchTiempoRespuesta).execution_options(synchronize_session=False))
+            if por_bucket:
+                db.execute(insert(SketchTiempoRespuesta), [
+                    {"mes": mes, "tipoTramite": tipo, "responsableId": responsable, **self._columnas(digest)}
+                    for (mes, tipo, responsable), digest in por_bucket.items()
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(por_bucket)
+
+    def inicializar(self, db: Session) -> bool:
+        """Construir los sketches si la tabla está vacía (base recién migrada)"""
+        if db.scalar(select(func.count(SketchTiempoRespuesta.id))):
+            return False
+        self.reconstruir(db)
+        return True
+
+    # -----------------------------------------
+    # Lectura
+    # -----------------------------------------
+
+    def leer(
+        self,
+        db: Session,
+        meses: int = 12,
+        tipo_tramite: Optional[str] = None,
+        responsable_id: Optional[int] = None,
+        hoy: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """Percentiles de horas de respuesta en los últimos `meses` meses de cierre"""
+        hasta = inicio_mes(hoy or date.today())
+        desde = meses_atras(hasta, meses - 1)
+
+        stmt = select(SketchTiempoRespuesta).where(
+            SketchTiempoRespuesta.mes >= desde, SketchTiempoRespuesta.mes <= hasta
+        )
+        if tipo_tramite:
+            stmt = stmt.where(SketchTiempoRespuesta.tipoTramite == tipo_tramite)
+        if responsable_id is not None:
+            stmt = stmt.where(SketchTiempoRespuesta.responsableId == responsable_id)
+        filas = db.execute(stmt).scalars().all()
+
+        responsables = {f.responsableId for f in filas if f.responsableId is not None}
+        nombres = dict(
+            db.execute(select(Usuario.id, Usuario.nombre).where(Usuario.id.in_(responsables))).all()
+        ) if responsables else {}
+
+        por_mes: Dict[date, TDigest] = {}
+        mes = desde
+        while mes <= hasta:
+            por_mes[mes] = TDigest()
+            mes = mes_siguiente(mes)
+        por_tipo: Dict[str, TDigest] = {}
+        por_responsable: Dict[str, TDigest] = {}
+        total = TDigest()
+
+        for fila in filas:
+            digest = self._digest(fila)
+            responsable = (
+                nombres.get(fila.responsableId, str(fila.responsableId))
+                if fila.responsableId is not None else SIN_RESPONSABLE
+            )
+            por_mes[fila.mes].fusionar(digest)
+            por_tipo.setdefault(fila.tipoTramite, TDigest()).fusionar(digest)
+            por_responsable.setdefault(responsable, TDigest()).fusionar(digest)
+            total.fusionar(digest)
+
+        return {
+            "desde": desde,
+            "hasta": hasta,
+            "unidad": "horas",
+            "total": _resumen(total),
+            "por_tipo": {tipo: _resumen(d) for tipo, d in por_tipo.items()},
+            "por_responsable": {nombre: _resumen(d) for nombre, d in por_responsable.items()},
+            "por_mes": [{"mes": m.strftime("%Y-%m"), **_resumen(d)} for m, d in por_mes.items()],
+        }
+
+
+tiempos_respuesta_service = TiemposRespuestaService()
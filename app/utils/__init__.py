@@ -7,7 +7,9 @@ from app.utils.helpers import (
     sanitize_filename,
     truncate_text,
     parse_priority,
-    format_file_size
+    format_file_size,
+    encode_cursor,
+    decode_cursor
 )
 
 __all__ = [
@@ -18,5 +20,7 @@ __all__ = [
     "sanitize_filename",
     "truncate_text",
     "parse_priority",
-    "format_file_size"
+    "format_file_size",
+    "encode_cursor",
+    "decode_cursor"
 ]
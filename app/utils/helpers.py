@@ -1,5 +1,7 @@
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 from datetime import datetime
+import base64
+import json
 import re
 
 
@@ -63,3 +65,19 @@ def format_file_size(size_bytes: int) -> str:
 def build_filter_query(filters: Dict[str, Any]) -> Dict[str, Any]:
     """Construir diccionario de filtros eliminando None"""
     return {k: v for k, v in filters.items() if v is not None}
+
+
+def encode_cursor(fecha: datetime, id_valor: Any) -> str:
+    """Codificar cursor opaco (fecha, id) para paginación keyset"""
+    payload = json.dumps([fecha.isoformat(), str(id_valor)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decodificar cursor opaco. Lanza ValueError si el cursor es inválido"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        fecha, id_valor = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return datetime.fromisoformat(fecha), str(id_valor)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor de paginación inválido") from e
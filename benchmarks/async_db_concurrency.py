@@ -0,0 +1,92 @@
+"""
+Benchmark: throughput de consultas concurrentes con el engine síncrono vs el async.
+
+Simula N requests concurrentes dentro de un único event loop (como un worker
+de uvicorn). Cada request ejecuta una consulta con latencia artificial:
+- SQL Server: WAITFOR DELAY
+- SQLite: función sleep_ms registrada en cada conexión
+
+Con el engine síncrono cada consulta bloquea el event loop y las requests se
+serializan; con AsyncSession la espera de I/O se solapa hasta el tamaño del pool.
+
+Uso:
+    python benchmarks/async_db_concurrency.py --requests 200 --concurrency 50 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+
+from app.database import engine, async_engine, SessionLocal, AsyncSessionLocal
+
+
+def _registrar_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+def consulta_lenta(latency_ms: int):
+    if engine.dialect.name == "mssql":
+        segundos = latency_ms / 1000
+        return text(f"WAITFOR DELAY '00:00:{segundos:06.3f}'; SELECT 1")
+    return text("SELECT sleep_ms(:ms)").bindparams(ms=latency_ms)
+
+
+async def request_sync(sql):
+    # Lo que hace hoy un endpoint `async def` con Session síncrona
+    db = SessionLocal()
+    try:
+        db.execute(sql)
+    finally:
+        db.close()
+
+
+async def request_async(sql):
+    async with AsyncSessionLocal() as db:
+        await db.execute(sql)
+
+
+async def ejecutar(handler, sql, total: int, concurrencia: int) -> float:
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with semaforo:
+            await handler(sql)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(total)))
+    return time.perf_counter() - inicio
+
+
+async def main(args):
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _registrar_sleep)
+        event.listen(async_engine.sync_engine, "connect", _registrar_sleep)
+
+    sql = consulta_lenta(args.latency_ms)
+
+    # Calentar los pools
+    await ejecutar(request_sync, sql, 5, 5)
+    await ejecutar(request_async, sql, 15, 15)
+
+    print(f"Requests: {args.requests}  Concurrencia: {args.concurrency}  Latencia query: {args.latency_ms} ms")
+    print(f"Dialecto: {engine.dialect.name}")
+    for nombre, handler in (("sync (Session)", request_sync), ("async (AsyncSession)", request_async)):
+        duracion = await ejecutar(handler, sql, args.requests, args.concurrency)
+        print(f"  {nombre:22} {duracion:7.2f} s  {args.requests / duracion:8.1f} req/s")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,139 @@
+"""
+Benchmark: llamadas a Graph con un cliente HTTP por llamada vs el cliente compartido.
+
+Levanta un Graph simulado local (uvicorn en un hilo) que responde al token
+y a la lista de mensajes, y ejecuta N llamadas a GraphService.get_messages
+con cierta concurrencia de dos formas:
+- cliente por llamada: sin `iniciar`, cada llamada abre y cierra su
+  httpx.AsyncClient (conexión TCP nueva; TLS nuevo si se usa --certfile)
+- cliente compartido: con `iniciar`, como en la API (keep-alive)
+
+Con --certfile/--keyfile el mock sirve HTTPS (certificado para 127.0.0.1,
+p. ej. generado con openssl) y la diferencia incluye el handshake TLS,
+que es lo que se paga contra graph.microsoft.com.
+
+Uso:
+    python benchmarks/graph_http_client.py --requests 500 --concurrency 20 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _configurar(args) -> str:
+    # La configuración se lee al importar app.config: el entorno va antes
+    esquema = "https" if args.certfile else "http"
+    base = f"{esquema}://127.0.0.1:{args.port}"
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["GRAPH_BASE_URL"] = f"{base}/v1.0"
+    os.environ["GRAPH_LOGIN_URL"] = base
+    os.environ["MICROSOFT_TENANT_ID"] = "tenant"
+    os.environ["MAILBOX_ADDRESS"] = "buzon@entidad.gov.co"
+    if args.certfile:
+        # httpx toma la CA de SSL_CERT_FILE (certificado autofirmado del mock)
+        os.environ["SSL_CERT_FILE"] = args.certfile
+    return base
+
+
+def _mock_graph(args):
+    import uvicorn
+    from fastapi import FastAPI
+
+    mock = FastAPI()
+    mensajes = [{"id": f"msg-{n}", "subject": f"Asunto {n}", "isRead": False} for n in range(10)]
+
+    @mock.post("/{tenant}/oauth2/v2.0/token")
+    async def token(tenant: str):
+        return {"access_token": "token-simulado", "expires_in": 3600}
+
+    @mock.get("/v1.0/users/{buzon}/mailFolders/{carpeta}/messages")
+    async def messages(buzon: str, carpeta: str):
+        if args.latency_ms:
+            await asyncio.sleep(args.latency_ms / 1000)
+        return {"value": mensajes}
+
+    config = uvicorn.Config(
+        mock, host="127.0.0.1", port=args.port, log_level="warning",
+        ssl_certfile=args.certfile, ssl_keyfile=args.keyfile,
+    )
+    servidor = uvicorn.Server(config)
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor, hilo
+
+
+async def ejecutar(graph, total: int, concurrencia: int):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+
+    async def una():
+        async with semaforo:
+            inicio = time.perf_counter()
+            await graph.get_messages(top=10)
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(total)))
+    return time.perf_counter() - inicio, latencias
+
+
+def _percentil(valores, q: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+async def main(args):
+    from app.services.graph_service import GraphService
+
+    graph = GraphService()
+    await graph.get_access_token()
+
+    print(f"Requests: {args.requests}  Concurrencia: {args.concurrency}  Latencia mock: {args.latency_ms} ms  "
+          f"{'HTTPS' if args.certfile else 'HTTP'}")
+    for nombre, compartido in (("cliente por llamada", False), ("cliente compartido", True)):
+        if compartido:
+            await graph.iniciar()
+        await ejecutar(graph, 20, min(20, args.concurrency))  # calentar
+        duracion, latencias = await ejecutar(graph, args.requests, args.concurrency)
+        print(
+            f"  {nombre:20} {duracion:7.2f} s  {args.requests / duracion:8.1f} req/s  "
+            f"p50 {statistics.median(latencias) * 1000:6.1f} ms  p95 {_percentil(latencias, 0.95) * 1000:6.1f} ms"
+        )
+    await graph.cerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=int, default=5)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+    args.port = args.port or _puerto_libre()
+
+    _configurar(args)
+    servidor, hilo = _mock_graph(args)
+    try:
+        asyncio.run(main(args))
+    finally:
+        servidor.should_exit = True
+        hilo.join(5)
@@ -30,7 +30,11 @@ from app.models.models import (
     AuditoriaEvento,
     Configuracion,
     LogIngesta,
-    Sesion
+    Sesion,
+    # Derivadas
+    ContadorDashboard,
+    ResumenMensualCaso,
+    SketchTiempoRespuesta
 )
 
 
@@ -96,6 +100,11 @@ def create_tables_smart():
         ('tab_adjunto', Adjunto, 'Adjuntos de Casos'),
         ('tab_fuentecorreo', FuenteCorreo, 'Fuentes de Correo'),
         ('tab_auditoriaevento', AuditoriaEvento, 'Eventos de Auditoría'),
+
+        # Séptimo: Tablas derivadas (sin claves foráneas)
+        ('tab_contadordashboard', ContadorDashboard, 'Contadores del Dashboard'),
+        ('tab_resumenmensualcaso', ResumenMensualCaso, 'Resumen Mensual de Casos'),
+        ('tab_sketchtiemporespuesta', SketchTiempoRespuesta, 'Sketches de Tiempos de Respuesta'),
     ]
     
     # Crear tablas una por una
@@ -205,7 +214,8 @@ def create_all_tables():
             "tab_estadocaso", "tab_semaforo", "tab_tipopdf", "tab_estadoenvio",
             "tab_tipoadjunto", "tab_tipoaccion", "tab_usuario", "tab_configuracion",
             "tab_logingesta", "tab_sesion", "tab_caso", "tab_casoidentificador",
-            "tab_escalamiento", "tab_adjunto", "tab_fuentecorreo", "tab_auditoriaevento"
+            "tab_escalamiento", "tab_adjunto", "tab_fuentecorreo", "tab_auditoriaevento",
+            "tab_contadordashboard", "tab_resumenmensualcaso", "tab_sketchtiemporespuesta"
         ]
         
         for table in tables:
@@ -256,7 +266,8 @@ def verify_tables():
         "tab_estadocaso", "tab_semaforo", "tab_tipopdf", "tab_estadoenvio",
         "tab_tipoadjunto", "tab_tipoaccion", "tab_usuario", "tab_configuracion",
         "tab_logingesta", "tab_sesion", "tab_caso", "tab_casoidentificador",
-        "tab_escalamiento", "tab_adjunto", "tab_fuentecorreo", "tab_auditoriaevento"
+        "tab_escalamiento", "tab_adjunto", "tab_fuentecorreo", "tab_auditoriaevento",
+        "tab_contadordashboard", "tab_resumenmensualcaso", "tab_sketchtiemporespuesta"
     ]
     
     print(f"\n📊 Estado de las tablas ({len(existing_tables)}/{len(expected_tables)} existen):\n")
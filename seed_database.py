@@ -158,6 +158,10 @@ def seed_tipo_accion(db: Session):
         {'codigo': 'SEGUIMIENTO_RECIBIDO', 'descripcion': 'Correo de seguimiento recibido'},
         {'codigo': 'CONFIGURACION_ACTUALIZADA', 'descripcion': 'Configuración del sistema actualizada'},
         {'codigo': 'INGESTA_EJECUTADA', 'descripcion': 'Proceso de ingesta ejecutado'},
+        {'codigo': 'CASO_ELIMINADO', 'descripcion': 'Caso eliminado'},
+        {'codigo': 'LOGIN', 'descripcion': 'Inicio de sesión'},
+        {'codigo': 'RECUPERAR_PASSWORD', 'descripcion': 'Recuperación de contraseña'},
+        {'codigo': 'ESCALAMIENTO_ACTUALIZADO', 'descripcion': 'Escalamiento actualizado'},
     ]
     
     count = 0
@@ -0,0 +1,14 @@
+-- =============================================
+-- Índice para el listado de casos (ORDER BY createdAt DESC, id DESC)
+-- y la paginación keyset con cursor (createdAt, id).
+-- Aplicar en bases existentes; create_tables.py lo crea en bases nuevas.
+-- =============================================
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ix_tab_caso_createdAt_id' AND object_id = OBJECT_ID('dbo.tab_caso')
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX ix_tab_caso_createdAt_id
+        ON dbo.tab_caso (createdAt DESC, id DESC);
+END
+GO
@@ -0,0 +1,18 @@
+-- =============================================
+-- Contadores pre-agregados del dashboard (GET /reportes/dashboard).
+-- Los mantiene la API con deltas en cada escritura y el job de
+-- reconciliación los recalcula periódicamente desde tab_caso.
+-- Aplicar en bases existentes; create_tables.py la crea en bases nuevas.
+-- =============================================
+IF OBJECT_ID('dbo.tab_contadordashboard', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.tab_contadordashboard (
+        id INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+        dimension VARCHAR(30) NOT NULL,
+        clave VARCHAR(100) NOT NULL,
+        valor BIGINT NOT NULL,
+        updatedAt DATETIME2 NOT NULL,
+        CONSTRAINT uq_tab_contadordashboard_dimension_clave UNIQUE (dimension, clave)
+    );
+END
+GO
@@ -0,0 +1,45 @@
+-- =============================================
+-- Resumen mensual de casos (GET /reportes/casos-mensuales).
+-- Lo mantiene el job resumen_mensual_job recalculando solo los meses
+-- con casos modificados desde la última ejecución (marcaCaso).
+-- Los índices de tab_caso sirven para encontrar esos casos y para
+-- agregar un mes por rango de fechaRecepcion.
+-- Aplicar en bases existentes; create_tables.py los crea en bases nuevas.
+-- =============================================
+IF OBJECT_ID('dbo.tab_resumenmensualcaso', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.tab_resumenmensualcaso (
+        id INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+        mes DATE NOT NULL,
+        tipoTramite VARCHAR(100) NOT NULL,
+        estadoCasoId INT NOT NULL,
+        responsableId INT NULL,
+        total INT NOT NULL,
+        marcaCaso DATETIME2 NOT NULL,
+        updatedAt DATETIME2 NOT NULL,
+        CONSTRAINT uq_tab_resumenmensualcaso_grupo
+            UNIQUE (mes, tipoTramite, estadoCasoId, responsableId)
+    );
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ix_tab_caso_updatedAt' AND object_id = OBJECT_ID('dbo.tab_caso')
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX ix_tab_caso_updatedAt
+        ON dbo.tab_caso (updatedAt);
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ix_tab_caso_fechaRecepcion' AND object_id = OBJECT_ID('dbo.tab_caso')
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX ix_tab_caso_fechaRecepcion
+        ON dbo.tab_caso (fechaRecepcion)
+        INCLUDE (tipoTramite, estadoCasoId, responsableId);
+END
+GO
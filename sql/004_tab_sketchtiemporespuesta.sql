@@ -0,0 +1,25 @@
+-- =============================================
+-- Sketches (t-digest) de tiempos de respuesta por mes de cierre,
+-- tipo de trámite y responsable (GET /reportes/tiempos-respuesta).
+-- La API suma cada caso al registrar su correoEnvioFecha; el job
+-- nocturno los reconstruye desde tab_caso.
+-- Aplicar en bases existentes; create_tables.py la crea en bases nuevas.
+-- =============================================
+IF OBJECT_ID('dbo.tab_sketchtiemporespuesta', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.tab_sketchtiemporespuesta (
+        id INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+        mes DATE NOT NULL,
+        tipoTramite VARCHAR(100) NOT NULL,
+        responsableId INT NULL,
+        conteo BIGINT NOT NULL,
+        sumaHoras FLOAT NOT NULL,
+        minimoHoras FLOAT NULL,
+        maximoHoras FLOAT NULL,
+        digest VARCHAR(MAX) NOT NULL,
+        updatedAt DATETIME2 NOT NULL,
+        CONSTRAINT uq_tab_sketchtiemporespuesta_bucket
+            UNIQUE (mes, tipoTramite, responsableId)
+    );
+END
+GO
@@ -0,0 +1,183 @@
+-- =============================================
+-- tab_auditoriaevento particionada por mes de fechaEvento.
+--
+-- El índice clustered pasa a ser (fechaEvento, id) sobre un esquema de
+-- partición mensual: los listados (ORDER BY fechaEvento DESC, id DESC y
+-- keyset por el mismo par) leen solo las particiones recientes, y un mes
+-- completo se puede archivar o purgar con ALTER TABLE ... SWITCH PARTITION
+-- sin DELETE masivo.
+--
+-- SWITCH exige que todos los índices estén alineados (particionados por
+-- fechaEvento), así que la PK pasa a ser (id, fechaEvento): la unicidad
+-- que garantiza es la del par, no la de id solo. id sigue siendo único
+-- porque lo asigna IDENTITY, y las búsquedas por id usan la PK (id es su
+-- primera columna). Por lo mismo se elimina ix_tab_auditoriaevento_id,
+-- el índice no particionado sobre id que creaba create_tables.py.
+--
+-- Reescribe la tabla: aplicar en una ventana de mantenimiento. Luego
+-- activar AUDITORIA_PARTICIONADA para que el scheduler cree las
+-- particiones futuras (dbo.usp_auditoria_particiones).
+-- =============================================
+
+-- 1. Función y esquema: un límite por mes desde el evento más antiguo
+--    hasta tres meses adelante (RANGE RIGHT: cada límite abre su mes)
+IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'pf_auditoria_mes')
+BEGIN
+    DECLARE @hoy DATE = DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1);
+    DECLARE @mes DATE = (
+        SELECT DATEFROMPARTS(YEAR(MIN(fechaEvento)), MONTH(MIN(fechaEvento)), 1)
+        FROM dbo.tab_auditoriaevento
+    );
+    DECLARE @fin DATE = DATEADD(MONTH, 3, @hoy);
+    DECLARE @limites NVARCHAR(MAX) = N'';
+
+    SET @mes = ISNULL(@mes, @hoy);
+    WHILE @mes <= @fin
+    BEGIN
+        SET @limites += CASE WHEN @limites = N'' THEN N'' ELSE N', ' END
+            + N'''' + CONVERT(NVARCHAR(10), @mes, 23) + N'''';
+        SET @mes = DATEADD(MONTH, 1, @mes);
+    END
+
+    EXEC (N'CREATE PARTITION FUNCTION pf_auditoria_mes (DATETIME2) AS RANGE RIGHT FOR VALUES (' + @limites + N')');
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = 'ps_auditoria_mes')
+BEGIN
+    CREATE PARTITION SCHEME ps_auditoria_mes AS PARTITION pf_auditoria_mes ALL TO ([PRIMARY]);
+END
+GO
+
+-- 2. Índice sobre id heredado (index=True en el modelo): no alineado, impediría
+--    el SWITCH, y redundante con la PK (id, fechaEvento)
+IF EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ix_tab_auditoriaevento_id' AND object_id = OBJECT_ID('dbo.tab_auditoriaevento')
+)
+BEGIN
+    DROP INDEX ix_tab_auditoriaevento_id ON dbo.tab_auditoriaevento;
+END
+GO
+
+-- 3. Clustered (fechaEvento, id) sobre el esquema y PK no clustered alineada
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes i
+    JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+    WHERE i.object_id = OBJECT_ID('dbo.tab_auditoriaevento') AND i.index_id = 1
+      AND ps.name = 'ps_auditoria_mes'
+)
+BEGIN
+    DECLARE @pk SYSNAME = (
+        SELECT name FROM sys.key_constraints
+        WHERE parent_object_id = OBJECT_ID('dbo.tab_auditoriaevento') AND type = 'PK'
+    );
+    IF @pk IS NOT NULL
+        EXEC (N'ALTER TABLE dbo.tab_auditoriaevento DROP CONSTRAINT ' + QUOTENAME(@pk));
+
+    -- create_tables.py lo crea como no clustered en bases nuevas
+    IF EXISTS (
+        SELECT 1 FROM sys.indexes
+        WHERE name = 'ix_tab_auditoriaevento_fechaEvento_id' AND object_id = OBJECT_ID('dbo.tab_auditoriaevento')
+    )
+        DROP INDEX ix_tab_auditoriaevento_fechaEvento_id ON dbo.tab_auditoriaevento;
+
+    CREATE CLUSTERED INDEX ix_tab_auditoriaevento_fechaEvento_id
+        ON dbo.tab_auditoriaevento (fechaEvento DESC, id DESC)
+        ON ps_auditoria_mes (fechaEvento);
+
+    ALTER TABLE dbo.tab_auditoriaevento
+        ADD CONSTRAINT pk_tab_auditoriaevento PRIMARY KEY NONCLUSTERED (id, fechaEvento)
+        ON ps_auditoria_mes (fechaEvento);
+END
+GO
+
+-- 4. Auditoría de un caso y de un usuario, alineados con el esquema. Si
+--    create_tables.py ya los creó (no particionados) se reconstruyen sobre él.
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes i
+    JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+    WHERE i.name = 'ix_tab_auditoriaevento_caso_fecha' AND i.object_id = OBJECT_ID('dbo.tab_auditoriaevento')
+      AND ps.name = 'ps_auditoria_mes'
+)
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM sys.indexes
+        WHERE name = 'ix_tab_auditoriaevento_caso_fecha' AND object_id = OBJECT_ID('dbo.tab_auditoriaevento')
+    )
+        CREATE NONCLUSTERED INDEX ix_tab_auditoriaevento_caso_fecha
+            ON dbo.tab_auditoriaevento (casoId, fechaEvento DESC, id DESC)
+            WITH (DROP_EXISTING = ON)
+            ON ps_auditoria_mes (fechaEvento);
+    ELSE
+        CREATE NONCLUSTERED INDEX ix_tab_auditoriaevento_caso_fecha
+            ON dbo.tab_auditoriaevento (casoId, fechaEvento DESC, id DESC)
+            ON ps_auditoria_mes (fechaEvento);
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes i
+    JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+    WHERE i.name = 'ix_tab_auditoriaevento_usuario_fecha' AND i.object_id = OBJECT_ID('dbo.tab_auditoriaevento')
+      AND ps.name = 'ps_auditoria_mes'
+)
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM sys.indexes
+        WHERE name = 'ix_tab_auditoriaevento_usuario_fecha' AND object_id = OBJECT_ID('dbo.tab_auditoriaevento')
+    )
+        CREATE NONCLUSTERED INDEX ix_tab_auditoriaevento_usuario_fecha
+            ON dbo.tab_auditoriaevento (usuarioId, fechaEvento DESC, id DESC)
+            WITH (DROP_EXISTING = ON)
+            ON ps_auditoria_mes (fechaEvento);
+    ELSE
+        CREATE NONCLUSTERED INDEX ix_tab_auditoriaevento_usuario_fecha
+            ON dbo.tab_auditoriaevento (usuarioId, fechaEvento DESC, id DESC)
+            ON ps_auditoria_mes (fechaEvento);
+END
+GO
+
+-- 5. Comprobación: ningún índice de la tabla puede quedar fuera del esquema
+IF EXISTS (
+    SELECT 1 FROM sys.indexes i
+    LEFT JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+    WHERE i.object_id = OBJECT_ID('dbo.tab_auditoriaevento') AND i.index_id > 0
+      AND (ps.name IS NULL OR ps.name <> 'ps_auditoria_mes')
+)
+BEGIN
+    DECLARE @no_alineados NVARCHAR(MAX) = (
+        SELECT STRING_AGG(i.name, N', ') FROM sys.indexes i
+        LEFT JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+        WHERE i.object_id = OBJECT_ID('dbo.tab_auditoriaevento') AND i.index_id > 0
+          AND (ps.name IS NULL OR ps.name <> 'ps_auditoria_mes')
+    );
+    RAISERROR (N'Índices de tab_auditoriaevento sin alinear con ps_auditoria_mes (SWITCH fallaría): %s', 16, 1, @no_alineados);
+END
+GO
+
+-- 6. Particiones futuras: añade un límite por mes hasta @meses_adelante
+--    meses después del actual. Las particiones nuevas están vacías, así
+--    que el SPLIT no mueve filas.
+CREATE OR ALTER PROCEDURE dbo.usp_auditoria_particiones
+    @meses_adelante INT = 3
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @ultimo DATETIME2 = (
+        SELECT MAX(CAST(prv.value AS DATETIME2))
+        FROM sys.partition_range_values prv
+        JOIN sys.partition_functions pf ON pf.function_id = prv.function_id
+        WHERE pf.name = 'pf_auditoria_mes'
+    );
+    DECLARE @objetivo DATETIME2 = DATEADD(MONTH, @meses_adelante, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+
+    WHILE @ultimo < @objetivo
+    BEGIN
+        SET @ultimo = DATEADD(MONTH, 1, @ultimo);
+        ALTER PARTITION SCHEME ps_auditoria_mes NEXT USED [PRIMARY];
+        ALTER PARTITION FUNCTION pf_auditoria_mes() SPLIT RANGE (@ultimo);
+    END
+END
+GO
@@ -0,0 +1,74 @@
+-- =============================================
+-- tab_sesion identifica la sesión por el SHA-256 del access token
+-- (tokenHash, 64 caracteres hex) en lugar del JWT truncado, y registra
+-- cuándo se revocó (fechaRevocacion). La API carga en memoria los hashes
+-- revocados y lee solo las revocaciones nuevas por fechaRevocacion.
+-- Aplicar en bases existentes; create_tables.py las crea en bases nuevas.
+-- =============================================
+IF COL_LENGTH('dbo.tab_sesion', 'tokenHash') IS NULL
+BEGIN
+    ALTER TABLE dbo.tab_sesion ADD tokenHash VARCHAR(64) NULL;
+END
+GO
+
+IF COL_LENGTH('dbo.tab_sesion', 'fechaRevocacion') IS NULL
+BEGIN
+    ALTER TABLE dbo.tab_sesion ADD fechaRevocacion DATETIME2 NULL;
+END
+GO
+
+-- Sesiones existentes: mismo hash que calcula la API (hex en minúsculas)
+IF COL_LENGTH('dbo.tab_sesion', 'token') IS NOT NULL
+BEGIN
+    EXEC (N'
+        UPDATE dbo.tab_sesion
+        SET tokenHash = LOWER(CONVERT(VARCHAR(64), HASHBYTES(''SHA2_256'', CAST(token AS VARCHAR(500))), 2))
+        WHERE tokenHash IS NULL;
+
+        -- Las sesiones ya inactivas se consideran revocadas
+        UPDATE dbo.tab_sesion
+        SET fechaRevocacion = SYSDATETIME()
+        WHERE activa = 0 AND fechaRevocacion IS NULL AND fechaExpiracion > SYSDATETIME();
+    ');
+END
+GO
+
+ALTER TABLE dbo.tab_sesion ALTER COLUMN tokenHash VARCHAR(64) NOT NULL;
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ix_tab_sesion_tokenHash' AND object_id = OBJECT_ID('dbo.tab_sesion')
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX ix_tab_sesion_tokenHash ON dbo.tab_sesion (tokenHash);
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ix_tab_sesion_fechaRevocacion' AND object_id = OBJECT_ID('dbo.tab_sesion')
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX ix_tab_sesion_fechaRevocacion
+        ON dbo.tab_sesion (fechaRevocacion)
+        INCLUDE (tokenHash, fechaExpiracion)
+        WHERE fechaRevocacion IS NOT NULL;
+END
+GO
+
+-- El JWT ya no se guarda: se retira el índice ancho y la columna
+IF EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'ix_tab_sesion_token' AND object_id = OBJECT_ID('dbo.tab_sesion')
+)
+BEGIN
+    DROP INDEX ix_tab_sesion_token ON dbo.tab_sesion;
+END
+GO
+
+IF COL_LENGTH('dbo.tab_sesion', 'token') IS NOT NULL
+BEGIN
+    ALTER TABLE dbo.tab_sesion DROP COLUMN token;
+END
+GO
@@ -1,10 +1,50 @@
+import os
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, BigInteger
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER, DATETIME2
+
+# Variables mínimas para poder importar la app sin archivo .env
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+# Sin jobs de fondo que abran conexiones durante las pruebas
+os.environ.setdefault("SEARCH_INDEX_ENABLED", "false")
+os.environ.setdefault("CATALOGOS_REFRESH_SECONDS", "0")
+os.environ.setdefault("CONFIGURACION_REFRESH_SECONDS", "0")
+os.environ.setdefault("DASHBOARD_RECONCILE_MINUTES", "0")
+os.environ.setdefault("RESUMEN_MENSUAL_MINUTES", "0")
+os.environ.setdefault("TIEMPOS_RESPUESTA_RECONSTRUIR", "false")
+os.environ.setdefault("AUDITORIA_ASINCRONA", "false")
+os.environ.setdefault("REVOCACIONES_REFRESH_SECONDS", "0")
 
 from app.main import app
 from app.database import Base, get_db
+from app.core.catalogos import catalogos
+from app.services.configuracion_service import configuracion_service
+from app.api.v1.endpoints.reportes import reportes_cache
+from app.core.usuarios_cache import usuarios_cache
+from app.core.revocaciones import revocaciones
+
+
+# Tipos propios de SQL Server traducidos a SQLite para las pruebas
+@compiles(UNIQUEIDENTIFIER, "sqlite")
+def _compile_uniqueidentifier_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@compiles(DATETIME2, "sqlite")
+def _compile_datetime2_sqlite(type_, compiler, **kw):
+    return "DATETIME"
+
+
+@compiles(BigInteger, "sqlite")
+def _compile_biginteger_sqlite(type_, compiler, **kw):
+    # SQLite solo autoincrementa claves primarias INTEGER
+    return "INTEGER"
+
 
 # Base de datos de prueba en memoria
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -28,6 +68,12 @@ def override_get_db():
 def db_session():
     """Fixture para sesión de base de datos"""
     Base.metadata.create_all(bind=engine)
+    # Cada test parte de tablas vacías: los cachés no deben conservar datos previos
+    catalogos.invalidar()
+    configuracion_service.invalidar()
+    reportes_cache.invalidar()
+    usuarios_cache.invalidar()
+    revocaciones.invalidar()
     db = TestingSessionLocal()
     try:
         yield db
@@ -55,3 +101,37 @@ def auth_headers(client):
     )
     token = response.json()["access_token"]
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def caso_factory(db_session):
+    """Fixture para crear casos mínimos directamente en base de datos"""
+    from datetime import datetime, timedelta
+    from app.models.models import Caso
+
+    contador = {"n": 0}
+
+    def _crear(**kwargs):
+        contador["n"] += 1
+        n = contador["n"]
+        ahora = datetime.now()
+        datos = {
+            "radicado": f"RAD-{n:05d}",
+            "fechaRecepcion": ahora,
+            "fechaVencimiento": ahora + timedelta(days=15),
+            "peticionarioNombre": f"Peticionario {n}",
+            "peticionarioCorreo": f"peticionario{n}@correo.com",
+            "detalleSolicitud": f"Solicitud número {n}",
+            "tipoTramite": "FACTURA",
+            "estadoCasoId": 1,
+            "semaforoId": 1,
+            "destinatarioCorreo": "entidad@correo.gov.co",
+            "correoHiloId": f"hilo-{n}",
+        }
+        datos.update(kwargs)
+        caso = Caso(**datos)
+        db_session.add(caso)
+        db_session.commit()
+        return caso
+
+    return _crear
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from app.models.models import AuditoriaEvento, TipoAccion
+from app.services.auditoria_service import auditoria_service
+
+
+def _eventos(db_session, caso_factory):
+    db_session.add(TipoAccion(id=2, codigo="CASO_ACTUALIZADO", descripcion="Caso actualizado"))
+    caso = caso_factory()
+    inicio = datetime(2026, 3, 1, 8, 0)
+    # Cada par de eventos comparte fechaEvento, como los de un lote
+    db_session.add_all([
+        AuditoriaEvento(casoId=caso.id, tipoAccionId=2, fechaEvento=inicio + timedelta(minutes=n // 2))
+        for n in range(25)
+    ])
+    db_session.commit()
+    return caso
+
+
+def test_paginacion_keyset_recorre_todo_sin_repetir(db_session, caso_factory):
+    """Test after recorre los eventos en orden (fechaEvento, id) sin saltos ni repetidos"""
+    caso = _eventos(db_session, caso_factory)
+    esperado = [
+        e.id for e in sorted(db_session.query(AuditoriaEvento).all(), key=lambda e: (e.fechaEvento, e.id), reverse=True)
+    ]
+
+    vistos, cursor = [], None
+    while True:
+        pagina = auditoria_service.get_auditoria(db_session, limit=4, caso_id=caso.id, after=cursor)
+        if not pagina:
+            break
+        vistos.extend(e.id for e in pagina)
+        cursor = (pagina[-1].fechaEvento, pagina[-1].id)
+
+    assert vistos == esperado
+
+
+def test_cambios_caso_con_tope(db_session, caso_factory):
+    """Test get_cambios_caso devuelve los últimos eventos en orden cronológico"""
+    caso = _eventos(db_session, caso_factory)
+
+    cambios = auditoria_service.get_cambios_caso(db_session, caso.id, limit=5)
+
+    assert len(cambios) == 5
+    assert [(e.fechaEvento, e.id) for e in cambios] == sorted((e.fechaEvento, e.id) for e in cambios)
+    ultimo = max(db_session.query(AuditoriaEvento).all(), key=lambda e: (e.fechaEvento, e.id))
+    assert cambios[-1].id == ultimo.id
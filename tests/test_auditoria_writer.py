@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.core.auditoria_writer import AuditoriaWriter
+from app.models.models import TipoAccion, AuditoriaEvento
+from app.services.auditoria_service import auditoria_service
+
+# El paquete app.services reexporta la instancia con el mismo nombre que el módulo
+auditoria_module = sys.modules["app.services.auditoria_service"]
+
+
+def _fila(n):
+    return {
+        "tipoAccionId": 1, "usuarioId": None, "casoId": uuid.uuid4(),
+        "detalleJson": f'{{"n": {n}}}', "ipOrigen": None, "fechaEvento": datetime(2026, 1, 1, 8, 0, n),
+    }
+
+
+def _esperar(condicion, timeout=3):
+    limite = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return condicion()
+
+
+def _spool(directorio):
+    return [f for f in os.listdir(directorio) if f.endswith(".jsonl")]
+
+
+def test_writer_agrupa_eventos_en_lotes(tmp_path):
+    """Test los eventos se escriben en pocos INSERT y detener vacía la cola"""
+    lotes = []
+    writer = AuditoriaWriter(str(tmp_path), tamano_lote=3, intervalo_ms=10_000, guardar=lotes.append)
+    writer.iniciar()
+    for n in range(3):
+        writer.registrar([_fila(n)])
+    assert _esperar(lambda: len(lotes) == 1)
+    writer.registrar([_fila(3), _fila(4)])
+    writer.detener()
+
+    assert [len(lote) for lote in lotes] == [3, 2]
+    assert writer.pendientes == 0
+    assert _spool(tmp_path) == []
+
+
+def test_writer_escribe_lotes_incompletos_por_intervalo(tmp_path):
+    """Test un lote que no se llena se escribe al cumplirse el intervalo"""
+    lotes = []
+    writer = AuditoriaWriter(str(tmp_path), tamano_lote=100, intervalo_ms=20, guardar=lotes.append)
+    writer.iniciar()
+    writer.registrar([_fila(1), _fila(2)])
+    try:
+        assert _esperar(lambda: len(lotes) == 1)
+        assert len(lotes[0]) == 2
+    finally:
+        writer.detener()
+
+
+def test_eventos_no_escritos_sobreviven_en_el_spool(tmp_path):
+    """Test si la base falla los eventos quedan en disco y otro proceso los recupera"""
+    def fallar(filas):
+        raise OperationalError("INSERT", {}, Exception("base no disponible"))
+
+    caido = AuditoriaWriter(str(tmp_path), tamano_lote=100, intervalo_ms=10, guardar=fallar)
+    caido.iniciar()
+    filas = [_fila(n) for n in range(3)]
+    caido.registrar(filas)
+    caido.detener()
+    assert len(_spool(tmp_path)) == 1
+
+    lotes = []
+    nuevo = AuditoriaWriter(str(tmp_path), intervalo_ms=10, guardar=lotes.append)
+    nuevo.iniciar()
+    nuevo.detener()
+
+    assert lotes == [filas]
+    assert _spool(tmp_path) == []
+
+
+def test_registrar_accion_con_writer_no_toca_la_sesion(db_session, tmp_path, monkeypatch):
+    """Test con el writer activo el evento se escribe fuera de la sesión del request"""
+    db_session.add(TipoAccion(id=10, codigo="CASO_CREADO", descripcion="Caso creado"))
+    db_session.commit()
+    lotes = []
+    writer = AuditoriaWriter(str(tmp_path), intervalo_ms=10_000, guardar=lotes.append)
+    monkeypatch.setattr(auditoria_module, "auditoria_writer", writer)
+    writer.iniciar()
+
+    assert auditoria_service.registrar_accion(db_session, accion="crear", entidad="caso", detalles={"n": 1}) is None
+    assert db_session.query(AuditoriaEvento).count() == 0
+    writer.detener()
+
+    assert len(lotes) == 1
+    assert lotes[0][0]["tipoAccionId"] == 10
+
+
+def test_filas_rechazadas_se_apartan_sin_bloquear_la_cola(tmp_path):
+    """Test una fila que viola una FK se aparta y el resto de los lotes se escribe"""
+    filas = [_fila(n) for n in range(5)]
+    invalida = filas[3]["casoId"]
+    escritas = []
+
+    def guardar(lote):
+        if any(f["casoId"] == invalida for f in lote):
+            raise IntegrityError("INSERT", {}, Exception("FK tab_caso"))
+        escritas.extend(lote)
+
+    writer = AuditoriaWriter(str(tmp_path), tamano_lote=100, intervalo_ms=10_000, guardar=guardar)
+    writer.iniciar()
+    writer.registrar(filas)
+    writer.detener()
+    # Un segmento posterior también se escribe
+    writer.iniciar()
+    writer.registrar([_fila(9)])
+    writer.detener()
+
+    assert sorted(f["detalleJson"] for f in escritas) == sorted(
+        f["detalleJson"] for f in filas + [_fila(9)] if f["casoId"] != invalida
+    )
+    assert _spool(tmp_path) == []
+    rechazados = os.listdir(tmp_path / "rechazados")
+    with open(tmp_path / "rechazados" / rechazados[0], encoding="utf-8") as archivo:
+        lineas = [json.loads(linea) for linea in archivo]
+    assert [l["evento"]["casoId"] for l in lineas] == [str(invalida)]
+    assert "FK tab_caso" in lineas[0]["error"]
+
+
+def test_registrar_tras_detener_no_encola(tmp_path):
+    """Test registrar después de detener devuelve False (quien llama inserta directo) y no falla"""
+    escritas = []
+    writer = AuditoriaWriter(str(tmp_path), tamano_lote=100, intervalo_ms=10_000, guardar=escritas.extend)
+    writer.iniciar()
+    assert writer.registrar([_fila(1)]) is True
+    writer.detener()
+
+    assert writer.activo is False
+    assert writer.registrar([_fila(2)]) is False
+    assert [f["detalleJson"] for f in escritas] == ['{"n": 1}']
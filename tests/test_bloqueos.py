@@ -0,0 +1,18 @@
+from sqlalchemy.dialects import mssql
+
+from app.core.bloqueos import bloqueo_aplicacion, bloquear_tabla, consulta_bloqueo_tabla
+from app.models.models import SketchTiempoRespuesta
+
+
+def test_en_sqlite_el_bloqueo_siempre_se_concede(db_session):
+    """Test SQLite (un solo proceso) no ejecuta sp_getapplock ni hints de tabla"""
+    assert bloqueo_aplicacion(db_session, "tiempos_respuesta") is True
+    bloquear_tabla(db_session, SketchTiempoRespuesta)
+    db_session.rollback()
+
+
+def test_bloqueo_de_tabla_en_sql_server():
+    """Test en mssql la tabla se bloquea en exclusiva hasta el commit"""
+    sql = str(consulta_bloqueo_tabla(SketchTiempoRespuesta).compile(dialect=mssql.dialect()))
+
+    assert "tab_sketchtiemporespuesta WITH (TABLOCKX, HOLDLOCK)" in sql
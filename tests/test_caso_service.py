@@ -0,0 +1,291 @@
+from datetime import datetime, timedelta
+import uuid
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import event
+
+from app.core.catalogos import catalogos
+from app.models.models import (
+    EstadoCaso, Semaforo, TipoPDF, EstadoEnvio, Usuario, CasoIdentificador, AuditoriaEvento
+)
+from app.schemas.caso import CasoFilter, CasoResponse, CasoUpdate, CasoBulkUpdate
+from app.services import caso_service
+from app.services.auditoria_service import auditoria_service
+
+
+def test_get_casos_keyset_recorre_todas_las_filas(db_session, caso_factory):
+    """Test paginación keyset sin saltos ni duplicados, incluso con createdAt repetido"""
+    base = datetime(2024, 1, 1, 8, 0, 0)
+    for i in range(12):
+        # Pares de casos con el mismo createdAt para forzar el desempate por id
+        caso_factory(createdAt=base + timedelta(minutes=i // 2))
+
+    vistos = []
+    cursor = None
+    while True:
+        pagina = caso_service.get_casos(db_session, limit=5, after=cursor)
+        if not pagina:
+            break
+        vistos.extend(c.id for c in pagina)
+        cursor = (pagina[-1].createdAt, pagina[-1].id)
+
+    esperados = [c.id for c in caso_service.get_casos(db_session, limit=100)]
+    assert vistos == esperados
+    assert len(set(vistos)) == 12
+
+
+def test_get_casos_keyset_respeta_filtros(db_session, caso_factory):
+    """Test que el cursor se combina con los filtros"""
+    for i in range(6):
+        caso_factory(tipoTramite="FACTURA" if i % 2 else "APOSTILLA")
+
+    filtros = CasoFilter(tipoTramite="FACTURA")
+    primera = caso_service.get_casos(db_session, limit=2, filters=filtros)
+    cursor = (primera[-1].createdAt, primera[-1].id)
+    segunda = caso_service.get_casos(db_session, limit=2, filters=filtros, after=cursor)
+
+    assert len(primera) == 2
+    assert len(segunda) == 1
+    assert all(c.tipoTramite == "FACTURA" for c in primera + segunda)
+
+
+def test_get_casos_numero_de_queries_constante(db_session, caso_factory):
+    """Test que serializar una página no dispara lazy loads por fila"""
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        Semaforo(id=1, codigo="VERDE", descripcion="Sin urgencia", colorHex="#22C55E", diasMin=10, orden=1),
+        TipoPDF(id=1, codigo="FACTURA", descripcion="Factura"),
+        EstadoEnvio(id=1, codigo="PENDIENTE", descripcion="Pendiente"),
+        Usuario(id=1, nombre="Agente", correo="agente@entidad.gov.co"),
+    ])
+    db_session.commit()
+    # Como al iniciar la app: serializar no carga catálogos
+    catalogos.cargar(db_session)
+    for _ in range(40):
+        caso = caso_factory(responsableId=1, tipoPDFId=1)
+        db_session.add(CasoIdentificador(casoId=caso.id, clave="NIT", valor="123"))
+    db_session.commit()
+
+    engine = db_session.get_bind()
+
+    def contar_queries(page_size):
+        db_session.expire_all()
+        db_session.expunge_all()
+        sentencias = []
+
+        def _registrar(conn, cursor, statement, *args):
+            sentencias.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _registrar)
+        try:
+            casos = caso_service.get_casos(db_session, limit=page_size)
+            items = [CasoResponse.model_validate(c) for c in casos]
+        finally:
+            event.remove(engine, "before_cursor_execute", _registrar)
+        assert len(items) == page_size
+        assert all(i.estado_caso and i.semaforo and i.responsable for i in items)
+        assert all(len(i.identificadores) == 1 for i in items)
+        return len(sentencias)
+
+    assert contar_queries(5) == contar_queries(40)
+
+
+def test_get_casos_pagina_total_en_una_query(db_session, caso_factory):
+    """Test que página y total salen de la misma consulta y con los mismos filtros"""
+    caso_factory(peticionarioNombre="Laura Gómez", fechaRecepcion=datetime(2024, 3, 1))
+    caso_factory(peticionarioNombre="Laura Díaz", fechaRecepcion=datetime(2024, 5, 1))
+    caso_factory(peticionarioNombre="Pedro Ruiz", fechaRecepcion=datetime(2024, 5, 2))
+
+    filtros = CasoFilter(busqueda="Laura", fechaDesde=datetime(2024, 4, 1))
+    engine = db_session.get_bind()
+    sentencias = []
+
+    def _registrar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _registrar)
+    try:
+        casos, total = caso_service.get_casos_pagina(db_session, limit=10, filters=filtros)
+    finally:
+        event.remove(engine, "before_cursor_execute", _registrar)
+
+    assert [c.peticionarioNombre for c in casos] == ["Laura Díaz"]
+    assert total == 1
+    assert total == caso_service.count_casos(db_session, filtros)
+    # Una query para página + total y otra para los identificadores
+    assert len(sentencias) == 2
+
+    casos, total = caso_service.get_casos_pagina(db_session, limit=10, include_total=False)
+    assert len(casos) == 3
+    assert total is None
+
+
+def test_get_casos_pagina_async_equivale_a_sync(db_session, caso_factory):
+    """Test que la versión async devuelve la misma página y total que la síncrona"""
+    import asyncio
+    from app.database import AsyncSessionLocal, async_engine
+
+    for i in range(7):
+        caso_factory(tipoTramite="FACTURA" if i < 5 else "APOSTILLA")
+    filtros = CasoFilter(tipoTramite="FACTURA")
+    catalogos.cargar(db_session)
+
+    async def _pagina():
+        async with AsyncSessionLocal() as db:
+            casos, total = await caso_service.get_casos_pagina_async(db, limit=3, filters=filtros)
+            # Las relaciones ya vienen cargadas: serializar no requiere I/O
+            items = [CasoResponse.model_validate(c) for c in casos]
+        # El pool async queda atado a este event loop
+        await async_engine.dispose()
+        return [i.id for i in items], total
+
+    ids_async, total_async = asyncio.run(_pagina())
+    casos, total = caso_service.get_casos_pagina(db_session, limit=3, filters=filtros)
+
+    assert ids_async == [c.id for c in casos]
+    assert total_async == total == 5
+
+
+def _registro_bulk(n, **kwargs):
+    registro = {
+        "radicado": f"MIG-{n:05d}",
+        "fechaRecepcion": "2024-03-01T08:00:00",
+        "fechaVencimiento": "2024-03-16T08:00:00",
+        "peticionarioNombre": f"Peticionario {n}",
+        "peticionarioCorreo": f"peticionario{n}@correo.com",
+        "detalleSolicitud": f"Solicitud migrada {n}",
+        "tipoTramite": "FACTURA",
+        "estadoCasoId": 1,
+        "semaforoId": 1,
+        "destinatarioCorreo": "entidad@correo.gov.co",
+        "correoHiloId": f"hilo-mig-{n}",
+        "identificadores": [{"clave": "NIT", "valor": str(n)}],
+    }
+    registro.update(kwargs)
+    return registro
+
+
+def _seed_catalogos_bulk(db_session):
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        Semaforo(id=1, codigo="VERDE", descripcion="Sin urgencia", colorHex="#22C55E", diasMin=10, orden=1),
+        EstadoEnvio(id=1, codigo="PENDIENTE", descripcion="Pendiente"),
+    ])
+    db_session.commit()
+
+
+def test_create_casos_bulk_reporta_errores_por_fila(db_session, caso_factory):
+    """Test carga masiva: inserta los válidos por bloques y reporta los demás"""
+    _seed_catalogos_bulk(db_session)
+    caso_factory(radicado="MIG-00099")
+
+    registros = [_registro_bulk(i) for i in range(5)]
+    registros.append(_registro_bulk(5, peticionarioCorreo="no-es-correo"))
+    registros.append(_registro_bulk(6, radicado="MIG-00001"))
+    registros.append(_registro_bulk(7, radicado="MIG-00099"))
+    registros.append(_registro_bulk(8, estadoCasoId=42))
+
+    resultado = caso_service.create_casos_bulk(db_session, registros, chunk_size=2)
+
+    assert (resultado.recibidos, resultado.creados, resultado.fallidos) == (9, 5, 4)
+    errores = {e.indice: e.errores[0] for e in resultado.errores}
+    assert errores[5].startswith("peticionarioCorreo")
+    assert "repetido en el lote" in errores[6]
+    assert errores[7] == "radicado: ya existe"
+    assert errores[8] == "estadoCasoId: 42 no existe"
+
+    creados = caso_service.get_casos(db_session, limit=100, filters=CasoFilter(tipoTramite="FACTURA"))
+    assert len(creados) == 6
+    assert db_session.query(CasoIdentificador).count() == 5
+
+
+def test_create_casos_bulk_aisla_fila_que_falla_en_bd(db_session, caso_factory, monkeypatch):
+    """Test que un bloque que falla al insertar se reintenta fila por fila"""
+    _seed_catalogos_bulk(db_session)
+    validar = caso_service._validar_lote
+
+    def _validar_y_competir(db, registros):
+        resultado = validar(db, registros)
+        # Otro proceso crea el mismo radicado entre la validación y el INSERT
+        caso_factory(radicado="MIG-00002")
+        return resultado
+
+    monkeypatch.setattr(caso_service, "_validar_lote", _validar_y_competir)
+    resultado = caso_service.create_casos_bulk(db_session, [_registro_bulk(i) for i in range(4)], chunk_size=4)
+
+    assert resultado.creados == 3
+    assert [e.indice for e in resultado.errores] == [2]
+    assert "UNIQUE" in resultado.errores[0].errores[0]
+
+
+def test_update_casos_bulk_por_ids_y_por_filtro(db_session, caso_factory):
+    """Test reasignación masiva con un UPDATE por conjunto y auditoría en lote"""
+    casos = [caso_factory(responsableId=1, tipoTramite="FACTURA" if i < 4 else "APOSTILLA") for i in range(6)]
+
+    ids = caso_service.update_casos_bulk(
+        db_session, CasoUpdate(responsableId=2), ids=[c.id for c in casos[:2]] + [casos[0].id]
+    )
+    assert sorted(ids) == sorted(c.id for c in casos[:2])
+
+    ids = caso_service.update_casos_bulk(
+        db_session, CasoUpdate(estadoCasoId=3), filters=CasoFilter(tipoTramite="APOSTILLA")
+    )
+    assert sorted(ids) == sorted(c.id for c in casos[4:])
+
+    db_session.expire_all()
+    assert [c.responsableId for c in casos] == [2, 2, 1, 1, 1, 1]
+    assert [c.estadoCasoId for c in casos] == [1, 1, 1, 1, 3, 3]
+
+    registrados = auditoria_service.registrar_acciones(
+        db_session, "actualizar", [(caso_id, {"estadoCasoId": 3}) for caso_id in ids], usuario_id=1
+    )
+    assert registrados == 2
+    assert db_session.query(AuditoriaEvento).filter(AuditoriaEvento.tipoAccionId == 2).count() == 2
+
+
+def test_caso_bulk_update_exige_seleccion_y_cambios():
+    """Test que el esquema rechaza filtros vacíos o patches sin cambios"""
+    with pytest.raises(ValidationError):
+        CasoBulkUpdate(filtro={}, cambios={"responsableId": 2})
+    with pytest.raises(ValidationError):
+        CasoBulkUpdate(ids=[uuid.uuid4()], filtro={"tipoTramite": "FACTURA"}, cambios={"responsableId": 2})
+    with pytest.raises(ValidationError):
+        CasoBulkUpdate(ids=[uuid.uuid4()], cambios={})
+    assert CasoBulkUpdate(filtro={"responsableId": 1}, cambios={"responsableId": 2}).filtro.responsableId == 1
+
+
+def test_put_bulk_valida_referencias_y_acota_ids(client, db_session, caso_factory, monkeypatch):
+    """Test PUT /casos/bulk: solo administradores, 422 si una referencia no existe y solo el conteo por encima del tope"""
+    from app.config import settings
+    from app.core.security import create_access_token
+
+    _seed_catalogos_bulk(db_session)
+    agente = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    usuario = Usuario(nombre="Admin", correo="admin@entidad.gov.co")
+    db_session.add_all([agente, usuario])
+    db_session.commit()
+    casos = [caso_factory() for _ in range(3)]
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(usuario.id)})}"}
+    seleccion = {"ids": [str(c.id) for c in casos]}
+
+    response = client.put(
+        "/api/v1/casos/bulk", headers={"Authorization": f"Bearer {create_access_token(data={'sub': str(agente.id)})}"},
+        json={"filtro": {"tipoTramite": "FACTURA"}, "cambios": {"estadoCasoId": 1}}
+    )
+    assert response.status_code == 403
+
+    response = client.put(
+        "/api/v1/casos/bulk", headers=headers,
+        json={**seleccion, "cambios": {"estadoCasoId": 42, "responsableId": 999}}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == ["estadoCasoId: 42 no existe", "responsableId: 999 no existe"]
+
+    response = client.put("/api/v1/casos/bulk", headers=headers, json={**seleccion, "cambios": {"responsableId": usuario.id}})
+    assert response.status_code == 200
+    assert len(response.json()["ids"]) == 3
+
+    monkeypatch.setattr(settings, "BULK_RESULT_MAX_IDS", 2)
+    response = client.put("/api/v1/casos/bulk", headers=headers, json={**seleccion, "cambios": {"estadoCasoId": 1}})
+    assert response.json() == {"actualizados": 3, "ids": None}
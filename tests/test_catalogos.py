@@ -0,0 +1,116 @@
+from sqlalchemy import event
+
+from app.core.catalogos import catalogos
+from app.models.models import EstadoCaso, Semaforo, TipoAccion
+from app.schemas.caso import CasoResponse
+from app.services.auditoria_service import auditoria_service
+
+
+def _seed(db_session):
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        EstadoCaso(id=2, codigo="CERRADO", descripcion="Cerrado"),
+        Semaforo(id=1, codigo="VERDE", descripcion="Sin urgencia", colorHex="#22C55E", diasMin=10, orden=1),
+        TipoAccion(id=10, codigo="CASO_CREADO", descripcion="Caso creado"),
+    ])
+    db_session.commit()
+
+
+def test_catalogos_consulta_por_id_y_codigo(db_session):
+    """Test lookups en memoria y refresco por versión"""
+    _seed(db_session)
+    assert catalogos.por_codigo(EstadoCaso, "CERRADO", db=db_session).id == 2
+    assert catalogos.por_id(Semaforo, 1).colorHex == "#22C55E"
+    assert catalogos.por_id(EstadoCaso, 99) is None
+    assert [e.codigo for e in catalogos.listar(EstadoCaso)] == ["NUEVO", "CERRADO"]
+
+    # Sin cambios en la base la versión se mantiene
+    version = catalogos.version
+    assert not catalogos.refrescar(db_session)
+    assert catalogos.version == version
+
+
+def test_catalogos_se_invalidan_al_escribir(db_session):
+    """Test que un commit sobre un catálogo invalida el registro"""
+    _seed(db_session)
+    assert catalogos.por_id(EstadoCaso, 1, db=db_session).descripcion == "Nuevo"
+
+    estado = db_session.get(EstadoCaso, 1)
+    estado.descripcion = "Recién ingresado"
+    db_session.flush()
+    # Hasta el commit se sigue sirviendo lo confirmado
+    assert catalogos.cargado
+    db_session.commit()
+
+    assert not catalogos.cargado
+    assert catalogos.por_id(EstadoCaso, 1, db=db_session).descripcion == "Recién ingresado"
+
+
+def test_caso_response_no_consulta_catalogos(db_session, caso_factory):
+    """Test que serializar un caso resuelve los catálogos sin queries"""
+    _seed(db_session)
+    caso = caso_factory(estadoCasoId=2)
+    catalogos.cargar(db_session)
+    db_session.refresh(caso)
+
+    sentencias = []
+
+    def _registrar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _registrar)
+    try:
+        respuesta = CasoResponse.model_validate(caso)
+    finally:
+        event.remove(engine, "before_cursor_execute", _registrar)
+
+    assert respuesta.estado_caso.codigo == "CERRADO"
+    assert respuesta.semaforo.codigo == "VERDE"
+    assert not any("tab_estadocaso" in s or "tab_semaforo" in s for s in sentencias)
+
+
+def test_auditoria_resuelve_tipo_accion_por_codigo(db_session):
+    """Test que registrar_accion toma el tipo de acción del catálogo"""
+    _seed(db_session)
+    evento = auditoria_service.registrar_accion(db_session, accion="crear", entidad="caso")
+    assert evento.tipoAccionId == 10
+
+
+def test_caso_response_no_carga_catalogos_invalidados(db_session, caso_factory):
+    """Test serializar con el registro invalidado sirve lo cargado sin ir a la base; sin carga previa falla"""
+    _seed(db_session)
+    caso = caso_factory(estadoCasoId=2)
+    catalogos.cargar(db_session)
+    catalogos.invalidar()
+
+    respuesta = CasoResponse.model_validate(caso)
+    assert respuesta.estado_caso.codigo == "CERRADO"
+    assert not catalogos.cargado
+
+    catalogos.asegurar()
+    assert catalogos.cargado
+
+
+def test_refresco_compara_checksums_antes_de_releer(db_session, monkeypatch):
+    """Test el job relee los catálogos solo si cambia el checksum de las tablas"""
+    from sqlalchemy.dialects import mssql
+
+    sql = str(catalogos.consulta_checksums().compile(dialect=mssql.dialect()))
+    assert "checksum_agg(binary_checksum(*))" in sql.lower()
+    assert sql.lower().count("union all") == 5
+
+    _seed(db_session)
+    checksums = [(("tab_estadocaso", 2, 1),)]
+    monkeypatch.setattr(catalogos, "_leer_checksums", lambda db: checksums[0])
+    cargas = []
+    cargar = catalogos.cargar
+    monkeypatch.setattr(catalogos, "cargar", lambda db: cargas.append(1) or cargar(db))
+
+    catalogos.refrescar(db_session)
+    catalogos.refrescar(db_session)
+    assert len(cargas) == 1
+
+    checksums[0] = (("tab_estadocaso", 3, 7),)
+    catalogos.refrescar(db_session)
+    assert len(cargas) == 2
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Configuracion
+from app.services.configuracion_service import ConfiguracionService, parse_valor
+
+
+def test_parse_valor_por_tipo_dato():
+    """Test conversión de valor según tipoDato"""
+    assert parse_valor("10", "INT") == 10
+    assert parse_valor("true", "BOOL") is True
+    assert parse_valor("No", "bool") is False
+    assert parse_valor('{"asunto": "RE"}', "JSON") == {"asunto": "RE"}
+    assert parse_valor("2.5", "DECIMAL") == 2.5
+    assert parse_valor("pqr@entidad.gov.co", "STRING") == "pqr@entidad.gov.co"
+    with pytest.raises(ValueError):
+        parse_valor("diez", "INT")
+    with pytest.raises(ValueError):
+        parse_valor("x", "FECHA")
+
+
+def test_configuracion_refresca_solo_si_cambia(db_session):
+    """Test que los cambios hechos por otro worker se recogen en el refresco"""
+    db_session.add_all([
+        Configuracion(clave="CORREO_INGESTA_INTERVALO", valor="10", tipoDato="INT"),
+        Configuracion(clave="CORREO_INGESTA_ACTIVA", valor="true", tipoDato="BOOL"),
+    ])
+    db_session.commit()
+
+    servicio = ConfiguracionService()
+    assert servicio.refrescar(db_session)
+    assert servicio.get("CORREO_INGESTA_INTERVALO") == 10
+    assert servicio.get("NO_EXISTE", "x") == "x"
+    assert not servicio.refrescar(db_session)
+
+    # Cambio hecho desde otro proceso
+    config = db_session.query(Configuracion).filter_by(clave="CORREO_INGESTA_ACTIVA").one()
+    config.valor = "false"
+    config.updatedAt = datetime.now() + timedelta(seconds=1)
+    db_session.commit()
+
+    assert servicio.refrescar(db_session)
+    assert servicio.get("CORREO_INGESTA_ACTIVA") is False
+
+    # Los borrados también cambian la versión
+    db_session.delete(config)
+    db_session.commit()
+    assert servicio.refrescar(db_session)
+    assert servicio.get("CORREO_INGESTA_ACTIVA") is None
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from app.models.models import EstadoCaso, Semaforo, EstadoEnvio, ContadorDashboard
+from app.schemas.caso import CasoCreate, CasoUpdate, CasoFilter
+from app.services import caso_service
+from app.services.dashboard_service import dashboard_service, ESTADO
+
+
+def _contadores(db_session):
+    return {
+        (c.dimension, c.clave): c.valor
+        for c in db_session.query(ContadorDashboard).all() if c.valor
+    }
+
+
+def _caso_create(n, **kwargs):
+    ahora = datetime.now()
+    datos = dict(
+        radicado=f"DASH-{n}",
+        fechaRecepcion=ahora,
+        fechaVencimiento=ahora + timedelta(days=10),
+        peticionarioNombre="Peticionario",
+        peticionarioCorreo="peticionario@correo.com",
+        detalleSolicitud="Solicitud",
+        tipoTramite="FACTURA",
+        estadoCasoId=1,
+        semaforoId=1,
+        destinatarioCorreo="entidad@correo.gov.co",
+        correoHiloId=f"hilo-{n}",
+    )
+    datos.update(kwargs)
+    return CasoCreate(**datos)
+
+
+def test_contadores_siguen_a_las_escrituras(db_session, caso_factory):
+    """Test que los deltas dejan los contadores igual que un recálculo completo"""
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        EstadoCaso(id=2, codigo="EN_GESTION", descripcion="En gestión"),
+        Semaforo(id=1, codigo="VERDE", descripcion="Sin urgencia", colorHex="#22C55E", diasMin=10, orden=1),
+        EstadoEnvio(id=1, codigo="PENDIENTE", descripcion="Pendiente"),
+    ])
+    db_session.commit()
+    caso_factory(fechaVencimiento=datetime.now() - timedelta(days=1))
+    caso_factory(tipoTramite="APOSTILLA", createdAt=datetime.now() - timedelta(days=30))
+    dashboard_service.reconciliar(db_session)
+
+    def recalculado():
+        return {k: v for k, v in dashboard_service.calcular(db_session).items() if v}
+
+    assert _contadores(db_session) == recalculado()
+
+    nuevo = caso_service.create_caso(db_session, _caso_create(1))
+    caso_service.create_caso(db_session, _caso_create(2, fechaVencimiento=datetime.now() - timedelta(days=3)))
+    caso_service.create_casos_bulk(db_session, [_caso_create(3, tipoTramite="APOSTILLA").model_dump(mode="json")])
+    assert _contadores(db_session) == recalculado()
+
+    caso_service.update_caso(db_session, nuevo.id, CasoUpdate(estadoCasoId=2))
+    caso_service.update_casos_bulk(db_session, CasoUpdate(estadoCasoId=2), ids=[nuevo.id])
+    caso_service.update_casos_bulk(db_session, CasoUpdate(estadoCasoId=2), filters=CasoFilter(tipoTramite="APOSTILLA"))
+    assert _contadores(db_session) == recalculado()
+
+    caso_service.delete_caso(db_session, nuevo.id)
+    assert _contadores(db_session) == recalculado()
+
+    dashboard = dashboard_service.leer(db_session)
+    assert dashboard["total_casos"] == 4
+    assert dashboard["casos_por_estado"] == {"Nuevo": 2, "En gestión": 2}
+    assert dashboard["casos_por_tipo"] == {"FACTURA": 2, "APOSTILLA": 2}
+    assert dashboard["casos_por_prioridad"] == {"#22C55E": 4}
+    assert dashboard["casos_vencidos"] == 2
+    assert dashboard["casos_ultima_semana"] == 3
+
+
+def test_dashboard_sin_contadores_calcula_en_vivo(db_session, caso_factory):
+    """Test que antes de la primera reconciliación el dashboard se calcula directo"""
+    caso_factory()
+    assert dashboard_service.leer(db_session)["total_casos"] == 1
+
+
+def test_aplicar_actualiza_en_orden_fijo(db_session, monkeypatch):
+    """Test los contadores se tocan en orden (dimensión, clave) sin importar el orden de los deltas"""
+    from collections import Counter
+
+    orden = []
+    monkeypatch.setattr(dashboard_service, "_sumar", lambda db, dimension, clave, delta: orden.append((dimension, clave)))
+
+    dashboard_service.aplicar(db_session, Counter({
+        ("tipo", "QUEJA"): 1, ("estado", "2"): -1, ("total", ""): 1, ("estado", "1"): 1, ("tipo", None): 1,
+    }))
+
+    assert orden == [("estado", "1"), ("estado", "2"), ("tipo", None), ("tipo", "QUEJA"), ("total", "")]
+
+
+def test_reconciliar_bloquea_los_contadores_en_sql_server():
+    """Test en mssql el bloqueo previo al recálculo lleva UPDLOCK + HOLDLOCK"""
+    from sqlalchemy.dialects import mssql
+
+    sql = str(dashboard_service.consulta_bloqueo([ESTADO]).compile(dialect=mssql.dialect()))
+
+    assert "tab_contadordashboard WITH (UPDLOCK, HOLDLOCK)" in sql
@@ -0,0 +1,57 @@
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+from app.core.security import create_access_token
+from app.models.models import Usuario
+
+
+def test_una_conexion_por_request_autenticado(client, db_session):
+    """Test que auth y endpoint comparten la sesión: un solo checkout del pool"""
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    db_session.add(usuario)
+    db_session.commit()
+    token = create_access_token(data={"sub": str(usuario.id), "email": usuario.correo})
+
+    checkouts = []
+
+    def _registrar(dbapi_connection, connection_record, connection_proxy):
+        checkouts.append(connection_record)
+
+    # Se escucha en la clase Pool para contar checkouts de cualquier engine
+    event.listen(Pool, "checkout", _registrar)
+    try:
+        response = client.get(
+            f"/api/v1/usuarios/{usuario.id}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+    finally:
+        event.remove(Pool, "checkout", _registrar)
+
+    assert response.status_code == 200
+    assert len(checkouts) == 1
+
+
+def test_una_conexion_por_request_autenticado_async(client, db_session, caso_factory):
+    """Test en un endpoint async el usuario se resuelve con su AsyncSession: un solo checkout"""
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    db_session.add(usuario)
+    db_session.commit()
+    caso = caso_factory()
+    token = create_access_token(data={"sub": str(usuario.id), "email": usuario.correo})
+
+    checkouts = []
+
+    def _registrar(dbapi_connection, connection_record, connection_proxy):
+        checkouts.append(connection_record)
+
+    event.listen(Pool, "checkout", _registrar)
+    try:
+        response = client.get(
+            f"/api/v1/casos/{caso.id}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+    finally:
+        event.remove(Pool, "checkout", _registrar)
+
+    assert response.status_code == 200
+    assert len(checkouts) == 1
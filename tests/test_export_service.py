@@ -0,0 +1,66 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from app.models.models import EstadoCaso, Semaforo, EstadoEnvio, Usuario
+from app.schemas.caso import CasoFilter
+from app.services import export_service
+from app.services.export_service import filas_casos, generar_csv, generar_xlsx, COLUMNAS
+
+
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _preparar(db_session, caso_factory, cantidad):
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        Semaforo(id=1, codigo="VERDE", descripcion="Sin urgencia", colorHex="#22C55E", diasMin=10, orden=1),
+        EstadoEnvio(id=1, codigo="PENDIENTE", descripcion="Pendiente"),
+        Usuario(id=7, nombre="Ana Gestora", correo="ana@correo.com"),
+    ])
+    db_session.commit()
+    for n in range(cantidad):
+        caso_factory(
+            tipoTramite="APOSTILLA" if n % 3 == 0 else "FACTURA",
+            responsableId=7 if n == 0 else None,
+            peticionarioNombre="=HYPERLINK(\"x\")" if n == 1 else f"Peticionario {n}",
+        )
+
+
+def test_exportar_csv_por_bloques(db_session, caso_factory, monkeypatch):
+    """Test CSV con encabezado, catálogos resueltos, filtro y entrega en varios bloques"""
+    monkeypatch.setattr(export_service, "_FILAS_POR_BLOQUE", 10)
+    _preparar(db_session, caso_factory, 30)
+
+    bloques = list(generar_csv(filas_casos(db_session, CasoFilter(tipoTramite="FACTURA"))))
+    contenido = b"".join(bloques).decode("utf-8")
+    filas = list(csv.reader(io.StringIO(contenido.lstrip("\ufeff"))))
+
+    assert len(bloques) > 1
+    assert filas[0] == [titulo for titulo, _ in COLUMNAS]
+    assert len(filas) == 1 + 20
+    assert {f[3] for f in filas[1:]} == {"FACTURA"}
+    assert {f[4] for f in filas[1:]} == {"Nuevo"}
+    assert {f[5] for f in filas[1:]} == {"VERDE"}
+    assert "'=HYPERLINK(\"x\")" in [f[7] for f in filas[1:]]
+
+
+def test_exportar_xlsx_es_un_libro_valido(db_session, caso_factory, monkeypatch):
+    """Test el XLSX en streaming es un zip legible con todas las filas"""
+    monkeypatch.setattr(export_service, "_FILAS_POR_BLOQUE", 10)
+    _preparar(db_session, caso_factory, 30)
+
+    bloques = list(generar_xlsx(filas_casos(db_session)))
+    libro = zipfile.ZipFile(io.BytesIO(b"".join(bloques)))
+
+    assert len(bloques) > 1
+    assert libro.testzip() is None
+    assert {"[Content_Types].xml", "xl/workbook.xml", "xl/worksheets/sheet1.xml"} <= set(libro.namelist())
+    hoja = ElementTree.fromstring(libro.read("xl/worksheets/sheet1.xml"))
+    filas = hoja.findall("x:sheetData/x:row", NS)
+    assert len(filas) == 1 + 30
+    encabezado = [t.text for t in filas[0].iter(f"{{{NS['x']}}}t")]
+    assert encabezado == [titulo for titulo, _ in COLUMNAS]
+    responsables = {filas[i][6].find("x:is/x:t", NS).text for i in range(1, 31)}
+    assert responsables == {"Ana Gestora", None}
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PoolContrasenas, hash_espera, verify_and_update_password
+from app.models.models import Usuario
+
+
+def test_login_rehashea_bcrypt_heredado(client, db_session):
+    """Test un hash bcrypt válido se reemplaza por argon2 al hacer login"""
+    hash_bcrypt = bcrypt.hashpw(b"Clave-Segura-1", bcrypt.gensalt(rounds=4)).decode()
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co", passwordHash=hash_bcrypt)
+    db_session.add(usuario)
+    db_session.commit()
+    esperas = hash_espera.conteo(operacion="verificar")
+
+    response = client.post("/api/v1/auth/login", json={"correo": usuario.correo, "password": "Clave-Segura-1"})
+
+    assert response.status_code == 200
+    db_session.refresh(usuario)
+    assert usuario.passwordHash.startswith("$argon2")
+    assert hash_espera.conteo(operacion="verificar") == esperas + 1
+
+    # Con el hash nuevo se sigue entrando y no se vuelve a reescribir
+    assert verify_and_update_password("Clave-Segura-1", usuario.passwordHash) == (True, None)
+    response = client.post("/api/v1/auth/login", json={"correo": usuario.correo, "password": "otra"})
+    assert response.status_code == 401
+
+
+def test_pool_rechaza_con_cola_llena():
+    """Test con max_pendientes operaciones en curso las siguientes reciben 503"""
+    pool = PoolContrasenas(workers=1, max_pendientes=2)
+
+    async def _escenario():
+        lentas = [asyncio.ensure_future(pool.ejecutar("hash", time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as error:
+            await pool.ejecutar("hash", time.sleep, 0)
+        await asyncio.gather(*lentas)
+        return error.value.status_code
+
+    assert asyncio.run(_escenario()) == 503
+    assert pool.pendientes == 0
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from app.core.pool_metrics import (
+    pool_instrumentado, registrar_engine, pool_wait_seconds, pool_timeouts_total, pool_checkouts_total
+)
+
+
+def test_pool_instrumentado_mide_esperas_y_timeouts(tmp_path):
+    """Test histograma de espera, contador de timeouts y gauges de uso del pool"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=pool_instrumentado(QueuePool, "prueba"),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    registrar_engine("prueba", engine)
+    esperas_previas = pool_wait_seconds.conteo(pool="prueba")
+
+    conn = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    assert pool_timeouts_total.valor(pool="prueba") == 1
+    assert pool_checkouts_total.valor(pool="prueba") == 1
+    assert pool_wait_seconds.conteo(pool="prueba") == esperas_previas + 2
+
+    from app.core.metrics import metrics
+    texto = metrics.render()
+    assert 'db_pool_connections_in_use{pool="prueba"} 1' in texto
+    assert 'db_pool_checkout_timeouts_total{pool="prueba"} 1' in texto
+
+    conn.close()
+    # El nombre sobrevive a engine.dispose() (pool recreado)
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert pool_checkouts_total.valor(pool="prueba") == 2
+    assert 'db_pool_connections_in_use{pool="prueba"} 0' in metrics.render()
+
+
+def test_metrics_endpoint(client):
+    """Test que /metrics publica las métricas de los pools de la aplicación"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'db_pool_size{pool="oltp"}' in response.text
+    assert 'db_pool_size{pool="reporting"}' in response.text
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in response.text
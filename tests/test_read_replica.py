@@ -0,0 +1,83 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.core.read_replica import ReadReplica
+
+
+def test_read_replica_estado():
+    """Test chequeo de salud y tolerancia de retraso de la réplica"""
+    replica = ReadReplica(create_engine("sqlite://"))
+    # Sin chequeo previo no se usa
+    assert not replica.disponible(30)
+
+    assert replica.chequear()
+    assert replica.disponible(30)
+
+    replica.lag_segundos = 60
+    assert not replica.disponible(30)
+    assert replica.disponible(120)
+
+    replica.marcar_caida("prueba")
+    assert not replica.disponible(120)
+
+    caida = ReadReplica(create_engine("sqlite:////directorio/inexistente/replica.db"))
+    assert not caida.chequear()
+    assert not ReadReplica(None).disponible(30)
+
+
+def test_read_db_enruta_y_cae_al_primario(monkeypatch):
+    """Test que la dependency usa la réplica sana y vuelve al primario si falla"""
+    replica_engine = create_engine("sqlite://")
+    replica = ReadReplica(replica_engine)
+    monkeypatch.setattr(database, "read_replica", replica)
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=replica_engine))
+
+    def _engine_de(dependency):
+        gen = dependency()
+        db = next(gen)
+        try:
+            return db.get_bind()
+        finally:
+            gen.close()
+
+    replica.chequear()
+    assert _engine_de(database.read_db(max_lag_seconds=10)) is replica_engine
+
+    replica.lag_segundos = 30
+    assert _engine_de(database.read_db(max_lag_seconds=10)) is database.engine
+    assert _engine_de(database.read_db(max_lag_seconds=60)) is replica_engine
+
+    replica.marcar_caida("prueba")
+    assert _engine_de(database.read_db(max_lag_seconds=60)) is database.engine
+
+
+def test_desconexion_en_engine_async_saca_a_la_replica():
+    """Test una desconexión en una consulta async también saca a la réplica de rotación"""
+    import asyncio
+
+    import pytest
+    from sqlalchemy import event, text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine("sqlite+aiosqlite://")
+
+    # El error de la consulta se trata como si el servidor hubiera cortado la
+    # conexión (se registra antes para correr antes que el de la réplica)
+    @event.listens_for(async_engine.sync_engine, "handle_error")
+    def _como_desconexion(context):
+        context.is_disconnect = True
+
+    replica = ReadReplica(create_engine("sqlite://"), async_engine)
+    assert replica.chequear()
+
+    async def consulta():
+        try:
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT * FROM tabla_inexistente"))
+        finally:
+            await async_engine.dispose()
+
+    with pytest.raises(Exception):
+        asyncio.run(consulta())
+    assert not replica.disponible(30)
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+from starlette.requests import Request
+
+from app.core.response_cache import ResponseCache, cache_requests_total
+
+
+def _request(path="/api/v1/reportes/dashboard", query="", if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": headers,
+    })
+
+
+def test_cache_hit_miss_y_etag():
+    """Test primera petición calcula, la segunda sale de caché y If-None-Match da 304"""
+    cache = ResponseCache("prueba_etag", ttl_segundos=60)
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        return {"total_casos": 3}
+
+    async def escenario():
+        primera = await cache.responder(_request(), calcular)
+        segunda = await cache.responder(_request(), calcular)
+        condicional = await cache.responder(_request(if_none_match=primera.headers["etag"]), calcular)
+        otra_query = await cache.responder(_request(query="meses=6"), calcular)
+        return primera, segunda, condicional, otra_query
+
+    primera, segunda, condicional, otra_query = asyncio.run(escenario())
+
+    assert primera.status_code == 200
+    assert primera.body == b'{"total_casos":3}'
+    assert segunda.headers["etag"] == primera.headers["etag"]
+    assert condicional.status_code == 304
+    assert condicional.body == b""
+    assert otra_query.status_code == 200
+    assert len(llamadas) == 2
+    assert cache_requests_total.valor(cache="prueba_etag", resultado="miss") == 2
+    assert cache_requests_total.valor(cache="prueba_etag", resultado="hit") == 1
+    assert cache_requests_total.valor(cache="prueba_etag", resultado="not_modified") == 1
+
+
+def test_cache_expira_por_ttl():
+    """Test con TTL 0 cada petición recalcula"""
+    cache = ResponseCache("prueba_ttl", ttl_segundos=0)
+    llamadas = []
+
+    async def escenario():
+        for _ in range(2):
+            await cache.responder(_request(), lambda: llamadas.append(1) or {"ok": True})
+
+    asyncio.run(escenario())
+
+    assert len(llamadas) == 2
+
+
+def test_single_flight_agrupa_peticiones_simultaneas():
+    """Test peticiones idénticas concurrentes comparten un único cálculo"""
+    cache = ResponseCache("prueba_single_flight", ttl_segundos=60)
+    llamadas = []
+    lock = threading.Lock()
+
+    def calcular():
+        with lock:
+            llamadas.append(1)
+        time.sleep(0.1)
+        return {"total_casos": 10}
+
+    async def escenario():
+        return await asyncio.gather(*[cache.responder(_request(), calcular) for _ in range(10)])
+
+    respuestas = asyncio.run(escenario())
+
+    assert len(llamadas) == 1
+    assert {r.body for r in respuestas} == {b'{"total_casos":10}'}
+    assert cache_requests_total.valor(cache="prueba_single_flight", resultado="miss") == 1
+    assert cache_requests_total.valor(cache="prueba_single_flight", resultado="coalesced") == 9
+
+
+def test_single_flight_propaga_errores():
+    """Test un error en el cálculo llega a todos los que esperaban y no queda en caché"""
+    cache = ResponseCache("prueba_error", ttl_segundos=60)
+
+    def fallar():
+        time.sleep(0.05)
+        raise RuntimeError("bd caída")
+
+    async def escenario():
+        return await asyncio.gather(
+            *[cache.responder(_request(), fallar) for _ in range(3)], return_exceptions=True
+        )
+
+    resultados = asyncio.run(escenario())
+
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+    respuesta = asyncio.run(cache.responder(_request(), lambda: {"ok": True}))
+    assert respuesta.status_code == 200
+
+
+def test_reportes_calculan_con_sesion_propia(client, db_session, monkeypatch):
+    """Test el cálculo compartido abre y cierra su propia sesión, no usa la del request"""
+    from app.api.v1.endpoints import reportes
+    from app.core.security import create_access_token
+    from app.database import read_session
+    from app.models.models import Usuario
+
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    db_session.add(usuario)
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(usuario.id)})}"}
+
+    abiertas = []
+
+    def sesion_registrada():
+        sesion = read_session()
+        abiertas.append(sesion)
+        return sesion
+
+    monkeypatch.setattr(reportes, "read_session", sesion_registrada)
+    response = client.get("/api/v1/reportes/dashboard", headers=headers)
+
+    assert response.status_code == 200
+    assert len(abiertas) == 1
+    assert not abiertas[0].in_transaction()
@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+
+from app.models.models import EstadoCaso, Semaforo, EstadoEnvio, Usuario, ResumenMensualCaso
+from app.schemas.caso import CasoUpdate
+from app.services import caso_service
+from app.services.resumen_mensual_service import resumen_mensual_service, meses_atras, SIN_RESPONSABLE
+
+
+HOY = date(2026, 3, 15)
+
+
+def _filas(db_session):
+    return sorted(
+        (f.mes, f.tipoTramite, f.estadoCasoId, f.responsableId, f.total)
+        for f in db_session.query(ResumenMensualCaso).all() if f.total
+    )
+
+
+def _preparar(db_session, caso_factory):
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        EstadoCaso(id=2, codigo="EN_GESTION", descripcion="En gestión"),
+        Semaforo(id=1, codigo="VERDE", descripcion="Sin urgencia", colorHex="#22C55E", diasMin=10, orden=1),
+        EstadoEnvio(id=1, codigo="PENDIENTE", descripcion="Pendiente"),
+        Usuario(id=7, nombre="Ana Gestora", correo="ana@correo.com"),
+    ])
+    db_session.commit()
+    ahora = datetime.now()
+    return {
+        "diciembre": caso_factory(fechaRecepcion=datetime(2025, 12, 5), updatedAt=ahora - timedelta(days=3)),
+        "enero": caso_factory(fechaRecepcion=datetime(2026, 1, 20), responsableId=7, updatedAt=ahora - timedelta(days=2)),
+        "marzo": caso_factory(fechaRecepcion=datetime(2026, 3, 2), tipoTramite="APOSTILLA", updatedAt=ahora - timedelta(days=1)),
+    }
+
+
+def test_meses_atras():
+    """Test aritmética de meses al cruzar años"""
+    assert meses_atras(date(2026, 3, 1), 0) == date(2026, 3, 1)
+    assert meses_atras(date(2026, 3, 1), 3) == date(2025, 12, 1)
+    assert meses_atras(date(2026, 1, 1), 24) == date(2024, 1, 1)
+
+
+def test_resumen_mensual_serie_y_desgloses(db_session, caso_factory):
+    """Test la serie incluye meses sin casos y los desgloses con etiquetas"""
+    _preparar(db_session, caso_factory)
+
+    assert resumen_mensual_service.actualizar(db_session) == 3
+
+    reporte = resumen_mensual_service.leer(db_session, meses=4, hoy=HOY)
+    assert reporte["desde"] == date(2025, 12, 1)
+    assert reporte["total"] == 3
+    assert [m["mes"] for m in reporte["meses"]] == ["2025-12", "2026-01", "2026-02", "2026-03"]
+    assert [m["total"] for m in reporte["meses"]] == [1, 1, 0, 1]
+    enero = reporte["meses"][1]
+    assert enero["por_estado"] == {"Nuevo": 1}
+    assert enero["por_responsable"] == {"Ana Gestora": 1}
+    assert reporte["meses"][0]["por_responsable"] == {SIN_RESPONSABLE: 1}
+    assert reporte["meses"][3]["por_tipo"] == {"APOSTILLA": 1}
+
+    filtrado = resumen_mensual_service.leer(db_session, meses=4, tipo_tramite="FACTURA", hoy=HOY)
+    assert filtrado["total"] == 2
+    assert resumen_mensual_service.leer(db_session, meses=4, responsable_id=7, hoy=HOY)["total"] == 1
+
+
+def test_resumen_mensual_incremental_y_borrados(db_session, caso_factory):
+    """Test solo se recalculan los meses con casos modificados y los borrados se descuentan"""
+    casos = _preparar(db_session, caso_factory)
+    resumen_mensual_service.actualizar(db_session)
+
+    caso_service.update_caso(db_session, casos["enero"].id, CasoUpdate(estadoCasoId=2))
+    # Enero por la modificación; marzo por el solape con la marca anterior
+    assert resumen_mensual_service.actualizar(db_session) == 2
+    enero = resumen_mensual_service.leer(db_session, meses=4, hoy=HOY)["meses"][1]
+    assert enero["por_estado"] == {"En gestión": 1}
+
+    caso_service.delete_caso(db_session, casos["diciembre"].id)
+    # El borrado solo marca diciembre, que se recalcula en la siguiente
+    # pasada; enero otra vez por el solape con la marca anterior
+    assert resumen_mensual_service.actualizar(db_session) == 2
+    reporte = resumen_mensual_service.leer(db_session, meses=4, hoy=HOY)
+    assert reporte["meses"][0]["total"] == 0
+    assert reporte["total"] == 2
+
+    incremental = _filas(db_session)
+    resumen_mensual_service.reconstruir(db_session)
+    assert _filas(db_session) == incremental
+
+
+def test_resumen_mensual_borrado_de_caso_modificado(db_session, caso_factory):
+    """Test un caso que cambió de estado después del último resumen se descuenta de su grupo original"""
+    casos = _preparar(db_session, caso_factory)
+    resumen_mensual_service.actualizar(db_session)
+
+    caso_service.update_caso(db_session, casos["enero"].id, CasoUpdate(estadoCasoId=2))
+    caso_service.delete_caso(db_session, casos["enero"].id)
+    resumen_mensual_service.actualizar(db_session)
+
+    reporte = resumen_mensual_service.leer(db_session, meses=4, hoy=HOY)
+    assert reporte["meses"][1]["total"] == 0
+    assert reporte["total"] == 2
+    assert all(total >= 0 for *_, total in _filas(db_session))
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+import uuid
+
+from app.core.revocaciones import revocaciones, hash_token
+from app.core.security import create_access_token, create_refresh_token, decode_token
+from app.models.models import Sesion, Usuario
+from app.services.session_service import SessionService
+
+
+def _usuario(db_session):
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    db_session.add(usuario)
+    db_session.commit()
+    return usuario
+
+
+def _tokens_de_sesion(db_session, usuario):
+    """Access y refresh token de una sesión registrada, como los emite el login"""
+    sesion_id = uuid.uuid4()
+    datos = {"sub": str(usuario.id), "email": usuario.correo, "sid": str(sesion_id)}
+    token, refresh = create_access_token(data=datos), create_refresh_token(data=datos)
+    SessionService.create_session(db_session, usuario.id, token, expiration_hours=24 * 7, sesion_id=sesion_id)
+    return token, refresh
+
+
+def test_logout_revoca_access_y_refresh_token(client, db_session):
+    """Test tras el logout el access token y el refresh token dejan de servir"""
+    usuario = _usuario(db_session)
+    token, refresh = _tokens_de_sesion(db_session, usuario)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get(f"/api/v1/usuarios/{usuario.id}", headers=headers).status_code == 200
+    response = client.post("/api/v1/auth/logout", headers=headers, json={"refresh_token": refresh})
+    assert response.status_code == 204
+
+    assert client.get(f"/api/v1/usuarios/{usuario.id}", headers=headers).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": refresh}).status_code == 401
+
+    # Los dos tokens son de la misma sesión: una sola fila, revocada
+    db_session.expire_all()
+    sesiones = db_session.query(Sesion).all()
+    assert len(sesiones) == 1
+    assert all(not s.activa and s.fechaRevocacion for s in sesiones)
+
+
+def test_logout_sin_refresh_token_revoca_la_sesion(client, db_session):
+    """Test el logout con solo el access token también invalida el refresh token de la sesión"""
+    usuario = _usuario(db_session)
+    token, refresh = _tokens_de_sesion(db_session, usuario)
+
+    response = client.post("/api/v1/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 204
+
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": refresh}).status_code == 401
+    # Otro worker (registro recargado desde tab_sesion) también lo rechaza
+    revocaciones.invalidar()
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": refresh}).status_code == 401
+
+
+def test_refresh_mantiene_la_sesion(client, db_session):
+    """Test los tokens refrescados siguen en la sesión original y caen con ella"""
+    usuario = _usuario(db_session)
+    _, refresh = _tokens_de_sesion(db_session, usuario)
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+    assert response.status_code == 200
+    nuevo = response.json()
+    assert decode_token(nuevo["access_token"])["sid"] == decode_token(refresh)["sid"]
+    assert db_session.query(Sesion).count() == 1
+
+    assert SessionService.invalidate_user_sessions(db_session, usuario.id) == 1
+
+    headers = {"Authorization": f"Bearer {nuevo['access_token']}"}
+    assert client.get(f"/api/v1/usuarios/{usuario.id}", headers=headers).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": nuevo["refresh_token"]}).status_code == 401
+
+
+def test_refresco_incremental_desde_otro_worker(db_session):
+    """Test refrescar recoge revocaciones nuevas y olvida las expiradas"""
+    usuario = _usuario(db_session)
+    ahora = datetime.now()
+    assert not revocaciones.revocado("token-a", db_session)
+
+    # Revocaciones escritas por otro proceso directamente en tab_sesion
+    db_session.add_all([
+        Sesion(usuarioId=usuario.id, tokenHash=hash_token("token-a"), fechaExpiracion=ahora + timedelta(hours=1),
+               activa=False, fechaRevocacion=ahora),
+        Sesion(usuarioId=usuario.id, tokenHash=hash_token("token-b"), fechaExpiracion=ahora - timedelta(minutes=1),
+               activa=False, fechaRevocacion=ahora),
+        Sesion(usuarioId=usuario.id, tokenHash=hash_token("token-c"), fechaExpiracion=ahora + timedelta(hours=1)),
+    ])
+    db_session.commit()
+
+    assert revocaciones.refrescar(db_session) == 1
+    assert revocaciones.revocado("token-a")
+    assert not revocaciones.revocado("token-b")
+    assert not revocaciones.revocado("token-c")
+    assert len(revocaciones) == 1
+
+
+def test_invalidar_sesiones_de_usuario(client, db_session):
+    """Test invalidar todas las sesiones del usuario rechaza sus tokens al instante"""
+    usuario = _usuario(db_session)
+    token, refresh = _tokens_de_sesion(db_session, usuario)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get(f"/api/v1/usuarios/{usuario.id}", headers=headers).status_code == 200
+
+    assert SessionService.invalidate_user_sessions(db_session, usuario.id) == 1
+
+    assert client.get(f"/api/v1/usuarios/{usuario.id}", headers=headers).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": refresh}).status_code == 401
+
+
+def test_purga_de_sesiones_por_lotes(db_session):
+    """Test la purga borra solo las expiradas fuera de la retención, en varios lotes"""
+    usuario = _usuario(db_session)
+    ahora = datetime.now()
+    db_session.add_all(
+        [Sesion(usuarioId=usuario.id, tokenHash=hash_token(f"viejo-{n}"), fechaExpiracion=ahora - timedelta(days=40))
+         for n in range(7)]
+        + [Sesion(usuarioId=usuario.id, tokenHash=hash_token(f"reciente-{n}"), fechaExpiracion=ahora - timedelta(days=2))
+           for n in range(3)]
+    )
+    db_session.commit()
+
+    resultado = SessionService.purge_expired_sessions(db_session, retencion_dias=30, tamano_lote=3, pausa_ms=0)
+
+    assert resultado["eliminadas"] == 7
+    assert resultado["lotes"] == 3
+    assert resultado["filas_por_segundo"] > 0
+    assert db_session.query(Sesion).count() == 3
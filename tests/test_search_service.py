@@ -0,0 +1,69 @@
+from app.schemas.caso import CasoFilter
+from app.services import caso_service
+from app.services.search_service import CasoSearchIndex, caso_search_index, tokenizar
+
+
+def test_tokenizar_insensible_a_tildes():
+    """Test tokenización sin tildes, mayúsculas, stopwords ni plurales"""
+    assert tokenizar("Petición de FACTURAS electrónicas") == ["peticion", "factura", "electronica"]
+    assert tokenizar("Muñoz") == tokenizar("munoz")
+
+
+def test_buscar_ordena_por_relevancia(db_session, caso_factory):
+    """Test ranking: más coincidencias y campos de mayor peso primero"""
+    a = caso_factory(detalleSolicitud="Solicito copia de la factura")
+    b = caso_factory(peticionarioNombre="Factura Pérez", detalleSolicitud="Factura factura duplicada")
+    caso_factory(detalleSolicitud="Consulta de apostilla")
+
+    indice = CasoSearchIndex()
+    indice.reconstruir(db_session)
+
+    resultados = [caso_id for caso_id, _ in indice.buscar("FACTURAS", limite=10)]
+    assert resultados == [b.id, a.id]
+    assert indice.buscar("factura apostilla") == []
+    assert [i for i, _ in indice.buscar("perez")] == [b.id]
+
+
+def test_indice_incremental(db_session, caso_factory):
+    """Test actualización incremental al crear, actualizar y eliminar"""
+    caso_search_index.reconstruir(db_session)
+    try:
+        caso = caso_factory(detalleSolicitud="Reclamo por cobro indebido")
+        assert caso_search_index.buscar("cobro") == []
+
+        caso_search_index.indexar(caso)
+        assert [i for i, _ in caso_search_index.buscar("cobro")] == [caso.id]
+
+        caso.detalleSolicitud = "Reclamo por apostilla"
+        caso_search_index.indexar(caso)
+        assert caso_search_index.buscar("cobro") == []
+
+        filtros = CasoFilter(busqueda="apóstilla")
+        assert [c.id for c in caso_service.get_casos(db_session, filters=filtros)] == [caso.id]
+
+        caso_service.delete_caso(db_session, caso.id)
+        assert caso_search_index.buscar("apostilla") == []
+    finally:
+        caso_search_index.ready = False
+
+
+def test_busqueda_con_indice_no_recorta_ni_pierde_fragmentos(db_session, caso_factory, monkeypatch):
+    """Test con el índice listo no se recortan resultados y radicado/correo admiten fragmentos"""
+    from app.config import settings
+
+    casos = [caso_factory(detalleSolicitud="Reclamo por cobro indebido") for _ in range(3)]
+    otro = caso_factory(radicado="PQR-2024-0777", peticionarioCorreo="maria.lopez@correo.com")
+    caso_search_index.reconstruir(db_session)
+    try:
+        # Más coincidencias que el tope: se cae al LIKE en lugar de recortar
+        monkeypatch.setattr(settings, "SEARCH_MAX_RESULTS", 2)
+        assert caso_search_index.buscar_ids("cobro") is None
+        filtros = CasoFilter(busqueda="cobro")
+        assert {c.id for c in caso_service.get_casos(db_session, filters=filtros)} == {c.id for c in casos}
+        assert caso_service.count_casos(db_session, filters=filtros) == 3
+
+        # Fragmentos de radicado y correo que el índice no conoce como palabras
+        assert [c.id for c in caso_service.get_casos(db_session, filters=CasoFilter(busqueda="2024-07"))] == [otro.id]
+        assert [c.id for c in caso_service.get_casos(db_session, filters=CasoFilter(busqueda="a.lop"))] == [otro.id]
+    finally:
+        caso_search_index.ready = False
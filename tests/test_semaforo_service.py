@@ -0,0 +1,45 @@
+from datetime import date, datetime
+
+from app.models.models import EstadoCaso, Semaforo
+from app.services.semaforo_service import semaforo_service
+
+
+def test_recalcular_semaforo_por_bandas(db_session, caso_factory):
+    """Test recálculo en un UPDATE: solo cambian los casos abiertos mal clasificados"""
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        EstadoCaso(id=2, codigo="CERRADO", descripcion="Cerrado"),
+        Semaforo(id=1, codigo="VERDE", colorHex="#22C55E", diasMin=10, diasMax=None, orden=1),
+        Semaforo(id=2, codigo="MARINA", colorHex="#06B6D4", diasMin=5, diasMax=9, orden=2),
+        Semaforo(id=3, codigo="NARANJA", colorHex="#F97316", diasMin=2, diasMax=4, orden=3),
+        Semaforo(id=4, codigo="ROJO", colorHex="#EF4444", diasMin=0, diasMax=1, orden=4),
+    ])
+    db_session.commit()
+
+    hoy = date(2024, 6, 10)
+    vencimientos = {
+        "verde": datetime(2024, 6, 20, 8, 0),       # 10 días
+        "marina": datetime(2024, 6, 19, 23, 59),    # 9 días
+        "naranja": datetime(2024, 6, 12, 0, 0),     # 2 días
+        "rojo": datetime(2024, 6, 11, 18, 0),       # 1 día
+        "vencido": datetime(2024, 6, 1, 8, 0),      # -9 días
+    }
+    casos = {k: caso_factory(fechaVencimiento=v, semaforoId=1) for k, v in vencimientos.items()}
+    cerrado = caso_factory(fechaVencimiento=datetime(2024, 6, 1), semaforoId=1, estadoCasoId=2)
+    modificados = {k: c.updatedAt for k, c in casos.items()}
+
+    resultado = semaforo_service.recalcular(db_session, hoy=hoy)
+
+    assert resultado["actualizados"] == 4
+    assert resultado["por_semaforo"] == {"MARINA": 1, "NARANJA": 1, "ROJO": 2}
+
+    db_session.expire_all()
+    assert {k: c.semaforoId for k, c in casos.items()} == {
+        "verde": 1, "marina": 2, "naranja": 3, "rojo": 4, "vencido": 4
+    }
+    assert cerrado.semaforoId == 1
+    # El recálculo no cuenta como modificación del caso
+    assert {k: c.updatedAt for k, c in casos.items()} == modificados
+
+    # Sin cambios de fecha no hay nada que escribir
+    assert semaforo_service.recalcular(db_session, hoy=hoy)["actualizados"] == 0
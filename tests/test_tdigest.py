@@ -0,0 +1,41 @@
+import bisect
+import json
+import random
+
+from app.core.tdigest import TDigest
+
+
+def _rango(ordenados, valor):
+    return bisect.bisect(ordenados, valor) / len(ordenados)
+
+
+def test_cuantiles_aproximados_tras_fusionar_y_serializar():
+    """Test p50/p90/p99 de digests parciales fusionados quedan cerca del rango exacto"""
+    aleatorio = random.Random(7)
+    datos = [aleatorio.lognormvariate(3, 1) for _ in range(20000)]
+    partes = [TDigest() for _ in range(8)]
+    for i, valor in enumerate(datos):
+        partes[i % len(partes)].agregar(valor)
+
+    guardadas = [
+        TDigest.from_dict(json.loads(json.dumps(p.to_dict())), p.conteo, p.suma, p.minimo, p.maximo)
+        for p in partes
+    ]
+    digest = TDigest.combinar(guardadas)
+    ordenados = sorted(datos)
+
+    assert digest.conteo == len(datos)
+    assert digest.minimo == ordenados[0] and digest.maximo == ordenados[-1]
+    assert abs(digest.promedio - sum(datos) / len(datos)) < 1e-6
+    for q in (0.5, 0.9, 0.99):
+        assert abs(_rango(ordenados, digest.cuantil(q)) - q) < 0.005
+    assert len(digest.to_dict()["centroides"]) < 100
+
+
+def test_digest_vacio_y_de_un_valor():
+    """Test casos límite"""
+    assert TDigest().cuantil(0.5) is None
+    digest = TDigest()
+    digest.agregar(4.0)
+    assert digest.cuantil(0.5) == 4.0
+    assert digest.cuantil(0) == 4.0 and digest.cuantil(1) == 4.0
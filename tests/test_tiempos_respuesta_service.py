@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+from app.models.models import EstadoCaso, Semaforo, EstadoEnvio, Usuario, SketchTiempoRespuesta
+from app.schemas.caso import CasoUpdate
+from app.services import caso_service
+from app.services.tiempos_respuesta_service import tiempos_respuesta_service
+
+
+HOY = date(2026, 3, 15)
+
+
+def _sketches(db_session):
+    return sorted(
+        (s.mes, s.tipoTramite, s.responsableId or 0, s.conteo, round(s.sumaHoras, 6))
+        for s in db_session.query(SketchTiempoRespuesta).all()
+    )
+
+
+def _preparar(db_session, caso_factory):
+    db_session.add_all([
+        EstadoCaso(id=1, codigo="NUEVO", descripcion="Nuevo"),
+        Semaforo(id=1, codigo="VERDE", descripcion="Sin urgencia", colorHex="#22C55E", diasMin=10, orden=1),
+        EstadoEnvio(id=1, codigo="PENDIENTE", descripcion="Pendiente"),
+        Usuario(id=7, nombre="Ana Gestora", correo="ana@correo.com"),
+    ])
+    db_session.commit()
+    recepcion = datetime(2026, 2, 1, 8, 0)
+    return [
+        caso_factory(fechaRecepcion=recepcion, tipoTramite="FACTURA" if n % 2 else "APOSTILLA", responsableId=7 if n < 5 else None)
+        for n in range(10)
+    ]
+
+
+def test_cierres_actualizan_los_sketches(db_session, caso_factory):
+    """Test los casos se suman al cerrarse y el resultado coincide con una reconstrucción"""
+    casos = _preparar(db_session, caso_factory)
+    recepcion = casos[0].fechaRecepcion
+
+    # Cierres individuales: 10, 20, ... 50 horas
+    for n, caso in enumerate(casos[:5], start=1):
+        caso_service.update_caso(db_session, caso.id, CasoUpdate(correoEnvioFecha=recepcion + timedelta(hours=10 * n)))
+    # Volver a enviar un caso ya cerrado no lo cuenta dos veces
+    caso_service.update_caso(db_session, casos[0].id, CasoUpdate(correoMensajeSalidaId="msg-1"))
+    # Cierre masivo en marzo de los casos FACTURA sin responsable
+    caso_service.update_casos_bulk(
+        db_session, CasoUpdate(correoEnvioFecha=datetime(2026, 3, 3, 8, 0)),
+        ids=[c.id for c in casos[5:] if c.tipoTramite == "FACTURA"]
+    )
+
+    reporte = tiempos_respuesta_service.leer(db_session, meses=2, hoy=HOY)
+    assert reporte["total"]["conteo"] == 8
+    febrero, marzo = reporte["por_mes"]
+    assert febrero["mes"] == "2026-02" and febrero["conteo"] == 5
+    assert febrero["p50"] == 30.0 and febrero["promedio"] == 30.0
+    assert marzo["conteo"] == 3
+    assert reporte["por_responsable"]["Ana Gestora"]["conteo"] == 5
+    assert reporte["por_tipo"]["APOSTILLA"]["conteo"] == 3
+
+    filtrado = tiempos_respuesta_service.leer(db_session, meses=2, tipo_tramite="FACTURA", responsable_id=7, hoy=HOY)
+    assert filtrado["total"]["conteo"] == 2
+
+    incremental = _sketches(db_session)
+    assert tiempos_respuesta_service.reconstruir(db_session) == len(incremental)
+    assert _sketches(db_session) == incremental
+
+
+def test_inicializar_solo_con_tabla_vacia(db_session, caso_factory):
+    """Test la construcción inicial no pisa sketches existentes"""
+    casos = _preparar(db_session, caso_factory)
+    casos[0].correoEnvioFecha = casos[0].fechaRecepcion + timedelta(hours=5)
+    db_session.commit()
+
+    assert tiempos_respuesta_service.inicializar(db_session) is True
+    assert tiempos_respuesta_service.inicializar(db_session) is False
+    assert tiempos_respuesta_service.leer(db_session, meses=2, hoy=HOY)["total"]["p99"] == 5.0
+
+
+def test_consulta_bucket_bloquea_la_fila_en_sql_server():
+    """Test en mssql el SELECT del bucket lleva UPDLOCK (FOR UPDATE no se compila)"""
+    from sqlalchemy.dialects import mssql
+
+    sql = str(tiempos_respuesta_service.consulta_bucket((date(2026, 3, 1), "FACTURA", 7)).compile(dialect=mssql.dialect()))
+
+    assert "tab_sketchtiemporespuesta WITH (UPDLOCK, ROWLOCK)" in sql
@@ -0,0 +1,69 @@
+from sqlalchemy import event
+
+from app.core.security import create_access_token
+from app.core.usuarios_cache import usuarios_cache
+from app.models.models import Usuario
+
+
+def _contar_consultas(db_session):
+    consultas = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        if "tab_usuario" in statement:
+            consultas.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", _registrar)
+    return consultas, _registrar
+
+
+def test_usuario_autenticado_se_sirve_del_cache(client, db_session):
+    """Test el segundo request autenticado no consulta tab_usuario para el token"""
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    db_session.add(usuario)
+    db_session.commit()
+    token = create_access_token(data={"sub": str(usuario.id), "email": usuario.correo})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    consultas, _registrar = _contar_consultas(db_session)
+    try:
+        assert client.get("/api/v1/escalamientos/", headers=headers).status_code == 200
+        primeras = len(consultas)
+        assert client.get("/api/v1/escalamientos/", headers=headers).status_code == 200
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", _registrar)
+
+    assert primeras == 1
+    assert len(consultas) == primeras
+
+
+def test_cache_se_invalida_al_modificar_usuario(db_session):
+    """Test un commit que cambia el usuario lo saca del caché; los inactivos no se guardan"""
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    db_session.add(usuario)
+    db_session.commit()
+
+    assert usuarios_cache.obtener(db_session, usuario.id).nombre == "Agente"
+    assert len(usuarios_cache) == 1
+
+    usuario.nombre = "Agente Senior"
+    usuario.activo = False
+    db_session.commit()
+    assert len(usuarios_cache) == 0
+
+    actual = usuarios_cache.obtener(db_session, usuario.id)
+    assert actual.nombre == "Agente Senior" and not actual.activo
+    assert len(usuarios_cache) == 0
+
+
+def test_cache_descarta_usuarios_borrados(db_session):
+    """Test borrar el usuario lo invalida y el token deja de resolverse"""
+    usuario = Usuario(nombre="Agente", correo="agente@entidad.gov.co")
+    db_session.add(usuario)
+    db_session.commit()
+    usuario_id = usuario.id
+    usuarios_cache.obtener(db_session, usuario_id)
+
+    db_session.delete(usuario)
+    db_session.commit()
+
+    assert usuarios_cache.obtener(db_session, usuario_id) is None